@@ -1,17 +1,9 @@
 import streamlit as st
 import os
 import pandas as pd
-import zipfile
-import shutil
 from streamlit_option_menu import option_menu
-from st_cytoscape import cytoscape
-from src.utils.cytoscape_helper import get_cytoscape_elements, STYLESHEET
-from src.processors.fir_processor import process_fir
-from src.processors.cdr_processor import process_cdr
-from src.processors.cctv_processor import process_cctv
-from src.processors.bank_processor import process_bank_statement
+from src.processors.registry import get_import_timings
 from src.graph_manager import GraphManager
-from src.cctns_loader import load_cctns_history
 
 # ... (Rest of Setup) ...
 
@@ -27,6 +19,12 @@ st.set_page_config(
 os.makedirs("assets", exist_ok=True)
 gm = GraphManager()
 
+@st.cache_resource
+def get_job_manager():
+    # One background executor per server process, shared by every session
+    from src.ingest_jobs import IngestJobManager
+    return IngestJobManager()
+
 # --- SESSION STATE & THEME ---
 if 'theme' not in st.session_state: st.session_state.theme = 'light'
 for key in ['fir_processed', 'cdr_processed', 'cctv_processed', 'bank_processed']:
@@ -99,11 +97,6 @@ def load_css(theme):
 
 st.markdown(load_css(st.session_state.theme), unsafe_allow_html=True)
 
-# --- SIDEBAR ---
-import plotly.express as px
-
-# ... (Imports remain same) ...
-
 # --- SIDEBAR ---
 with st.sidebar:
     st.image("https://cdn-icons-png.flaticon.com/512/10051/10051259.png", width=50)
@@ -152,16 +145,36 @@ with st.sidebar:
     st.markdown("---")
     with st.expander("🛠️ **System Tools**"):
         if st.button("🗑️ Purge All Data"):
-            gm.clean_database()
+            from src.bulk_loader import purge_all
+            status = st.empty()
+            purge_all(gm, progress=lambda stage, n: status.caption(f"Deleted {n:,} {stage}"))
+            status.empty()
             for key in st.session_state:
                 if key.endswith('_processed'): st.session_state[key] = False
             st.success("System Reset.")
+
+        purge_id = st.text_input("Case ID to purge", key="purge_case_id", placeholder="e.g. FIR_2024_9900")
+        if purge_id and st.button("🧹 Purge Case"):
+            from src.bulk_loader import purge_case
+            status = st.empty()
+            deleted = purge_case(gm, purge_id.strip(), progress=lambda stage, n: status.caption(f"Deleted {n:,} {stage}"))
+            status.empty()
+            st.success(f"Removed {purge_id} ({deleted} orphaned entities).")
             
+        if st.button("📈 Rescore All Suspects"):
+            with st.spinner("Recomputing risk features..."):
+                st.success(f"Rescored {gm.refresh_risk_scores(full=True):,} people.")
+
         if st.button("🔄 Sync National DB (FIRs)"):
             with st.spinner("Connecting to CCTNS..."):
+                from src.cctns_loader import load_cctns_history
                 load_cctns_history()
                 st.success("Synced.")
 
+        timings = get_import_timings()
+        if timings:
+            st.caption("Processor load times: " + ", ".join(f"{m.split('.')[-1]} {ms:.0f} ms" for m, ms in timings.items()))
+
 # --- PAGE: HOME (LANDING) ---
 if selected == "Home":
     st.markdown("""
@@ -191,6 +204,8 @@ if selected == "Home":
 
 # --- PAGE: DASHBOARD (ANALYTICS) ---
 elif selected == "Dashboard":
+    import plotly.express as px
+
     st.title("📊 Intelligence Command Center")
     
     stats = gm.get_dashboard_stats()
@@ -252,6 +267,31 @@ elif selected == "Dashboard":
         else:
             st.info("No agency load data available.")
     
+    st.markdown("---")
+    st.subheader("🕸️ Syndicates")
+    from src.utils.cytoscape_helper import get_community_lookup, get_community_color
+    communities = get_community_lookup(gm.driver)
+    syndicates = communities.summary(limit=15) if communities else []
+    if syndicates:
+        df_syn = pd.DataFrame([{
+            "Syndicate": f"#{i}", "Entities": s["size"], "Suspects": s["people"], "Cases": len(s["cases"]),
+            "Key Members": ", ".join(s["members"]), "color": get_community_color(s["community"])
+        } for i, s in enumerate(syndicates, 1)])
+        fig_syn = px.bar(
+            df_syn, x="Syndicate", y="Entities", color="Syndicate", hover_data=["Suspects", "Cases", "Key Members"],
+            color_discrete_sequence=df_syn["color"].tolist(), title="Largest Detected Communities"
+        )
+        fig_syn.update_layout(showlegend=False)
+        st.plotly_chart(fig_syn, use_container_width=True)
+
+        pick = st.selectbox("Inspect syndicate", df_syn["Syndicate"].tolist())
+        chosen = syndicates[int(pick[1:]) - 1]
+        st.markdown(f"**Key members:** {', '.join(chosen['members']) or '—'}")
+        st.markdown(f"**Cases:** {', '.join(chosen['cases'][:20]) or '—'}")
+        st.caption(f"Label propagation ({communities.mode}) over the whole graph in {communities.seconds:.1f}s.")
+    else:
+        st.info("No syndicates detected yet.")
+
     st.markdown("---")
     st.subheader("📝 Recent Activity")
     if stats['recent_cases']:
@@ -268,6 +308,16 @@ elif selected == "Dashboard":
 # --- PAGE: DATA INGESTION ---
 elif selected == "Data Ingestion":
     st.title("📂 Evidence Management")
+
+    # Uploads are spooled to disk and processed by a shared background executor,
+    # so this page stays responsive and jobs survive navigating away.
+    jobs = get_job_manager()
+    if 'ingest_jobs' not in st.session_state: st.session_state.ingest_jobs = []
+
+    def queue_upload(files, label):
+        job_id = jobs.submit_uploads(files, label=label)
+        st.session_state.ingest_jobs.append(job_id)
+        st.toast(f"Queued {label} ({len(files)} file(s)) as job {job_id}", icon="⏳")
     
     tab1, tab2 = st.tabs(["📤 Quick Upload", "📦 Bulk Import (Project)"])
     
@@ -281,43 +331,25 @@ elif selected == "Data Ingestion":
             st.markdown("##### 📄 FIR / Reports")
             fir_files = st.file_uploader("Drop PDF/TXT", type=["txt", "pdf"], accept_multiple_files=True, key="quick_fir")
             if fir_files and st.button("Process Reports"):
-                for f in fir_files:
-                    path = os.path.join("assets", f.name)
-                    with open(path, "wb") as file: file.write(f.getbuffer())
-                    data = process_fir(path)
-                    gm.add_fir_data(data)
-                    st.toast(f"Linked: {f.name}", icon="✅")
+                queue_upload(fir_files, "FIR / Reports")
         
         with c2: # CDR
             st.markdown("##### 📞 Call Logs")
             cdr_files = st.file_uploader("Drop CDR CSV", type=["csv"], accept_multiple_files=True, key="quick_cdr")
             if cdr_files and st.button("Process CDR"):
-                for f in cdr_files:
-                    path = os.path.join("assets", f.name)
-                    with open(path, "wb") as file: file.write(f.getbuffer())
-                    gm.add_cdr_data(process_cdr(path))
-                    st.toast(f"CDR Processed: {f.name}", icon="📞")
+                queue_upload(cdr_files, "Call Logs")
 
         with c3: # Bank
             st.markdown("##### 💰 Bank Logs")
             bank_files = st.file_uploader("Drop Statement CSV", type=["csv"], accept_multiple_files=True, key="quick_bank")
             if bank_files and st.button("Process Bank"):
-                for f in bank_files:
-                    path = os.path.join("assets", f.name)
-                    with open(path, "wb") as file: file.write(f.getbuffer())
-                    gm.add_bank_data(process_bank_statement(path))
-                    st.toast(f"Bank Log Processed: {f.name}", icon="💰")
+                queue_upload(bank_files, "Bank Logs")
 
         with c4: # CCTV
             st.markdown("##### 📷 Surveillance")
-            cctv_files = st.file_uploader("Drop Images", type=["png", "jpg"], accept_multiple_files=True, key="quick_cctv")
+            cctv_files = st.file_uploader("Drop Images / Video", type=["png", "jpg", "mp4", "avi", "mov", "mkv"], accept_multiple_files=True, key="quick_cctv")
             if cctv_files and st.button("Scan Evidence"):
-                for f in cctv_files:
-                    path = os.path.join("assets", f.name)
-                    with open(path, "wb") as file: file.write(f.getbuffer())
-                    data = process_cctv(path)
-                    gm.add_cctv_data(data)
-                    st.toast(f"Scanned: {data.get('vehicle_number', 'No Text')}", icon="👁️")
+                queue_upload(cctv_files, "Surveillance")
 
     # --- TAB 2: BULK IMPORT ---
     with tab2:
@@ -325,50 +357,34 @@ elif selected == "Data Ingestion":
         zip_file = st.file_uploader("Upload Case Archive (.zip)", type="zip", key="zip_upload")
         
         if zip_file and st.button("🚀 Ingest Full Project"):
-            zip_path = os.path.join("assets", "uploaded_case.zip")
-            with open(zip_path, "wb") as f: f.write(zip_file.getbuffer())
-            
-            extract_dir = os.path.join("assets", "temp_extracted")
-            if os.path.exists(extract_dir): shutil.rmtree(extract_dir)
-            os.makedirs(extract_dir)
-            
-            with zipfile.ZipFile(zip_path, 'r') as z: z.extractall(extract_dir)
-            
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            # --- PROCESS LOGIC ---
-            files_to_process = []
-            for root, _, files in os.walk(extract_dir):
-                for f in files: files_to_process.append(os.path.join(root, f))
-            
-            for i, file_path in enumerate(files_to_process):
-                filename = os.path.basename(file_path)
-                status_text.text(f"Processing: {filename}...")
-                ext = filename.split('.')[-1].lower()
-                
-                try:
-                    if ext in ['txt', 'pdf']:
-                        gm.add_fir_data(process_fir(file_path))
-                    elif ext == 'csv':
-                        # Minimal Smart Check (duplicated for brevity, ideally utils)
-                        h = pd.read_csv(file_path, nrows=1)
-                        s = " ".join([str(c) for c in h.columns]).lower()
-                        if 'duration' in s: gm.add_cdr_data(process_cdr(file_path))
-                        elif 'amount' in s: gm.add_bank_data(process_bank_statement(file_path))
-                    elif ext in ['jpg', 'png']:
-                        gm.add_cctv_data(process_cctv(file_path))
-                except Exception as e:
-                    st.error(f"Failed {filename}: {e}")
-                
-                progress_bar.progress((i + 1) / len(files_to_process))
-            
-            status_text.text("Ingestion Complete!")
-            st.success("✅ Case successfully reconstructed in Knowledge Graph.")
+            queue_upload([zip_file], f"Project {zip_file.name}")
+
+    # --- BACKGROUND JOBS (polled) ---
+    st.markdown("---")
+    st.subheader("⏳ Ingestion Jobs")
+
+    @st.fragment(run_every="2s")
+    def render_ingest_jobs():
+        my_jobs = jobs.list_jobs(st.session_state.ingest_jobs)
+        if not my_jobs:
+            st.caption("No uploads queued in this session.")
+            return
+        for job in reversed(my_jobs):
+            icon = {"queued": "🕒", "running": "⚙️", "done": "✅", "failed": "❌"}[job["status"]]
+            progress = job["done"] / job["total"] if job["total"] else 0.0
+            status = job["status"] if job["position"] is None else f"queued #{job['position'] + 1}"
+            st.progress(progress, text=f"{icon} {job['label']} [{job['id']}] · {job['done']}/{job['total']} files · {job['rows']} records · {status}")
+            if job["status"] == "queued" and job["position"]:
+                if st.button("⚡ Prioritize", key=f"promote_{job['id']}"):
+                    jobs.promote(job["id"])
+            for err in job["errors"][-3:]:
+                st.caption(f"⚠️ {err}")
+
+    render_ingest_jobs()
 
 # --- PAGE: INVESTIGATION BOARD ---
 elif selected == "Investigation Board":
-    from src.utils.cytoscape_helper import get_cytoscape_elements, STYLESHEET
+    from src.utils.cytoscape_helper import get_cytoscape_elements, get_community_lookup, STYLESHEET
     from st_cytoscape import cytoscape
 
     st.title("🕸️ Investigation Board")
@@ -421,18 +437,28 @@ elif selected == "Investigation Board":
     # ---------------------------------------------------------
     # 2. FILTER SECTION (The New Checkboxes)
     # ---------------------------------------------------------
+    # Syndicates: detected once per graph version (refined incrementally after ingests)
+    communities = get_community_lookup(gm.driver)
+    syndicates = communities.summary() if communities else []
+
     with st.expander("🔻 Graph Filters", expanded=True):
         f1, f2, f3, f4 = st.columns(4)
         with f1: show_cases = st.checkbox("🛡️ Cases", value=True)
         with f2: show_people = st.checkbox("👤 Suspects", value=True)
         with f3: show_vehicles = st.checkbox("🚗 Vehicles", value=True)
         with f4: show_phones = st.checkbox("📞 Phones", value=True)
+        syndicate_labels = {
+            f"#{i} · {s['size']} entities · {', '.join(s['members']) or 'no suspects'}": s["community"]
+            for i, s in enumerate(syndicates, 1)
+        }
+        syndicate_choice = st.selectbox("🕸️ Syndicate", ["All"] + list(syndicate_labels))
+        syndicate = syndicate_labels.get(syndicate_choice)
 
     # ---------------------------------------------------------
     # 3. DATA FETCHING & FILTERING LOGIC
     # ---------------------------------------------------------
     # A. Fetch Raw Data
-    raw_elements = get_cytoscape_elements(gm.driver, focus_fir_id=focus_case)
+    raw_elements = get_cytoscape_elements(gm.driver, focus_fir_id=focus_case, communities=communities)
     
     # B. Define Allowed Types
     allowed_types = []
@@ -450,7 +476,8 @@ elif selected == "Investigation Board":
         if 'source' not in el['data']: # It's a Node
             node_type = el['data'].get('type', 'Unknown')
             # Check if type is allowed (Safe fallback: if unknown, show it)
-            if node_type in allowed_types or node_type == "Unknown":
+            in_syndicate = syndicate is None or el['data'].get('community') == syndicate
+            if (node_type in allowed_types or node_type == "Unknown") and in_syndicate:
                 filtered_elements.append(el)
                 visible_node_ids.add(el['data']['id'])
     
@@ -491,8 +518,11 @@ elif selected == "Investigation Board":
             import pandas as pd
             from src.analytics.ranker import generate_suspect_ranking
             
-            # Run Analysis
-            analysis_data = generate_suspect_ranking(gm.driver, focus_fir_id=focus_case)
+            # Run Analysis (stored risk scores by default; deep mode caches whole-graph signals per graph version)
+            r1, r2 = st.columns([3, 1])
+            with r1: top_k = st.slider("Suspects to rank", min_value=5, max_value=50, value=10, step=5)
+            with r2: deep = st.checkbox("🧠 Deep graph analysis", help="PageRank, brokerage and case bridging over the whole graph.")
+            analysis_data = generate_suspect_ranking(gm.driver, focus_fir_id=focus_case, top_k=top_k, deep=deep)
             
             if analysis_data:
                 # Display as a clean interactive table
@@ -508,8 +538,8 @@ elif selected == "Investigation Board":
                             "Risk Score", 
                             format="%d", 
                             min_value=0, 
-                            max_value=200,
-                            help="Calculated based on cross-case links and asset control."
+                            max_value=100,
+                            help="Cross-case links, assets, call fan-in/out and money received (deep mode: bridging, PageRank, brokerage); see the breakdown in AI Reasoning."
                         ),
                         "Intelligence Insights": st.column_config.TextColumn("AI Reasoning", width="large"),
                     }
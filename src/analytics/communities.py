@@ -0,0 +1,165 @@
+import time
+import threading
+
+import numpy as np
+
+from src.analytics.graph_engine import get_snapshot, LABELS
+
+LPA_MAX_ROUNDS = 60
+# A run has converged once fewer than this share of a round's nodes could still change label
+LPA_TOLERANCE = 1e-3
+# Refinement only revisits the neighbourhood of changed nodes unless more than this share changed
+REFINE_MAX_SHARE = 0.3
+# Smaller groups (a lone phone and its owner) are not shown as syndicates
+MIN_COMMUNITY_SIZE = 3
+
+
+def _most_common_labels(adjacency, labels, nodes, rng):
+    """
+    (best, settled) for `nodes`: a label each sees most often among its neighbours,
+    ties broken at random, and whether its current label already is one of those.
+    """
+    rows = adjacency[nodes]
+    owner = np.repeat(np.arange(nodes.size, dtype=np.int64), np.diff(rows.indptr))
+    width = int(labels.max()) + 1
+    pairs, counts = np.unique(owner * width + labels[rows.indices], return_counts=True)
+    pair_owner, pair_label = pairs // width, pairs % width
+    # pairs are sorted by owner: one reduceat segment per node
+    starts = np.flatnonzero(np.r_[True, pair_owner[1:] != pair_owner[:-1]])
+    sizes = np.diff(np.r_[starts, pairs.size])
+    current = labels[nodes]
+
+    is_current = pair_label == current[pair_owner]
+    current_count = np.zeros(nodes.size, dtype=counts.dtype)
+    current_count[pair_owner[is_current]] = counts[is_current]
+    settled = np.ones(nodes.size, dtype=bool)
+    settled[pair_owner[starts]] = current_count[pair_owner[starts]] == np.maximum.reduceat(counts, starts)
+
+    # Random jitter < 1 only reorders labels with equal counts
+    score = counts + 0.5 * rng.random(pairs.size)
+    winner = score == np.repeat(np.maximum.reduceat(score, starts), sizes)
+    best = current.copy()
+    best[pair_owner[winner]] = pair_label[winner]
+    return best, settled
+
+
+def label_propagation(adjacency, labels, active, max_rounds=LPA_MAX_ROUNDS, seed=0):
+    """
+    Semi-synchronous label propagation restricted to `active` nodes (others keep their
+    labels). Each round a random half of the active nodes adopts its neighbours' most
+    common label, which avoids the oscillation of fully synchronous updates. Stops
+    once almost every node's label is among its most common ones (Raghavan et al.).
+    Updates labels in place and returns the number of rounds run.
+    """
+    rng = np.random.default_rng(seed)
+    degree = np.diff(adjacency.indptr)
+    active = active[degree[active] > 0]
+    if not active.size: return 0
+    quiet = 0
+    for rounds in range(1, max_rounds + 1):
+        batch = active[rng.random(active.size) < 0.5]
+        if not batch.size: continue
+        labels[batch], settled = _most_common_labels(adjacency, labels, batch, rng)
+        # Two settled rounds in a row: both random halves agree with their neighbours
+        quiet = quiet + 1 if (~settled).sum() <= LPA_TOLERANCE * batch.size else 0
+        if quiet >= 2: break
+    return rounds
+
+
+class Communities:
+    """Community id per snapshot node, with the syndicate summaries the UI shows."""
+
+    def __init__(self, snapshot, labels, mode, seconds):
+        self.snapshot = snapshot
+        self.labels = labels
+        self.mode = mode
+        self.seconds = seconds
+        ids, sizes = np.unique(labels, return_counts=True)
+        self._sizes = dict(zip(ids.tolist(), sizes.tolist()))
+        self._largest = sorted((c for c, size in self._sizes.items() if size >= MIN_COMMUNITY_SIZE),
+                               key=lambda c: -self._sizes[c])
+        self._summary = []
+        self._lock = threading.Lock()
+
+    def size(self, community):
+        return self._sizes.get(community, 0)
+
+    def of(self, element_id):
+        """Community id of a node, or None if it is unknown or in a group too small to matter."""
+        idx = self.snapshot.index.get(element_id)
+        if idx is None: return None
+        community = int(self.labels[idx])
+        return community if self._sizes[community] >= MIN_COMMUNITY_SIZE else None
+
+    def summary(self, limit=25):
+        """Largest communities first: [{community, size, people, cases, members}]."""
+        with self._lock:
+            # Rows are built once each; a larger limit only summarizes the communities not seen yet
+            if len(self._summary) < limit:
+                self._summary.extend(self._summarize(self._largest[len(self._summary):limit]))
+            return self._summary[:limit]
+
+    def _summarize(self, largest):
+        snapshot = self.snapshot
+        person, case = LABELS.index("Person"), LABELS.index("Case")
+        degree = np.diff(snapshot.adjacency.indptr)
+        rows = []
+        for community in largest:
+            members = np.flatnonzero(self.labels == community)
+            people = members[snapshot.labels[members] == person]
+            cases = members[snapshot.labels[members] == case]
+            # Best-connected people name the syndicate
+            leaders = people[np.argsort(-degree[people], kind="stable")][:3]
+            rows.append({
+                "community": community,
+                "size": int(members.size),
+                "people": int(people.size),
+                "cases": sorted(str(snapshot.names[i]) for i in cases),
+                "members": [str(snapshot.names[i]) for i in leaders],
+            })
+        return rows
+
+
+_previous = None
+_previous_lock = threading.Lock()
+
+def detect_communities(snapshot, previous=None):
+    """
+    Label propagation over the snapshot's adjacency. With the communities of an earlier
+    snapshot, known nodes start from their old labels and only new nodes, nodes whose
+    degree changed and their neighbours are re-propagated; a full run otherwise.
+    """
+    started = time.monotonic()
+    n = len(snapshot)
+    labels = np.arange(n, dtype=np.int64)
+    active, mode = np.arange(n), "full"
+
+    if previous is not None:
+        old = previous.snapshot
+        old_idx = np.fromiter((old.index.get(node_id, -1) for node_id in snapshot.ids), dtype=np.int64, count=n)
+        known = old_idx >= 0
+        degree, old_degree = np.diff(snapshot.adjacency.indptr), np.diff(old.adjacency.indptr)
+        changed = np.flatnonzero(~known | (degree != np.where(known, old_degree[old_idx], -1)))
+        if changed.size <= REFINE_MAX_SHARE * n:
+            # New nodes get fresh ids above every old label, so old ids (and colours) stay stable
+            labels[known] = previous.labels[old_idx[known]]
+            labels[~known] = int(previous.labels.max(initial=-1)) + 1 + np.arange(int((~known).sum()))
+            active, mode = snapshot.neighbourhood(changed, 1), "refined"
+
+    rounds = label_propagation(snapshot.adjacency, labels, active)
+    result = Communities(snapshot, labels, mode, time.monotonic() - started)
+    print(f"[ANALYTICS] Communities ({mode}, {active.size} active nodes, {rounds} rounds) "
+          f"in {result.seconds:.1f}s", flush=True)
+    return result
+
+
+def get_communities(driver):
+    """Communities of the current graph version, refined from the previous version's when possible."""
+    global _previous
+    snapshot = get_snapshot(driver)
+    with _previous_lock:
+        previous = _previous if _previous is not None and _previous.snapshot is not snapshot else None
+    communities = snapshot.memo("communities", lambda s: detect_communities(s, previous))
+    with _previous_lock:
+        _previous = communities
+    return communities
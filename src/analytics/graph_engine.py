@@ -0,0 +1,187 @@
+import os
+import time
+import threading
+from array import array
+
+import numpy as np
+import scipy.sparse as sp
+
+# Node labels the analytics distinguish; anything else is coded -1
+LABELS = ("Case", "Person", "Phone", "Vehicle", "Transaction", "Evidence")
+# Analyst-review edges that are not evidence of contact
+SKIP_REL_TYPES = ["POSSIBLE_SAME_AS"]
+EXPORT_FETCH_SIZE = 10000
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOL = 1e-6
+PAGERANK_MAX_ITER = 100
+# BFS sources for approximate betweenness; error falls with sqrt(samples)
+BETWEENNESS_SAMPLES = int(os.getenv("BETWEENNESS_SAMPLES", "16"))
+
+
+def graph_version(driver):
+    """Write counter GraphManager bumps after every committed change (0 before the first)."""
+    with driver.session() as session:
+        return session.run("OPTIONAL MATCH (m:GraphMeta {id: 'graph'}) RETURN coalesce(m.version, 0)").single()[0]
+
+
+class GraphSnapshot:
+    """
+    Whole graph as sparse matrices: node i is ids[i] (elementId) with labels[i] (index
+    into LABELS) and names[i] (name, Case id or number). `directed` keeps edge direction,
+    `adjacency` is its symmetric binary form. Derived results (rankings, communities)
+    are memoized on the snapshot, so they live exactly as long as this graph version.
+    """
+
+    def __init__(self, version, ids, labels, names, src, dst):
+        self.version = version
+        self.ids = ids
+        self.names = names
+        self.labels = np.asarray(labels, dtype=np.int8)
+        self.index = {node_id: i for i, node_id in enumerate(ids)}
+        n = len(ids)
+
+        src, dst = np.frombuffer(src, dtype=np.int32), np.frombuffer(dst, dtype=np.int32)
+        keep = src != dst
+        directed = sp.csr_matrix((np.ones(int(keep.sum()), dtype=np.float32), (src[keep], dst[keep])), shape=(n, n))
+        directed.sum_duplicates()
+        directed.data[:] = 1
+        adjacency = (directed + directed.T).tocsr()
+        adjacency.data[:] = 1
+        self.directed, self.adjacency = directed, adjacency
+
+        self.cases = self.nodes("Case")
+        self.case_index = {names[i]: i for i in self.cases if names[i]}
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nodes(self, label):
+        return np.flatnonzero(self.labels == LABELS.index(label))
+
+    def neighbourhood(self, seeds, hops):
+        """Sorted indices of every node within `hops` undirected steps of seeds (seeds included)."""
+        seen = np.zeros(len(self), dtype=bool)
+        frontier = np.asarray(seeds, dtype=np.int64)
+        seen[frontier] = True
+        for _ in range(hops):
+            if not frontier.size: break
+            reached = np.unique(self.adjacency[frontier].indices)
+            frontier = reached[~seen[reached]]
+            seen[frontier] = True
+        return np.flatnonzero(seen)
+
+    def memo(self, name, compute):
+        """compute(snapshot) once per snapshot; concurrent callers wait for the first."""
+        with self._lock:
+            if name not in self._memo:
+                self._memo[name] = compute(self)
+            return self._memo[name]
+
+
+def export_graph(driver, version=None):
+    """Streams every node and relationship out of Neo4j into a GraphSnapshot."""
+    started = time.monotonic()
+    ids, labels, names = [], array('b'), []
+    codes = {label: i for i, label in enumerate(LABELS)}
+    src, dst = array('i'), array('i')
+    with driver.session(fetch_size=EXPORT_FETCH_SIZE) as session:
+        for node_id, node_labels, name in session.run(
+                "MATCH (n) WHERE NOT n:GraphMeta RETURN elementId(n), labels(n), coalesce(n.name, n.id, n.number)"):
+            ids.append(node_id)
+            labels.append(next((codes[l] for l in node_labels if l in codes), -1))
+            names.append(name)
+        index = {node_id: i for i, node_id in enumerate(ids)}
+        for s, t in session.run(
+                "MATCH (s)-[r]->(t) WHERE NOT type(r) IN $skip RETURN elementId(s), elementId(t)",
+                skip=SKIP_REL_TYPES):
+            # Nodes written after the first query are not in this snapshot
+            s, t = index.get(s), index.get(t)
+            if s is not None and t is not None:
+                src.append(s)
+                dst.append(t)
+    snapshot = GraphSnapshot(version, ids, labels, names, src, dst)
+    print(f"[ANALYTICS] Exported {len(ids)} nodes / {len(src)} edges in {time.monotonic() - started:.1f}s", flush=True)
+    return snapshot
+
+
+_snapshot = None
+_export_lock = threading.Lock()
+
+def get_snapshot(driver):
+    """The process-wide snapshot, re-exported only when the graph version changed."""
+    global _snapshot
+    version = graph_version(driver)
+    with _export_lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = export_graph(driver, version)
+        return _snapshot
+
+
+def pagerank(matrix, damping=PAGERANK_DAMPING, tol=PAGERANK_TOL, max_iter=PAGERANK_MAX_ITER):
+    """Power iteration over a row-per-source adjacency; dangling nodes spread their rank evenly."""
+    n = matrix.shape[0]
+    if n == 0: return np.zeros(0)
+    out_degree = np.asarray(matrix.sum(axis=1)).ravel()
+    dangling = out_degree == 0
+    inv = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    transition = (sp.diags(inv) @ matrix).T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        new = damping * (transition @ rank) + (damping * rank[dangling].sum() + 1.0 - damping) / n
+        delta = np.abs(new - rank).sum()
+        rank = new
+        if delta < tol: break
+    return rank
+
+
+def sampled_betweenness(adjacency, samples=BETWEENNESS_SAMPLES, seed=0):
+    """
+    Brandes betweenness from `samples` random BFS sources, scaled to the full graph.
+    Each BFS level is one sparse row slice, so a source costs O(edges) in numpy.
+    """
+    n = adjacency.shape[0]
+    scores = np.zeros(n)
+    candidates = np.flatnonzero(np.diff(adjacency.indptr))
+    if not candidates.size: return scores
+    rng = np.random.default_rng(seed)
+    sources = rng.choice(candidates, size=min(samples, candidates.size), replace=False)
+
+    for s in sources:
+        dist = np.full(n, -1, dtype=np.int32)
+        sigma = np.zeros(n)
+        dist[s], sigma[s] = 0, 1.0
+        levels = [np.array([s])]
+        while True:
+            frontier = levels[-1]
+            rows = adjacency[frontier]
+            # Shortest-path counts flow from each frontier node to its unvisited neighbours
+            weights = np.repeat(sigma[frontier], np.diff(rows.indptr))
+            counts = np.bincount(rows.indices, weights=weights, minlength=n)
+            reached = np.flatnonzero((counts > 0) & (dist < 0))
+            if not reached.size: break
+            dist[reached] = len(levels)
+            sigma[reached] = counts[reached]
+            levels.append(reached)
+
+        delta = np.zeros(n)
+        coef = np.zeros(n)
+        for depth in range(len(levels) - 1, 0, -1):
+            coef[:] = 0
+            coef[levels[depth]] = (1.0 + delta[levels[depth]]) / sigma[levels[depth]]
+            parents = levels[depth - 1]
+            delta[parents] = sigma[parents] * (adjacency[parents] @ coef)
+        delta[s] = 0
+        scores += delta
+
+    # Isolated nodes contribute nothing as sources, so scale by the connected ones
+    return scores * (candidates.size / len(sources))
+
+
+def percentile(values):
+    """Share of values strictly below each value: 0 for the minimum, ties share a rank."""
+    if len(values) < 2: return np.zeros(len(values))
+    order = np.sort(values)
+    return np.searchsorted(order, values, side="left") / (len(values) - 1)
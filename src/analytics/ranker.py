@@ -1,87 +1,196 @@
-import pandas as pd
+import numpy as np
+import scipy.sparse as sp
 
-def generate_suspect_ranking(driver, focus_fir_id="Show All"):
+from src.analytics.graph_engine import (
+    get_snapshot, pagerank, sampled_betweenness, percentile, LABELS
+)
+from src.utils.risk_features import risk_breakdown, RISK_NAMES
+
+# Points (out of 100) each signal contributes at its maximum
+SIGNAL_WEIGHTS = {
+    "cross_case": 40,   # named in several cases
+    "bridge": 20,       # reaches other cases through shared phones, vehicles or contacts
+    "pagerank": 15,     # receives calls / evidence from well-connected entities
+    "betweenness": 15,  # sits on shortest paths between groups (broker)
+    "degree": 10,       # raw number of connections
+}
+SIGNAL_NAMES = {
+    "cross_case": "cross-case", "bridge": "bridge", "pagerank": "PageRank",
+    "betweenness": "brokerage", "degree": "degree",
+}
+# Extra cases at which the case signals are maxed out
+CASE_SATURATION = 3
+TOP_PERCENTILE = 0.9
+
+def person_signals(snapshot):
     """
-    Analyzes graph topology to rank suspects based on centrality and risk.
-    Returns a list of dicts: [{Rank, Name, Score, Reasoning}]
+    Every ranking signal for every Person, computed in one vectorized pass over the
+    snapshot. Memoized per graph version, so a board render only slices these arrays.
     """
-    rankings = []
-    if not driver: return []
-    
-    # QUERY LOGIC:
-    # We score Person nodes based on:
-    # 1. Connectivity (Degree)
-    # 2. Cross-Case Links (Critical)
-    # 3. Asset Sharing (Phone/Vehicle hubs)
-
-    # Note: Case nodes use the 'id' property for the FIR number.
-    if focus_fir_id == "Show All":
-        match_clause = "MATCH (p:Person)"
-        params = {}
+    adjacency = snapshot.adjacency
+    people = snapshot.nodes("Person")
+    rows = adjacency[people]
+
+    # Case membership of every node: its neighbours that are Case nodes
+    membership = sp.csr_matrix(
+        (np.ones(len(snapshot.cases)), (snapshot.cases, np.arange(len(snapshot.cases)))),
+        shape=(len(snapshot), len(snapshot.cases)))
+    direct = (adjacency @ membership).tocsr()
+    direct.data[:] = 1
+    own = direct[people]
+    # Cases reachable in one more hop: via the person's phones, vehicles and call partners
+    reach = (rows @ direct + own).tocsr()
+    case_count = own.getnnz(axis=1)
+    bridge = reach.getnnz(axis=1) - case_count
+
+    is_asset = ~np.isin(snapshot.labels, [LABELS.index("Case"), LABELS.index("Person")])
+    asset_count = rows @ is_asset.astype(np.float64)
+    degree = rows.getnnz(axis=1)
+    pr = pagerank(snapshot.directed)[people]
+    bc = sampled_betweenness(adjacency)[people]
+
+    components = {
+        "cross_case": np.minimum(1.0, np.maximum(case_count - 1, 0) / CASE_SATURATION),
+        "bridge": np.minimum(1.0, bridge / CASE_SATURATION),
+        "pagerank": percentile(pr),
+        "betweenness": np.where(bc > 0, percentile(bc), 0.0),
+        "degree": percentile(degree),
+    }
+    score = sum(SIGNAL_WEIGHTS[name] * value for name, value in components.items())
+
+    position = np.full(len(snapshot), -1, dtype=np.int64)
+    position[people] = np.arange(len(people))
+    return {
+        "people": people, "position": position, "own_cases": own,
+        "case_count": case_count, "bridge": bridge, "asset_count": asset_count.astype(int),
+        "components": components, "score": score,
+        "order": np.argsort(-score, kind="stable"),
+    }
+
+def rank_people(snapshot, focus_case=None, top_k=10):
+    """Row numbers into person_signals, best first; focus_case limits to people within 2 hops of it."""
+    signals = snapshot.memo("person_signals", person_signals)
+    if focus_case is None:
+        return signals, signals["order"][:top_k]
+    case_node = snapshot.case_index.get(focus_case)
+    if case_node is None:
+        return signals, np.array([], dtype=np.int64)
+    near = signals["position"][snapshot.neighbourhood([case_node], 2)]
+    near = near[near >= 0]
+    return signals, near[np.argsort(-signals["score"][near], kind="stable")][:top_k]
+
+def explain(snapshot, signals, row):
+    """Insight lines for one ranked person, ending with the score breakdown."""
+    case_count, bridge, assets = signals["case_count"][row], signals["bridge"][row], signals["asset_count"][row]
+    cases = [snapshot.names[snapshot.cases[j]] for j in signals["own_cases"][row].indices]
+    components = {name: value[row] for name, value in signals["components"].items()}
+
+    reasons = []
+    if case_count > 1:
+        reasons.append(f"🔥 **High Risk:** Linked to {case_count} Cases ({', '.join(sorted(map(str, cases))[:5])})")
+    elif case_count == 1:
+        reasons.append(f"Linked to Case {cases[0]}")
+    if bridge > 0:
+        reasons.append(f"🌉 Reaches {bridge} other case(s) through shared phones, vehicles or contacts")
+    if components["pagerank"] >= TOP_PERCENTILE:
+        reasons.append(f"📡 Top {max(1, round((1 - components['pagerank']) * 100))}% by PageRank")
+    if components["betweenness"] >= TOP_PERCENTILE:
+        reasons.append(f"🔀 Broker between groups (top {max(1, round((1 - components['betweenness']) * 100))}% betweenness)")
+    if assets > 0:
+        reasons.append(f"🔗 Connected to {assets} Assets (Phone/Vehicle)")
+
+    breakdown = " + ".join(f"{SIGNAL_NAMES[name]} {SIGNAL_WEIGHTS[name] * value:.0f}"
+                           for name, value in components.items() if SIGNAL_WEIGHTS[name] * value >= 0.5)
+    if breakdown: reasons.append(f"Score = {breakdown}")
+    return reasons
+
+# Stored features maintained by GraphManager.refresh_risk_scores(); the global list is an
+# index-ordered read on Person.risk_score, a focus case only sorts its own people
+TOP_RISK_QUERY = """
+{match_clause}
+WITH p ORDER BY p.risk_score DESC LIMIT $top_k
+RETURN p.name AS name, p.risk_score AS risk_score, p.case_count AS case_count, p.asset_count AS asset_count,
+       p.call_fan_in AS call_fan_in, p.call_fan_out AS call_fan_out, p.txn_volume AS txn_volume,
+       [(p)--(c:Case) | c.id] AS cases
+"""
+
+def stored_risk_ranking(driver, focus_case=None, top_k=10):
+    """Top-K people by their incrementally maintained risk_score, with the features behind it."""
+    if focus_case is None:
+        match_clause = "MATCH (p:Person) WHERE p.risk_score IS NOT NULL"
     else:
-        # Focus Mode: People connected to the target FIR cluster (recursive)
-        # We use a shorter hop (1..2) for ranking relevance
-        match_clause = "MATCH (target:Case {id: $fir_id})-[:HAS_SUSPECT|INVOLVED_VEHICLE|LINKED_PHONE|PART_OF|LINKED_TO|CALLED|SENT_TO*1..2]-(p:Person)"
-        params = {"fir_id": focus_fir_id}
-
-    query = f"""
-    {match_clause}
-    
-    // 1. Calculate connectivity details
-    WITH distinct p
-    OPTIONAL MATCH (p)-[:HAS_SUSPECT|INVOLVED_VEHICLE|LINKED_PHONE|PART_OF|LINKED_TO]-(c:Case)
-    WITH p, collect(distinct c.id) as cases, count(distinct c) as case_count
-    
-    OPTIONAL MATCH (p)-[r]-(asset) 
-    WHERE NOT asset:Case AND NOT asset:Person
-    WITH p, cases, case_count, count(distinct asset) as asset_count
-    
-    // 2. SCORING ALGORITHM
-    // Base Score: 10
-    // +50 points for every EXTRA case (Cross-Case Link)
-    // +10 points for every Asset (Phone/Car)
-    WITH p, cases, case_count, asset_count,
-         (10 + ((case_count - 1) * 50) + (asset_count * 10)) as score
-    
-    WHERE score > 0
-    RETURN p.name as name, cases, case_count, asset_count, score
-    ORDER BY score DESC LIMIT 5
+        match_clause = """
+        MATCH (:Case {id: $fir_id})-[:HAS_SUSPECT|INVOLVED_VEHICLE|LINKED_PHONE|PART_OF|LINKED_TO|CALLED|SENT_TO*1..2]-(p:Person)
+        WITH DISTINCT p WHERE p.risk_score IS NOT NULL"""
+    with driver.session() as session:
+        return session.execute_read(lambda tx: tx.run(
+            TOP_RISK_QUERY.format(match_clause=match_clause), fir_id=focus_case, top_k=top_k).data())
+
+def has_unscored_people(driver):
+    """Whether some person still waits for a first score (indexed risk_dirty lookup)."""
+    with driver.session() as session:
+        return session.execute_read(lambda tx: tx.run(
+            "MATCH (p:Person) WHERE p.risk_dirty = true AND p.risk_score IS NULL RETURN p LIMIT 1").peek() is not None)
+
+def explain_features(row):
+    """Insight lines for one person's stored features, ending with the score breakdown."""
+    case_count, assets = row["case_count"] or 0, row["asset_count"] or 0
+    calls = (row["call_fan_in"] or 0) + (row["call_fan_out"] or 0)
+    cases = sorted(str(c) for c in set(row["cases"]) if c)
+
+    reasons = []
+    if case_count > 1:
+        reasons.append(f"🔥 **High Risk:** Linked to {case_count} Cases ({', '.join(cases[:5])})")
+    elif case_count == 1 and cases:
+        reasons.append(f"Linked to Case {cases[0]}")
+    if assets > 0:
+        reasons.append(f"🔗 Connected to {assets} Assets (Phone/Vehicle)")
+    if calls > 0:
+        reasons.append(f"📞 Calls with {calls} numbers ({row['call_fan_in'] or 0} in / {row['call_fan_out'] or 0} out)")
+    if row["txn_volume"]:
+        reasons.append(f"💰 Received ₹{row['txn_volume']:,.0f}")
+
+    breakdown = " + ".join(f"{RISK_NAMES[name]} {points:.0f}" for name, points in risk_breakdown(row).items() if points >= 0.5)
+    if breakdown: reasons.append(f"Score = {breakdown}")
+    return reasons
+
+def deep_ranking(driver, focus_case=None, top_k=10):
+    """Ranking rows from the full graph engine (PageRank, sampled betweenness, bridging)."""
+    snapshot = get_snapshot(driver)
+    signals, rows = rank_people(snapshot, focus_case, top_k)
+    return [(snapshot.names[signals["people"][row]], signals["score"][row], explain(snapshot, signals, row))
+            for row in rows]
+
+def generate_suspect_ranking(driver, focus_fir_id="Show All", top_k=10, deep=False):
+    """
+    Ranks suspects on a 0-100 score with its breakdown. By default this reads the
+    stored per-person risk features (kept current by each ingest); deep=True ranks on
+    whole-graph signals (cross-case links, bridging, PageRank, sampled betweenness,
+    degree), which costs a graph export whenever the data changed.
+    Returns a list of dicts: [{Rank, Suspect, Risk Score, Intelligence Insights}]
     """
-    
+    if not driver: return []
+    focus = None if focus_fir_id == "Show All" else focus_fir_id
+
     try:
-        with driver.session() as session:
-            result = session.run(query, params)
-            
-            rank = 1
-            for row in result:
-                name = row['name'] or "Unknown Suspect"
-                cases = row['cases']
-                case_count = row['case_count']
-                score = row['score']
-                
-                # REASONING GENERATOR
-                reasons = []
-                if case_count > 1:
-                    reasons.append(f"🔥 **High Risk:** Linked to {case_count} Cases ({', '.join(cases)})")
-                elif case_count == 1:
-                    reasons.append(f"Linked to Case {cases[0]}")
-                
-                if row['asset_count'] > 0:
-                    reasons.append(f"🔗 Connected to {row['asset_count']} Assets (Phone/Vehicle)")
-                
-                # Icon assignment
-                icon = "🥇" if rank == 1 else ("🥈" if rank == 2 else "🥉" if rank == 3 else f"{rank}.")
-                
-                rankings.append({
-                    "Rank": icon,
-                    "Suspect": name,
-                    "Risk Score": score,
-                    "Intelligence Insights": " | ".join(reasons)
-                })
-                rank += 1
-                
+        # Stored scores would leave out people not scored yet (graphs loaded before risk features)
+        deep = deep or has_unscored_people(driver)
+        ranked = [] if deep else [(row["name"], row["risk_score"], explain_features(row))
+                                  for row in stored_risk_ranking(driver, focus, top_k)]
+        if not ranked:
+            ranked = deep_ranking(driver, focus, top_k)
     except Exception as e:
         print(f"Ranking Error: {e}")
         return []
 
+    rankings = []
+    for rank, (name, score, reasons) in enumerate(ranked, 1):
+        # Icon assignment
+        icon = "🥇" if rank == 1 else ("🥈" if rank == 2 else "🥉" if rank == 3 else f"{rank}.")
+        rankings.append({
+            "Rank": icon,
+            "Suspect": name or "Unknown Suspect",
+            "Risk Score": int(round(score)),
+            "Intelligence Insights": " | ".join(reasons)
+        })
     return rankings
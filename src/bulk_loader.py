@@ -3,122 +3,275 @@ import zipfile
 import shutil
 import tempfile
 from src.graph_manager import GraphManager
-from src.processors.fir_processor import process_fir
-from src.processors.cdr_processor import process_cdr
-from src.processors.cctv_processor import process_cctv
+from src.processors.registry import get_processor
+from src.processors.router import open_routed
+from src.ingest_scheduler import plan_files
+from src.ingest_state import IngestState, Checkpoint, CsvDelta, archive_fingerprint, get_ingest_state, stream_key
 
-def load_evidence_db(db_folder="Evidence_DB"):
+def ingest_file(gm, file_path, case_id=None, sniff=None, handle=None, checkpoint=None, delta=True):
+    """
+    Routes one file by content and writes its entities to the graph.
+    Returns {"kind", "rows", "linked", "error"}. CCTV stills are not handled here;
+    callers collect them and use ingest_images so burst frames are deduped together.
+    With a checkpoint, CDR/bank rows are written in checkpointed batches and a
+    partially loaded file continues after its last committed batch.
+    With delta (default), a CDR/bank file seen before for this case is only read
+    from where the last load stopped; delta=False re-reads it in full.
+    """
+    filename = os.path.basename(file_path)
+    own_handle = handle is None
+    if own_handle:
+        if sniff is None:
+            handle, sniff = open_routed(file_path)
+        else:
+            handle = open(file_path, 'rb')
+
+    result = {"kind": sniff["kind"], "rows": 0, "linked": False, "error": None}
+    try:
+        kind = sniff["kind"]
+
+        # FIR (Text/PDF) - the FIR path needs the file on disk (PDF workers, cache keys)
+        if kind == "fir":
+            data = get_processor("fir")(file_path)
+            if "error" not in data:
+                if case_id:
+                    # Add case_id to the data for the new CCTNS system
+                    data['fir_id'] = case_id
+                if gm: gm.add_fir_data(data)
+                if checkpoint: checkpoint.finish(file_path, 1)
+                result.update(rows=1, linked=True)
+            else:
+                result["error"] = f"FIR Error: {data['error']}"
+
+        # CSV - processors read straight from the handle the router already opened
+        elif kind in ("bank", "cdr"):
+            tracker = None
+            if delta and gm:
+                tracker = CsvDelta(get_ingest_state(), stream_key(case_id, kind, file_path), handle)
+                if not tracker.has_new_rows():
+                    print(f"   ↳ [DELTA] {filename}: no new rows since last load.", flush=True)
+                    if checkpoint: checkpoint.finish(file_path)
+                    result["linked"] = True
+                    return _report(filename, result)
+                if tracker.start:
+                    print(f"   ↳ [DELTA] {filename}: reading {tracker.size - tracker.start} appended bytes "
+                          f"({tracker.rows_before} rows already loaded).", flush=True)
+            byte_range = tracker.byte_range if tracker else None
+
+            if kind == "bank":
+                print(f"   ↳ [INTERNAL] Detected BANK Statement structure...", flush=True)
+                data = get_processor("bank")(handle, sniff=sniff, byte_range=byte_range)
+                # Data is dict: {'account_holder':..., 'transactions': [...]}
+                rows = data.get('transactions', [])
+                write = lambda chunk: gm.add_bank_data({**data, 'transactions': chunk}, link_to_case_id=case_id)
+                empty_error = data.get('error') or "No valid transactions found"
+            else:
+                print(f"   ↳ [INTERNAL] Detected CDR structure...", flush=True)
+                rows = get_processor("cdr")(handle, sniff=sniff, byte_range=byte_range) # Returns list
+                write = lambda chunk: gm.add_cdr_data(chunk, link_to_case_id=case_id)
+                empty_error = "No valid call records found"
+
+            if rows:
+                if checkpoint:
+                    _, start = checkpoint.progress(file_path)
+                    if start: print(f"   ↳ [RESUME] {filename}: skipping {start} already committed rows", flush=True)
+                    checkpoint.write_batches(file_path, rows, write, start=start)
+                elif gm:
+                    write(rows)
+                if tracker:
+                    # The consumed offset must not run ahead of queued (write-behind) writes
+                    gm.flush()
+                    tracker.commit(len(rows))
+                result.update(rows=len(rows), linked=True)
+            else:
+                result["error"] = empty_error
+
+        # CCTV (Video clips) - the router recognised the container, whatever the extension
+        elif kind == "video":
+            data = get_processor("cctv_video")(file_path)
+            if data.get('status') != 'error':
+                if gm: gm.add_cctv_data(data, link_to_case_id=case_id)
+                if checkpoint: checkpoint.finish(file_path)
+                result.update(rows=len(data.get('sightings', [])), linked=True)
+            else:
+                result["error"] = f"Video Error: {data.get('error')}"
+
+        else:
+            result["error"] = f"Unknown format ({kind})"
+
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        if own_handle:
+            handle.close()
+
+    return _report(filename, result)
+
+def _report(filename, result):
+    if result["linked"]:
+        print(f"✅ [SUCCESS] {filename} ({result['kind']}) processed and linked.", flush=True)
+    else:
+        print(f"⚠️ [SKIP] {filename}: {result['error']}", flush=True)
+    return result
+
+def ingest_images(gm, image_paths, case_id=None, checkpoint=None):
+    """Scans CCTV stills as one batch (near-duplicate frames OCR'd once). Returns per-image results."""
+    results = []
+    for data in get_processor("cctv_batch")(image_paths):
+        filename = os.path.basename(data.get('source') or '')
+        result = {"kind": "cctv", "rows": 0, "linked": False, "error": data.get('error')}
+        if data.get('status') != 'error':
+            try:
+                if gm: gm.add_cctv_data(data, link_to_case_id=case_id)
+                if checkpoint: checkpoint.finish(data.get('source'))
+                result.update(rows=1, linked=True)
+                print(f"✅ [SUCCESS] {filename} processed and linked.", flush=True)
+            except Exception as e:
+                result["error"] = str(e)
+        if result["error"]:
+            print(f"❌ [ERROR] Failed to process {filename}: {result['error']}", flush=True)
+        results.append((data.get('source'), result))
+    return results
+
+def ingest_files(gm, file_paths, case_id=None, on_result=None, checkpoint=None, delta=True):
+    """
+    Ingests a list of extracted evidence files. Every file is sniffed once and the
+    scheduler orders the work so FIRs and small CDRs land before bank statements,
+    OCR and video; CCTV stills are scanned together as one batch.
+    on_result(file_path, result) is called after each file (progress reporting).
+    With a checkpoint, files already fully loaded are skipped.
+    Returns the list of (file_path, result).
+    """
+    results = []
+
+    def record(file_path, result):
+        results.append((file_path, result))
+        if on_result: on_result(file_path, result)
+
+    pending = []
+    for file_path in file_paths:
+        if checkpoint and checkpoint.progress(file_path)[0]:
+            print(f"⏭️ [RESUME] {os.path.basename(file_path)} already loaded.", flush=True)
+            continue
+        pending.append(file_path)
+
+    planned = plan_files(pending)
+    image_paths = [path for path, sniff in planned if sniff and sniff["kind"] == "cctv"]
+
+    for file_path, sniff in planned:
+        if sniff is None:
+            record(file_path, {"kind": "unknown", "rows": 0, "linked": False, "error": "File could not be opened"})
+            continue
+        if sniff["kind"] == "cctv":
+            # Stills sort together; the first one triggers the whole deduplicated batch
+            if image_paths:
+                for path, result in ingest_images(gm, image_paths, case_id=case_id, checkpoint=checkpoint):
+                    record(path, result)
+                image_paths = []
+            continue
+        print(f"⏳ [PROCESSING] {os.path.basename(file_path)}...", flush=True)
+        record(file_path, ingest_file(gm, file_path, case_id=case_id, sniff=sniff, checkpoint=checkpoint, delta=delta))
+
+    # FIRs may have named the owners of numbers whose calls were loaded earlier
+    if gm and any(r["kind"] == "fir" and r["linked"] for _, r in results):
+        try:
+            gm.relink_phones()
+        except Exception as e:
+            print(f"⚠️ [RELINK] Phone re-linking failed: {e}", flush=True)
+
+    # Risk features of every person this batch touched
+    if gm and any(r["linked"] for _, r in results):
+        try:
+            gm.refresh_risk_scores()
+        except Exception as e:
+            print(f"⚠️ [RISK] Risk score refresh failed: {e}", flush=True)
+
+    if checkpoint: checkpoint.sync()
+    return results
+
+def archive_complete(results):
+    """
+    True when an archive may be marked finished: every file loaded or was skipped as
+    an unsupported format. Files that failed for any other reason must retry on resume.
+    """
+    return all(not r["error"] or r["kind"] == "unknown" for _, r in results)
+
+def purge_case(gm, case_id, progress=None):
+    """
+    Deletes a case from the graph and forgets its archive/file checkpoints and CSV
+    offsets, so a corrected archive reloads in full (even with resume).
+    """
+    deleted = gm.purge_case(case_id, progress=progress)
+    get_ingest_state().reset_case(case_id)
+    return deleted
+
+def purge_all(gm, progress=None):
+    gm.clean_database(progress=progress)
+    get_ingest_state().reset()
+
+def walk_files(folder):
+    file_paths = []
+    for root, _, files in os.walk(folder):
+        for filename in files:
+            file_paths.append(os.path.join(root, filename))
+    return file_paths
+
+def load_evidence_db(db_folder="Evidence_DB", resume=False):
     """
     Scans the evidence_db folder for ZIP files (representing cases)
     and loads them into Neo4j with a Case ID linkage.
+    Progress is checkpointed per archive, per file and per CDR/bank batch; with
+    resume=True a rerun skips finished archives/files and continues partially
+    written files from their last committed batch.
     """
     if not os.path.exists(db_folder):
         return [f"❌ Error: Folder '{db_folder}' not found."]
 
-    gm = GraphManager()
+    gm = GraphManager(write_behind=True)
+    state = IngestState()
     logs = []
-    
+
     # scan for zip files
-    zip_files = [f for f in os.listdir(db_folder) if f.endswith('.zip')]
-    
+    zip_files = sorted(f for f in os.listdir(db_folder) if f.endswith('.zip'))
+
     if not zip_files:
         return ["⚠️ No ZIP case archives found in Evidence_DB."]
 
     for zip_name in zip_files:
         case_id = os.path.splitext(zip_name)[0]  # Case_2019_Robbery
         zip_path = os.path.join(db_folder, zip_name)
-        
+        archive_key = os.path.abspath(zip_path)
+        fingerprint = archive_fingerprint(zip_path)
+
+        if resume and state.archive_done(archive_key, fingerprint):
+            logs.append(f"⏭️ Skipped {case_id} (already loaded).")
+            continue
+
         logs.append(f"🔄 Processing Archive: {case_id}...")
-        
+        state.start_archive(archive_key, fingerprint, resume, case_id)
+
         # Create temp extraction folder
         with tempfile.TemporaryDirectory() as temp_dir:
             try:
                 with zipfile.ZipFile(zip_path, 'r') as zip_ref:
                     zip_ref.extractall(temp_dir)
-                
-                # Walk through extracted files
-                file_count = 0
-                for root, _, files in os.walk(temp_dir):
-                    for filename in files:
-                        file_path = os.path.join(root, filename)
-                        ext = filename.lower().split('.')[-1]
-                        
-                        print(f"⏳ [PROCESSING] {filename}...", flush=True)
-                        
-                        try:
-                            # FIR (Text/PDF)
-                            if ext in ['txt', 'pdf']:
-                                # process_fir now handles file reading internaly (expecting path)
-                                data = process_fir(file_path)
-                                
-                                if "error" not in data:
-                                    # Add case_id to the data for the new CCTNS system
-                                    data['fir_id'] = case_id
-                                    gm.add_fir_data(data)
-                                    file_count += 1
-                                    print(f"✅ [SUCCESS] {filename} processed and linked.", flush=True)
-                                else:
-                                    logs.append(f"   ⚠️ FIR Error in {filename}: {data['error']}")
-                                    print(f"⚠️ [WARNING] FIR Error in {filename}: {data['error']}", flush=True)
-                                
-                            # CSV (Smart Routing)
-                            elif ext == 'csv':
-                                # Check headers to decide which processor to use
-                                import pandas as pd
-                                try:
-                                    df_head = pd.read_csv(file_path, nrows=1)
-                                    # Normalize headers for checking
-                                    cols_str = " ".join([str(c).lower() for c in df_head.columns])
-                                    
-                                    # BANK CHECK
-                                    if 'amount' in cols_str or 'credit' in cols_str or 'debit' in cols_str or 'balance' in cols_str:
-                                        print(f"   ↳ [INTERNAL] Detected BANK Statement structure...", flush=True)
-                                        # Import here to avoid circular dependency if any? (Should be fine at top, but sticking to routine)
-                                        from src.processors.bank_processor import process_bank_statement
-                                        data = process_bank_statement(file_path)
-                                        
-                                        # Data is dict: {'account_holder':..., 'transactions': [...]}
-                                        txs = data.get('transactions', [])
-                                        if txs:
-                                            gm.add_bank_data(data, link_to_case_id=case_id)
-                                            file_count += 1
-                                            print(f"✅ [SUCCESS] {filename} (Bank) processed and linked.", flush=True)
-                                        else:
-                                            print(f"⚠️ [SKIP] No valid transactions found in {filename}.", flush=True)
-
-                                    # CDR CHECK
-                                    elif 'source' in cols_str or 'caller' in cols_str or 'origin' in cols_str or 'from' in cols_str:
-                                        print(f"   ↳ [INTERNAL] Detected CDR structure...", flush=True)
-                                        data = process_cdr(file_path) # Returns list
-                                        if data and len(data) > 0:
-                                            gm.add_cdr_data(data, link_to_case_id=case_id)
-                                            file_count += 1
-                                            print(f"✅ [SUCCESS] {filename} (CDR) processed and linked.", flush=True)
-                                        else:
-                                            print(f"⚠️ [SKIP] No valid call records found in {filename}.", flush=True)
-                                    
-                                    else:
-                                        print(f"⚠️ [SKIP] Unknown CSV format in {filename}. Skipping.", flush=True)
-                                        
-                                except Exception as csv_e:
-                                    print(f"❌ [ERROR] Analyzying CSV {filename}: {csv_e}", flush=True)
-                                
-                            # CCTV (Images)
-                            elif ext in ['jpg', 'jpeg', 'png']:
-                                # process_cctv takes file path
-                                data = process_cctv(file_path)
-                                gm.add_cctv_data(data, link_to_case_id=case_id)
-                                file_count += 1
-                                print(f"✅ [SUCCESS] {filename} processed and linked.", flush=True)
-                                
-                        except Exception as e:
-                            logs.append(f"   ❌ Failed file {filename}: {str(e)}")
-                            print(f"❌ [ERROR] Failed to process {filename}: {str(e)}", flush=True)
-                            
-                logs.append(f"✅ Loaded {case_id} ({file_count} files linked).")
-                
+
+                checkpoint = Checkpoint(state, archive_key, temp_dir, barrier=gm.flush)
+                results = ingest_files(gm, walk_files(temp_dir), case_id=case_id, checkpoint=checkpoint)
+                for file_path, result in results:
+                    if result["error"]:
+                        logs.append(f"   ⚠️ {os.path.basename(file_path)}: {result['error']}")
+
+                file_count = sum(1 for _, r in results if r["linked"])
+                if archive_complete(results):
+                    state.finish_archive(archive_key)
+                    logs.append(f"✅ Loaded {case_id} ({file_count} files linked).")
+                else:
+                    logs.append(f"⚠️ Loaded {case_id} ({file_count} files linked); failed files retry on resume.")
+
             except Exception as e:
                 logs.append(f"❌ Failed to process zip {zip_name}: {e}")
-                
+
+    state.close()
     gm.close()
     return logs
@@ -1,6 +1,6 @@
 import os
 from src.graph_manager import GraphManager
-from src.processors.fir_processor import process_fir
+from src.processors.registry import get_processor
 
 def load_cctns_history():
     """
@@ -14,29 +14,33 @@ def load_cctns_history():
         print("Created cctns_db folder. Please add FIR files.")
         return
     
-    # Initialize Graph Manager
-    gm = GraphManager()
+    # Initialize Graph Manager (FIR writes are coalesced on the background writer)
+    gm = GraphManager(write_behind=True)
     
-    # Loop through all files in the folder
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        
-        # Process only .txt or .pdf files
-        if filename.lower().endswith(('.txt', '.pdf')):
-            print(f"Processing {filename}...")
+    # Collect FIR files (.txt / .pdf) and extract them in one concurrent, rate-limited pass
+    fir_files = [f for f in os.listdir(folder_path) if f.lower().endswith(('.txt', '.pdf'))]
+    file_paths = [os.path.join(folder_path, f) for f in fir_files]
+    print(f"Processing {len(fir_files)} CCTNS files...")
+    
+    for filename, extracted_data in zip(fir_files, get_processor("fir_bulk")(file_paths)):
+        try:
+            if "error" in extracted_data:
+                raise ValueError(extracted_data["error"])
+
+            # Add to graph database
+            gm.add_fir_data(extracted_data)
+            
+            # Success message
+            print(f"✅ Loaded CCTNS Case: {filename}")
             
-            try:
-                # Extract data using FIR processor
-                extracted_data = process_fir(file_path)
-                
-                # Add to graph database
-                gm.add_fir_data(extracted_data)
-                
-                # Success message
-                print(f"✅ Loaded CCTNS Case: {filename}")
-                
-            except Exception as e:
-                print(f"❌ Error processing {filename}: {str(e)}")
+        except Exception as e:
+            print(f"❌ Error processing {filename}: {str(e)}")
     
-    # Close database connection
+    # Wait for queued writes, then close database connection
+    try:
+        gm.flush()
+        gm.relink_phones()
+        gm.refresh_risk_scores()
+    except Exception as e:
+        print(f"❌ Error writing CCTNS cases: {str(e)}")
     gm.close()
@@ -1,15 +1,66 @@
 import os
+import time
+import zlib
 import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
+from neo4j.exceptions import TransientError
 from pathlib import Path
+from src.utils import metrics
+from src.utils.adaptive_batch import AdaptiveBatchSize
+from src.utils.person_resolver import PersonResolver
+from src.utils.plate_index import PlateIndex
+from src.utils.resolution_cache import ResolutionCache
+from src.utils.risk_features import REFRESH_QUERY
+from src.graph_writer import BUMP_VERSION_QUERY
 
 # Load env from root
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env")
 
+# Concurrent sessions for large CDR loads (calls are partitioned by source number)
+CDR_WRITE_SESSIONS = int(os.getenv("CDR_WRITE_SESSIONS", "4"))
+WRITE_MAX_RETRIES = 5
+
+# Created once per process on first connect; IF NOT EXISTS makes reruns free
+SCHEMA = [
+    "CREATE INDEX person_phone IF NOT EXISTS FOR (p:Person) ON (p.phone)",
+    "CREATE INDEX person_relink_pending IF NOT EXISTS FOR (p:Person) ON (p.relink_pending)",
+    "CREATE INDEX phone_number IF NOT EXISTS FOR (ph:Phone) ON (ph.number)",
+    "CREATE INDEX case_id IF NOT EXISTS FOR (c:Case) ON (c.id)",
+    "CREATE INDEX person_risk_dirty IF NOT EXISTS FOR (p:Person) ON (p.risk_dirty)",
+    # Range index: top-K suspects are read in score order instead of sorting every person
+    "CREATE RANGE INDEX person_risk_score IF NOT EXISTS FOR (p:Person) ON (p.risk_score)",
+    # purge_case() pages through one case's calls; without it every batch scans all CALLED edges
+    "CREATE INDEX called_case_id IF NOT EXISTS FOR ()-[r:CALLED]-() ON (r.case_id)",
+    # Temporary markers of GraphManager.purge_case()
+    "CREATE INDEX purge_pending IF NOT EXISTS FOR (n:PurgePending) ON (n.purge_case)",
+    "CREATE INDEX purge_candidate IF NOT EXISTS FOR (n:PurgeCandidate) ON (n.purge_case)",
+]
+_schema_ready = False
+
+# Name/plate/phone indexes loaded from the graph once per process and kept current by the
+# writes below; shared by every GraphManager (the app creates one per upload job)
+_person_resolver = None
+_plate_index = None
+_id_cache = None
+_resolver_lock = threading.Lock()
+
+def _is_memory_error(error):
+    code = getattr(error, "code", "") or ""
+    return "OutOfMemory" in code or "MemoryPool" in code or "MemoryLimit" in code
+
 class GraphManager:
-    def __init__(self):
+    def __init__(self, write_batch_size=None, write_behind=False):
+        # Rows per UNWIND write (None = whole statement in one transaction); starting size for CDR loads
+        self.write_batch_size = write_batch_size
+        self.writer = None
+        # Large CDR writes: batch size learnt from commit latency, per-batch throughput kept for reporting
+        self.cdr_batch_size = AdaptiveBatchSize(initial=write_batch_size or 5000)
+        self.batch_stats = deque(maxlen=1000)
         uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         user = os.getenv("NEO4J_USER", "neo4j")
         password = os.getenv("NEO4J_PASSWORD", "password")
@@ -22,14 +73,202 @@ class GraphManager:
             print(f"Failed to create Neo4j driver: {e}")
             self.driver = None
 
+        if self.driver: self._ensure_schema()
+
+        # Ingestion processes queue writes on a background thread instead of waiting on each one
+        if write_behind and self.driver:
+            from src.graph_writer import GraphWriter, WRITER_BATCH_ROWS
+            self.writer = GraphWriter(self.driver, batch_rows=write_batch_size or WRITER_BATCH_ROWS)
+
+    def _ensure_schema(self):
+        global _schema_ready
+        if _schema_ready: return
+        try:
+            with self.driver.session() as session:
+                for statement in SCHEMA:
+                    session.run(statement).consume()
+                # People loaded before stored risk features have no score: flag them once so the
+                # next refresh_risk_scores() (after any ingest) scores them; until then the
+                # ranking falls back to the graph engine
+                unscored = self._delete_in_batches(session, """
+                    MATCH (p:Person) WHERE p.risk_score IS NULL AND p.risk_dirty IS NULL
+                    WITH p LIMIT $batch SET p.risk_dirty = true RETURN count(*)
+                """, 5000, "flagged people")
+                if unscored: print(f"   ↳ [RISK] Flagged {unscored} unscored person(s) for scoring.", flush=True)
+            _schema_ready = True
+        except Exception as e:
+            print(f"Could not create indexes: {e}")
+
     def close(self):
+        if self.writer:
+            self.writer.close()
         if self.driver:
             self.driver.close()
 
-    def clean_database(self):
+    def flush(self):
+        """
+        Waits until all queued writes are committed (no-op without write-behind).
+        Raises the first error of any batch that failed since the last flush.
+        """
+        if self.writer:
+            errors = self.writer.flush()
+            if errors:
+                raise errors[0]
+
+    def _write_partitioned(self, query, rows, partition_key, **params):
+        """
+        Large UNWIND loads: rows are split by partition_key across CDR_WRITE_SESSIONS
+        concurrent sessions (rows of one source number always share a session, so they
+        never contend for that node's lock) and committed in adaptively sized batches.
+        """
+        if self.writer:
+            # Keep ordering with anything already queued (e.g. the FIR that sets Person.phone)
+            self.flush()
+        partitions = [[] for _ in range(max(1, CDR_WRITE_SESSIONS))]
+        for row in rows:
+            partitions[zlib.crc32(str(row[partition_key]).encode()) % len(partitions)].append(row)
+        partitions = [p for p in partitions if p]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(partitions), thread_name_prefix="cdr-write") as pool:
+            list(pool.map(lambda part: self._drain_partition(query, part, params), partitions))
+        # Once per load: a per-batch bump would serialize the sessions on the version node
+        self._bump_version()
+        elapsed = time.perf_counter() - start
+        print(f"   ↳ [WRITE] {len(rows)} rows on {len(partitions)} session(s) in {elapsed:.1f}s "
+              f"({len(rows) / max(elapsed, 1e-9):,.0f} rows/s, batch now {self.cdr_batch_size.size}).", flush=True)
+
+    def _drain_partition(self, query, rows, params):
+        sizer = self.cdr_batch_size
+        with self.driver.session() as session:
+            i = 0
+            attempt = 0
+            while i < len(rows):
+                chunk = rows[i:i + sizer.size]
+                start = time.perf_counter()
+                try:
+                    # Explicit transaction: the driver's own retry would resend an oversized batch unchanged
+                    with session.begin_transaction() as tx:
+                        tx.run(query, rows=chunk, **params).consume()
+                        tx.commit()
+                except TransientError as e:
+                    if _is_memory_error(e) and sizer.shrink_for_memory():
+                        print(f"   ↳ [WRITE] Out of memory at {len(chunk)} rows; batch cut to {sizer.size}.", flush=True)
+                        continue
+                    attempt += 1
+                    if attempt > WRITE_MAX_RETRIES: raise
+                    time.sleep(min(10.0, 0.2 * 2 ** attempt) * (0.5 + random.random()))  # deadlock / leader switch
+                    continue
+                elapsed = time.perf_counter() - start
+                sizer.record(len(chunk), elapsed)
+                self.batch_stats.append({
+                    "rows": len(chunk), "seconds": round(elapsed, 3),
+                    "rows_per_sec": round(len(chunk) / max(elapsed, 1e-9), 1)
+                })
+                metrics.incr("graph_rows", len(chunk))
+                i += len(chunk)
+                attempt = 0
+
+    def _write(self, query, rows, **params):
+        """Runs an `UNWIND $rows AS row` statement: queued on the writer, or inline in managed transactions."""
+        if not rows: return
+        if self.writer:
+            return self.writer.submit(query, rows, **params)
+        batch_size = self.write_batch_size or len(rows)
+        with self.driver.session() as session:
+            for i in range(0, len(rows), batch_size):
+                chunk = rows[i:i + batch_size]
+                session.execute_write(lambda tx: tx.run(query, rows=chunk, **params).consume())
+        self._bump_version()
+
+    def _bump_version(self):
+        """Moves the graph version analytics snapshots are keyed on (graph_engine.graph_version)."""
+        with self.driver.session() as session:
+            session.execute_write(lambda tx: tx.run(BUMP_VERSION_QUERY).consume())
+
+    def _delete_in_batches(self, session, query, batch_size, stage, progress=None, **params):
+        """Reruns a `... WITH x LIMIT $batch <write> RETURN count(*)` query until a batch comes back short."""
+        deleted = 0
+        while True:
+            count = session.execute_write(lambda tx: tx.run(query, batch=batch_size, **params).single()[0])
+            deleted += count
+            if progress: progress(stage, deleted)
+            if count < batch_size:
+                return deleted
+
+    def clean_database(self, batch_size=10000, progress=None):
+        """
+        Deletes everything in bounded transactions: relationships first (so a
+        supernode's DETACH never has to drop millions of edges at once), then nodes.
+        Safe to interrupt and rerun. progress(stage, deleted_so_far) is called per batch.
+        """
         if not self.driver: return
         with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
+            self._delete_in_batches(session, "MATCH ()-[r]->() WITH r LIMIT $batch DELETE r RETURN count(*)",
+                                    batch_size, "relationships", progress)
+            # The version node survives, so the version keeps counting up across a wipe
+            self._delete_in_batches(session, "MATCH (n) WHERE NOT n:GraphMeta WITH n LIMIT $batch DELETE n RETURN count(*)",
+                                    batch_size, "nodes", progress)
+        self._bump_version()
+        self._reset_resolvers()
+
+    def _reset_resolvers(self):
+        """In-memory name/plate/id indexes reload from the graph after deletions."""
+        global _person_resolver, _plate_index, _id_cache
+        with _resolver_lock:
+            _person_resolver = _plate_index = _id_cache = None
+
+    def purge_case(self, case_id, batch_size=10000, progress=None):
+        """
+        Removes one case: its CDR calls, the Case node and every entity that no other
+        case still references. An entity is kept if it touches another Case, has calls
+        left from other loads, or is linked to anything outside this case's entities.
+        Returns the number of entities deleted.
+        """
+        if not self.driver or not case_id: return 0
+        with self.driver.session() as session:
+            # Endpoints and case neighbours are labelled PurgeCandidate as their links go, so
+            # the orphan check below is an index lookup instead of a list resent every batch
+            self._delete_in_batches(session, """
+                MATCH (a)-[r:CALLED {case_id: $case_id}]->(b) WITH a, r, b LIMIT $batch
+                SET a:PurgeCandidate:PurgePending, a.purge_case = $case_id,
+                    b:PurgeCandidate:PurgePending, b.purge_case = $case_id
+                DELETE r RETURN count(*)
+            """, batch_size, "calls", progress, case_id=case_id)
+            self._delete_in_batches(session, """
+                MATCH (:Case {id: $case_id})-[r]-(n) WITH r, n LIMIT $batch
+                SET n:PurgeCandidate:PurgePending, n.purge_case = $case_id
+                DELETE r RETURN count(*)
+            """, batch_size, "case links", progress, case_id=case_id)
+            session.execute_write(lambda tx: tx.run("MATCH (c:Case {id: $case_id}) DELETE c", case_id=case_id).consume())
+
+            # Each pending candidate is checked once: only those whose remaining neighbours
+            # are all candidates of this case too are orphans of this case
+            deleted = 0
+            while True:
+                checked, gone = session.execute_write(lambda tx: tx.run("""
+                    MATCH (n:PurgePending {purge_case: $case_id}) WITH n LIMIT $batch
+                    REMOVE n:PurgePending
+                    WITH n, NOT EXISTS { (n)--(:Case) }
+                            AND NOT EXISTS { (n)-[:CALLED]-() }
+                            AND NOT EXISTS { (n)--(m) WHERE NOT (m:PurgeCandidate AND m.purge_case = $case_id) } AS orphan
+                    FOREACH (_ IN CASE WHEN orphan THEN [1] ELSE [] END | DETACH DELETE n)
+                    RETURN count(*), sum(CASE WHEN orphan THEN 1 ELSE 0 END)
+                """, case_id=case_id, batch=batch_size).single().values())
+                deleted += gone
+                if progress: progress("entities", deleted)
+                if checked < batch_size: break
+            # People that survived lost this case's links and calls
+            self._delete_in_batches(session, """
+                MATCH (n:PurgeCandidate {purge_case: $case_id}) WITH n LIMIT $batch
+                FOREACH (_ IN CASE WHEN n:Person THEN [1] ELSE [] END | SET n.risk_dirty = true)
+                REMOVE n:PurgeCandidate, n.purge_case
+                RETURN count(*)
+            """, batch_size, "survivors", progress, case_id=case_id)
+        self._bump_version()
+        self._reset_resolvers()
+        self.refresh_risk_scores(batch_size)
+        return deleted
 
     def _clean_val(self, val):
         if val is None: return None
@@ -41,6 +280,9 @@ class GraphManager:
         s = self._clean_val(val)
         if not s: return None
         # Upper + Remove space/dash
+        import re
+        return re.sub(r'[\s\-]', '', s.upper())
+
     def _normalize_phone(self, val):
         """
         Matches logic in cdr_processor.py:
@@ -55,6 +297,139 @@ class GraphManager:
             s = s[2:]
         return s
 
+    def _get_person_resolver(self):
+        """Blocking index of every Person name, loaded from the graph once per process."""
+        global _person_resolver
+        with _resolver_lock:
+            if _person_resolver is None:
+                resolver = PersonResolver()
+                with self.driver.session() as session:
+                    for name in session.run("MATCH (p:Person) WHERE p.name IS NOT NULL RETURN p.name AS name").value("name"):
+                        resolver.add(name)
+                _person_resolver = resolver
+            return _person_resolver
+
+    def _get_plate_index(self):
+        """Confusion-aware index of every registered Vehicle.number, loaded once per process."""
+        global _plate_index
+        with _resolver_lock:
+            if _plate_index is None:
+                index = PlateIndex()
+                with self.driver.session() as session:
+                    for number in session.run("MATCH (v:Vehicle) WHERE v.number IS NOT NULL RETURN v.number AS number").value("number"):
+                        index.add(number)
+                _plate_index = index
+            return _plate_index
+
+    def _match_plates(self, reads):
+        """OCR reads -> [{'text': Vehicle.number, 'read', 'score'}] for every candidate vehicle."""
+        index = self._get_plate_index()
+        return [{'text': number, 'read': read, 'score': score}
+                for read in reads for number, score in index.lookup(read)]
+
+    def _get_id_cache(self):
+        """
+        Phone -> node id cache shared by this process. Its Bloom filter is seeded with every
+        known phone so numbers never seen before are created without a lookup.
+        """
+        global _id_cache
+        with _resolver_lock:
+            if _id_cache is None:
+                cache = ResolutionCache()
+                with self.driver.session() as session:
+                    result = session.run("""
+                        MATCH (p:Person) WHERE p.phone IS NOT NULL RETURN p.phone AS number
+                        UNION
+                        MATCH (ph:Phone) RETURN ph.number AS number
+                    """)
+                    for number in result.value("number"):
+                        cache.remember(f"phone:{number}")
+                _id_cache = cache
+            return _id_cache
+
+    def _warm_case(self, cache, case_id):
+        """Preloads node ids of the phones a case already references (suspects, linked phones, calls)."""
+        if cache.case_warm(case_id): return
+        with self.driver.session() as session:
+            result = session.run("""
+                MATCH (:Case {id: $case_id})-[:HAS_SUSPECT|LINKED_PHONE]->(n) RETURN n
+                UNION
+                MATCH (n)-[:CALLED {case_id: $case_id}]-() RETURN n
+            """, case_id=case_id)
+            for record in result:
+                node = record["n"]
+                number = node.get("phone") if "Person" in node.labels else node.get("number")
+                if not number: continue
+                # A person holding the number wins over a bare Phone node
+                if "Person" in node.labels or not cache.get(f"phone:{number}"):
+                    cache.put(f"phone:{number}", node.element_id)
+        cache.mark_case_warm(case_id)
+
+    def _resolve_phones(self, numbers, case_id=None):
+        """
+        Maps phone numbers to the node calls should attach to: the Person whose phone it
+        is, else its Phone node (created if missing). Database reads happen only for
+        cache misses that the Bloom filter cannot rule out, in one batch.
+        """
+        cache = self._get_id_cache()
+        if case_id: self._warm_case(cache, case_id)
+
+        resolved, maybe_known, new = {}, [], []
+        for number in numbers:
+            node_id = cache.get(f"phone:{number}")
+            if node_id:
+                resolved[number] = node_id
+            elif cache.might_exist(f"phone:{number}"):
+                maybe_known.append(number)
+            else:
+                new.append(number)
+
+        if (maybe_known or new) and self.writer:
+            self.flush()  # queued FIRs may be about to give one of these numbers to a person
+
+        with self.driver.session() as session:
+            if maybe_known:
+                metrics.incr("phone_lookups", len(maybe_known))
+                found = session.execute_read(lambda tx: tx.run("""
+                    UNWIND $numbers AS n
+                    OPTIONAL MATCH (p:Person {phone: n})
+                    WITH n, head(collect(p)) AS p
+                    OPTIONAL MATCH (ph:Phone {number: n})
+                    WITH n, p, head(collect(ph)) AS ph
+                    RETURN n AS number, coalesce(elementId(p), elementId(ph)) AS id
+                """, numbers=maybe_known).data())
+                for row in found:
+                    if row["id"]:
+                        resolved[row["number"]] = row["id"]
+                        cache.put(f"phone:{row['number']}", row["id"])
+                    else:
+                        new.append(row["number"])
+            if new:
+                created = session.execute_write(lambda tx: tx.run("""
+                    UNWIND $numbers AS n
+                    MERGE (ph:Phone {number: n})
+                    ON CREATE SET ph.label = "📞 " + n
+                    RETURN n AS number, elementId(ph) AS id
+                """, numbers=new).data())
+                for row in created:
+                    resolved[row["number"]] = row["id"]
+                    cache.put(f"phone:{row['number']}", row["id"])
+        return resolved
+
+    def _resolve_suspects(self, suspects):
+        """
+        Maps suspect names onto existing people (spelling/case/transliteration variants).
+        Returns (names, aliases, possible_matches) for the FIR write.
+        """
+        resolver = self._get_person_resolver()
+        names, aliases, possible = [], [], []
+        for name in suspects:
+            canonical, matches = resolver.resolve(name)
+            if canonical not in names: names.append(canonical)
+            if canonical != name: aliases.append({'name': canonical, 'alias': name})
+            possible.extend({'name': canonical, 'other': other, 'score': score} for other, score in matches)
+        return names, aliases, possible
+
     def add_fir_data(self, data):
         if not self.driver or not data: return
         
@@ -82,54 +457,79 @@ class GraphManager:
                 return []
         
         suspects = normalize_to_array(data.get('suspects') or data.get('suspect_name'))
-        vehicles = normalize_to_array(data.get('vehicles') or data.get('vehicle_number'))
+        # "Ravi Kumar" / "RAVI KUMAR" / "Ravi Kumaar" become one Person; near misses are flagged
+        suspects, aliases, possible_matches = self._resolve_suspects(suspects)
+        # Plates are stored the way CCTV reads are normalized ("KL 07-AB 1234" -> "KL07AB1234")
+        vehicles = [n for n in (self._normalize(v) for v in normalize_to_array(data.get('vehicles') or data.get('vehicle_number'))) if n]
         phones = normalize_to_array(data.get('phones') or data.get('suspect_phone'))
+        if _plate_index is not None:
+            for num in vehicles: _plate_index.add(num)
+        if _id_cache is not None and len(suspects) == 1 and phones:
+            # The number now belongs to a person; the next CDR must re-resolve it
+            _id_cache.forget(f"phone:{phones[0]}")
         
         # ---------------------------------------------------------
 
         query = """
+        UNWIND $rows AS row
         // 1. Merge the Central Case Node (The Hub)
-        MERGE (c:Case {id: $fir_id})
-        SET c.type = $crime_type, 
-            c.date = $date, 
-            c.station = $station,
-            c.label = "📁 " + $fir_id  // Folder Icon
+        MERGE (c:Case {id: row.fir_id})
+        SET c.type = row.crime_type, 
+            c.date = row.date, 
+            c.station = row.station,
+            c.label = "📁 " + row.fir_id  // Folder Icon
 
         // 2. Link Suspects
-        FOREACH (name IN $suspects | 
+        FOREACH (name IN row.suspects | 
             MERGE (p:Person {name: name}) 
-            SET p.label = name // Silhouette Icon removed
+            SET p.label = name, // Silhouette Icon removed
+                p.risk_dirty = true
             
             // SMART LINKING: If we have exactly 1 suspect and >0 phones, assign first phone to person
-            FOREACH (ignoreMe IN CASE WHEN size($suspects) = 1 AND size($phone_numbers) > 0 THEN [1] ELSE [] END |
-                SET p.phone = head($phone_numbers) 
+            FOREACH (ignoreMe IN CASE WHEN size(row.suspects) = 1 AND size(row.phone_numbers) > 0 THEN [1] ELSE [] END |
+                // A new number for this person: calls already on its Phone node get moved by relink_phones()
+                SET p.relink_pending = CASE WHEN coalesce(p.phone, '') <> head(row.phone_numbers) THEN true ELSE p.relink_pending END
+                SET p.phone = head(row.phone_numbers) 
             )
             
             MERGE (c)-[:HAS_SUSPECT]->(p))
 
+        // 2b. Keep the spellings that were resolved onto an existing person
+        FOREACH (a IN row.aliases |
+            MERGE (p:Person {name: a.name})
+            SET p.aliases = CASE WHEN a.alias IN coalesce(p.aliases, []) THEN p.aliases ELSE coalesce(p.aliases, []) + a.alias END)
+
+        // 2c. Likely duplicates that were not merged, for an analyst to confirm
+        FOREACH (m IN row.possible_matches |
+            MERGE (p:Person {name: m.name})
+            MERGE (q:Person {name: m.other})
+            MERGE (p)-[s:POSSIBLE_SAME_AS]->(q)
+            SET s.score = m.score)
+
         // 3. Link Vehicles
-        FOREACH (num IN $vehicle_numbers | 
+        FOREACH (num IN row.vehicle_numbers | 
             MERGE (v:Vehicle {number: num}) 
             SET v.label = num // Car Icon removed
             MERGE (c)-[:INVOLVED_VEHICLE]->(v))
 
         // 4. Link Phones
-        FOREACH (num IN $phone_numbers | 
+        FOREACH (num IN row.phone_numbers | 
             MERGE (ph:Phone {number: num}) 
             SET ph.label = num // Phone Icon removed
             MERGE (c)-[:LINKED_PHONE]->(ph))
         """
         
-        with self.driver.session() as session:
-            session.run(query, 
-                fir_id=fir_id,
-                crime_type=data.get('crime_type', 'Unknown'),
-                date=data.get('date', 'Unknown Date'),
-                station=data.get('station', 'Unknown Station'),
-                suspects=suspects,
-                vehicle_numbers=vehicles,
-                phone_numbers=phones
-            )
+        self._write(query, [{
+            'fir_id': fir_id,
+            'crime_type': data.get('crime_type', 'Unknown'),
+            'date': data.get('date', 'Unknown Date'),
+            'station': data.get('station', 'Unknown Station'),
+            'suspects': suspects,
+            'aliases': aliases,
+            'possible_matches': possible_matches,
+            'vehicle_numbers': vehicles,
+            'phone_numbers': phones
+        }])
 
     def add_cdr_data(self, data_list, link_to_case_id=None):
         """
@@ -139,70 +539,122 @@ class GraphManager:
         - If no, links to Phone node.
         """
         if not self.driver or not data_list: return
-        
-        # New Query Logic (Fixed Syntax)
+
+        # Endpoints are resolved up front (cache -> one batched read for unknowns -> batched
+        # MERGE for new numbers), so the per-call query only matches nodes by element id
+        numbers = {d.get('source') for d in data_list} | {d.get('destination') for d in data_list}
+        node_ids = self._resolve_phones([n for n in numbers if n], link_to_case_id)
+
         query = """
-        UNWIND $calls AS call
-        
-        // --- 1. Handle Source ---
-        OPTIONAL MATCH (p1:Person {phone: call.source})
-        // Conditionally create Phone if Person not found
-        FOREACH (_ IN CASE WHEN p1 IS NULL THEN [1] ELSE [] END | 
-            MERGE (ph1:Phone {number: call.source}) 
-            ON CREATE SET ph1.label = "📞 " + call.source
-        )
-        // Select the correct node (Person or Phone)
-        WITH call
-        MATCH (source) 
-        WHERE (source:Person AND source.phone = call.source) OR (source:Phone AND source.number = call.source)
-        WITH call, head(collect(source)) AS source
-
-        // --- 2. Handle Target ---
-        OPTIONAL MATCH (p2:Person {phone: call.destination})
-        FOREACH (_ IN CASE WHEN p2 IS NULL THEN [1] ELSE [] END | 
-            MERGE (ph2:Phone {number: call.destination}) 
-            ON CREATE SET ph2.label = "📞 " + call.destination
-        )
-        WITH call, source
-        MATCH (target) 
-        WHERE (target:Person AND target.phone = call.destination) OR (target:Phone AND target.number = call.destination)
-        WITH call, source, head(collect(target)) AS target
-        
-        // --- 3. Create Edge ---
-        MERGE (source)-[r:CALLED]->(target)
+        UNWIND $rows AS call
+        MATCH (source) WHERE elementId(source) = call.source_id
+        MATCH (target) WHERE elementId(target) = call.target_id
+        MERGE (source)-[r:CALLED{key}]->(target)
         SET r.date = call.date,
             r.time = call.time,
             r.duration = call.duration,
             r.title = "📅 " + toString(call.date) + " | ⏳ " + toString(call.duration) + "s"
+        FOREACH (p IN [n IN [source, target] WHERE n:Person] | SET p.risk_dirty = true)
         """
-        if link_to_case_id:
-            query += " SET r.case_id = $case_id"
-            
-        # Convert incoming list ... (Rest is same)
-        if link_to_case_id:
-            query += " SET r.case_id = $case_id"
+        # Calls of different cases between the same pair stay separate edges, so purging one case keeps the other's
+        query = query.replace("{key}", " {case_id: $case_id}" if link_to_case_id else "")
             
-        # Convert incoming list of dicts to params if needed, but data_list is already list of dicts
-        # We need to ensure keys match: source, destination, date, time, duration
         # Existing process_cdr returns: source, destination, timestamp, duration_sec...
         # We need to adapt data_list to match query params 'call'
         
         formatted_calls = []
         for d in data_list:
+            if not d.get('source') or not d.get('destination'): continue
             formatted_calls.append({
                 'source': d.get('source'),
-                'destination': d.get('destination'),
+                'source_id': node_ids[d.get('source')],
+                'target_id': node_ids[d.get('destination')],
                 'date': str(d.get('timestamp', '')), # Simplified
                 'time': str(d.get('timestamp', '')), 
                 'duration': d.get('duration_sec', 0)
             })
 
+        # Small files are coalesced by the write-behind queue; big ones load in parallel adaptive batches
+        if self.writer and len(formatted_calls) <= self.cdr_batch_size.size:
+            self._write(query, formatted_calls, case_id=link_to_case_id)
+        else:
+            self._write_partitioned(query, formatted_calls, 'source', case_id=link_to_case_id)
+
+    def relink_phones(self, batch_size=5000):
+        """
+        Moves calls onto people who were given a phone after its CDR was loaded. Only
+        persons flagged relink_pending (indexed) are visited: CALLED edges of the Phone
+        node with their number are re-created on the person in batches, the phone is
+        attached with USES_PHONE and the flag is cleared. Returns the number of edges moved.
+        """
+        if not self.driver: return 0
+        self.flush()
+        moved = 0
         with self.driver.session() as session:
-            session.run(query, calls=formatted_calls, case_id=link_to_case_id)
+            pending = session.execute_read(lambda tx: tx.run(
+                "MATCH (p:Person) WHERE p.relink_pending = true RETURN p.phone AS phone").value("phone"))
+            if not pending: return 0
+
+            for direction in ("(ph)-[r:CALLED]->(x)", "(x)-[r:CALLED]->(ph)"):
+                outgoing = direction.startswith("(ph)")
+                existing = "(p)-[e:CALLED]->(x)" if outgoing else "(x)-[e:CALLED]->(p)"
+                new_edge = "(p)-[n:CALLED]->(x)" if outgoing else "(x)-[n:CALLED]->(p)"
+                # An edge merges only into the person's edge of the same case, keeping its case_id
+                moved += self._delete_in_batches(session, f"""
+                    MATCH (p:Person) WHERE p.relink_pending = true
+                    MATCH (ph:Phone {{number: p.phone}})
+                    MATCH {direction} WHERE x <> p
+                    WITH p, r, x LIMIT $batch
+                    OPTIONAL MATCH {existing} WHERE coalesce(e.case_id, '') = coalesce(r.case_id, '')
+                    WITH p, r, x, head(collect(e)) AS e
+                    FOREACH (_ IN CASE WHEN e IS NULL THEN [1] ELSE [] END | CREATE {new_edge} SET n = properties(r))
+                    FOREACH (old IN CASE WHEN e IS NULL THEN [] ELSE [e] END | SET old += properties(r))
+                    FOREACH (_ IN CASE WHEN x:Person THEN [1] ELSE [] END | SET x.risk_dirty = true)
+                    DELETE r
+                    RETURN count(*)
+                """, batch_size, "relinked calls")
+            self._delete_in_batches(session, """
+                MATCH (p:Person) WHERE p.relink_pending = true
+                WITH p LIMIT $batch
+                OPTIONAL MATCH (ph:Phone {number: p.phone})
+                FOREACH (_ IN CASE WHEN ph IS NULL THEN [] ELSE [1] END | MERGE (p)-[:USES_PHONE]->(ph))
+                SET p.risk_dirty = true
+                REMOVE p.relink_pending
+                RETURN count(DISTINCT p)
+            """, batch_size, "relinked people")
+        self._bump_version()
+
+        if _id_cache is not None:
+            for phone in pending: _id_cache.forget(f"phone:{phone}")
+        if moved: print(f"   ↳ [RELINK] Moved {moved} call(s) onto {len(pending)} newly identified phone owner(s).", flush=True)
+        return moved
+
+    def refresh_risk_scores(self, batch_size=5000, full=False):
+        """
+        Recomputes the stored risk features (case_count, asset_count, call_fan_in/out,
+        txn_volume, risk_score) of people flagged risk_dirty by the writes above, so a
+        refresh costs time proportional to the people an ingest touched. full=True
+        flags everyone first (backfill after upgrading an existing graph).
+        Returns the number of people rescored.
+        """
+        if not self.driver: return 0
+        self.flush()
+        with self.driver.session() as session:
+            if full:
+                self._delete_in_batches(session, """
+                    MATCH (p:Person) WHERE p.risk_dirty IS NULL
+                    WITH p LIMIT $batch SET p.risk_dirty = true RETURN count(*)
+                """, batch_size, "flagged people")
+            scored = self._delete_in_batches(session, REFRESH_QUERY, batch_size, "rescored people")
+        if scored: print(f"   ↳ [RISK] Rescored {scored} person(s).", flush=True)
+        return scored
 
     def add_cctv_data(self, data, link_to_case_id=None):
         if not self.driver or not data: return
         
+        if data.get('sightings'):
+            return self._add_cctv_video_data(data, link_to_case_id)
+
         detected_texts = data.get('detected_text', [])
         vehicle_num = data.get('vehicle_number') # If smart extractor found it
         
@@ -210,9 +662,11 @@ class GraphManager:
         to_process = [vehicle_num] if vehicle_num else detected_texts
         
         query = """
-        MATCH (v:Vehicle) WHERE v.number = $text
+        UNWIND $rows AS row
+        MATCH (v:Vehicle) WHERE v.number = row.text
         MERGE (e:Evidence {type: "CCTV_Image"})
-        MERGE (v)-[:CAPTURED_IN]->(e)
+        MERGE (v)-[c:CAPTURED_IN]->(e)
+        SET c.match_score = row.score, c.ocr_read = row.read
         """
         
         if link_to_case_id:
@@ -223,15 +677,49 @@ class GraphManager:
             MERGE (e)-[:PART_OF]->(k)
             """
             
-        with self.driver.session() as session:
-            for text in to_process:
-                clean_text = self._normalize(text)
-                if not clean_text: continue 
-                
-                params = {'text': clean_text}
-                if link_to_case_id:
-                    params['case_id'] = link_to_case_id
-                session.run(query, **params)
+        # OCR reads resolve to registered plates despite 0/O, 1/I, 8/B, 5/S confusions
+        reads = [t for t in (self._normalize(text) for text in to_process) if t]
+        self._write(query, self._match_plates(reads), case_id=link_to_case_id)
+
+    def _add_cctv_video_data(self, data, link_to_case_id=None):
+        """
+        Video evidence: one Evidence node per clip, each plate linked once
+        with the list of offsets (seconds into the clip) it was seen at.
+        """
+        offsets_by_plate = {}
+        for s in data['sightings']:
+            plate = self._normalize(s.get('vehicle_number'))
+            if plate:
+                offsets_by_plate.setdefault(plate, []).append(s.get('offset_sec'))
+
+        query = """
+        UNWIND $rows AS row
+        MATCH (v:Vehicle) WHERE v.number = row.text
+        MERGE (e:Evidence {type: "CCTV_Video", source: row.source})
+        MERGE (v)-[c:CAPTURED_IN]->(e)
+        SET c.offsets = row.offsets,
+            c.first_seen_sec = row.offsets[0],
+            c.match_score = row.score,
+            c.ocr_read = row.read,
+            c.title = "🎥 " + toString(size(row.offsets)) + " sighting(s) from " + toString(row.offsets[0]) + "s"
+        """
+
+        if link_to_case_id:
+            query += """
+            MERGE (k:Case {id: $case_id})
+            ON CREATE SET k.status = 'ARCHIVED'
+            MERGE (v)-[:LINKED_TO]->(k)
+            MERGE (e)-[:PART_OF]->(k)
+            """
+
+        source = os.path.basename(str(data.get('source') or 'video'))
+        # Several misreads of one plate collapse onto the same vehicle with their offsets combined
+        by_vehicle = {}
+        for match in self._match_plates(list(offsets_by_plate)):
+            row = by_vehicle.setdefault(match['text'], dict(match, source=source, offsets=[]))
+            row['offsets'] = sorted(row['offsets'] + offsets_by_plate[match['read']])
+            if match['score'] > row['score']: row.update(score=match['score'], read=match['read'])
+        self._write(query, list(by_vehicle.values()), case_id=link_to_case_id)
 
     def add_bank_data(self, data, link_to_case_id=None):
         if not self.driver or not data: return
@@ -239,12 +727,14 @@ class GraphManager:
         transactions = data.get('transactions', [])
         
         query = """
-        MERGE (t:Transaction {signature: $date + '_' + $amount + '_' + $description})
-        SET t.amount = $amount, t.date = $date, t.description = $description, t.type = 'Bank_Tx'
+        UNWIND $rows AS row
+        MERGE (t:Transaction {signature: row.date + '_' + row.amount + '_' + row.description})
+        SET t.amount = row.amount, t.date = row.date, t.description = row.description, t.type = 'Bank_Tx'
         
         WITH t
         MATCH (p:Person) WHERE t.description CONTAINS p.name
         MERGE (t)-[:SENT_TO]->(p)
+        SET p.risk_dirty = true
         """
         
         if link_to_case_id:
@@ -255,12 +745,7 @@ class GraphManager:
             MERGE (t)-[:PART_OF]->(k)
             """
 
-        with self.driver.session() as session:
-            for tx in transactions:
-                params = tx.copy()
-                if link_to_case_id:
-                    params['case_id'] = link_to_case_id
-                session.run(query, **params)
+        self._write(query, transactions, case_id=link_to_case_id)
 
     def get_graph_data(self):
         if not self.driver: return []
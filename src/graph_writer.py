@@ -0,0 +1,145 @@
+import os
+import time
+import queue
+import random
+import threading
+from neo4j.exceptions import TransientError, ServiceUnavailable, SessionExpired
+
+# Rows per transaction and max time a queued row waits before it is committed
+WRITER_BATCH_ROWS = int(os.getenv("GRAPH_WRITER_BATCH", "2000"))
+WRITER_MAX_AGE_SEC = float(os.getenv("GRAPH_WRITER_MAX_AGE", "0.5"))
+# Queued statements (each at most WRITER_BATCH_ROWS rows) before submit() applies backpressure
+WRITER_QUEUE_SIZE = int(os.getenv("GRAPH_WRITER_QUEUE", "200"))
+WRITER_MAX_RETRIES = 5
+# Bumped after every committed change; analytics re-export the graph when it moves
+# (a node count would miss edits that add and delete as much as they change)
+BUMP_VERSION_QUERY = "MERGE (m:GraphMeta {id: 'graph'}) SET m.version = coalesce(m.version, 0) + 1"
+
+RETRYABLE = (TransientError, ServiceUnavailable, SessionExpired)
+
+class _Barrier:
+    def __init__(self):
+        self.done = threading.Event()
+        self.errors = []
+
+_STOP = object()
+
+class GraphWriter:
+    """
+    Write-behind queue in front of Neo4j. Callers submit UNWIND statements with their
+    rows and return immediately; one background thread coalesces consecutive rows of the
+    same statement and commits them in managed transactions (execute_write) once
+    batch_rows are pending or the oldest row is max_age seconds old. Order of submission
+    is preserved, so a FIR's Person is written before the CDR rows that link to it.
+    """
+
+    def __init__(self, driver, batch_rows=WRITER_BATCH_ROWS, max_age=WRITER_MAX_AGE_SEC,
+                 queue_size=WRITER_QUEUE_SIZE, max_retries=WRITER_MAX_RETRIES):
+        self.driver = driver
+        self.batch_rows = max(1, batch_rows)
+        self.max_age = max_age
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._errors = []
+        self._stats = {"transactions": 0, "rows": 0, "retries": 0, "failed_rows": 0}
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="graph-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, query, rows, **params):
+        """
+        Queues rows for `query` (which reads them via UNWIND $rows). Blocks only when the
+        queue is full, i.e. when Neo4j is persistently slower than ingestion.
+        """
+        if not rows:
+            return
+        key = (query, repr(sorted(params.items())))
+        for i in range(0, len(rows), self.batch_rows):
+            self._queue.put((key, query, params, list(rows[i:i + self.batch_rows])))
+
+    def flush(self, timeout=None):
+        """
+        Barrier: returns once everything submitted before the call is committed (or has
+        failed for good). Returns the errors of batches that failed since the last flush.
+        """
+        barrier = _Barrier()
+        self._queue.put(barrier)
+        if not barrier.done.wait(timeout):
+            raise TimeoutError("Graph writer did not drain in time")
+        return barrier.errors
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats, queued=self._queue.qsize())
+
+    def close(self):
+        errors = self.flush()
+        self._queue.put(_STOP)
+        self._thread.join()
+        return errors
+
+    def _run(self):
+        groups = []   # [[key, query, params, rows]] in submission order
+        pending = 0
+        oldest = None
+        while True:
+            timeout = None if not groups else max(0.0, oldest + self.max_age - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # oldest row reached max_age
+
+            if item is _STOP:
+                return
+            if isinstance(item, _Barrier):
+                if groups: self._commit(groups)
+                groups, pending, oldest = [], 0, None
+                item.errors, self._errors = self._errors, []
+                item.done.set()
+                continue
+
+            if item is not None:
+                key, query, params, rows = item
+                if groups and groups[-1][0] == key and len(groups[-1][3]) + len(rows) <= self.batch_rows:
+                    groups[-1][3].extend(rows)
+                else:
+                    groups.append([key, query, params, rows])
+                pending += len(rows)
+                oldest = oldest or time.monotonic()
+
+            if groups and (item is None or pending >= self.batch_rows or time.monotonic() - oldest >= self.max_age):
+                self._commit(groups)
+                groups, pending, oldest = [], 0, None
+
+    def _commit(self, groups):
+        def work(tx):
+            for _, query, params, rows in groups:
+                tx.run(query, rows=rows, **params).consume()
+
+        rows = sum(len(g[3]) for g in groups)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.driver.session() as session:
+                    session.execute_write(work)
+                    session.execute_write(lambda tx: tx.run(BUMP_VERSION_QUERY).consume())
+                with self._stats_lock:
+                    self._stats["transactions"] += 1
+                    self._stats["rows"] += rows
+                return
+            except RETRYABLE as e:
+                # execute_write already retried within its own time budget; this covers
+                # leader switches/restarts that outlast it
+                if attempt == self.max_retries:
+                    error = e
+                    break
+                with self._stats_lock:
+                    self._stats["retries"] += 1
+                time.sleep(min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random()))
+            except Exception as e:
+                error = e
+                break
+
+        print(f"❌ [WRITER] Dropped a batch of {rows} rows: {error}", flush=True)
+        with self._stats_lock:
+            self._stats["failed_rows"] += rows
+        self._errors.append(error)
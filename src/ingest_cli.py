@@ -0,0 +1,165 @@
+"""
+Headless ingestion for cron / ingest servers.
+
+    python -m src.ingest_cli Evidence_DB/ --workers 4 --batch-size 5000
+    python -m src.ingest_cli case.zip --case FIR_2024_9900 --dry-run
+
+Progress is written to stdout as JSON lines; processor logs go to stderr.
+"""
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.bulk_loader import ingest_files, walk_files, archive_complete
+from src.ingest_state import IngestState, Checkpoint, archive_fingerprint
+from src.ingest_scheduler import HOT_PRIORITY, job_priority
+from src.utils import metrics
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+_out_lock = threading.Lock()
+_stdout = sys.stdout
+
+def emit(event, **fields):
+    """One JSON object per line on the real stdout."""
+    with _out_lock:
+        _stdout.write(json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, default=str) + "\n")
+        _stdout.flush()
+
+def build_jobs(paths, case_id=None):
+    """
+    Expands CLI paths into jobs: one per ZIP archive (case = archive name unless --case),
+    one per loose file, and one shared job for loose CCTV stills so they are deduped together.
+    """
+    jobs, images = [], []
+    for path in paths:
+        if os.path.isdir(path):
+            for file_path in sorted(walk_files(path)):
+                if file_path.lower().endswith('.zip'):
+                    jobs.append({"type": "archive", "path": file_path, "case_id": case_id or os.path.splitext(os.path.basename(file_path))[0]})
+                elif file_path.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append(file_path)
+                else:
+                    jobs.append({"type": "files", "paths": [file_path], "case_id": case_id})
+        elif path.lower().endswith('.zip'):
+            jobs.append({"type": "archive", "path": path, "case_id": case_id or os.path.splitext(os.path.basename(path))[0]})
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            images.append(path)
+        else:
+            jobs.append({"type": "files", "paths": [path], "case_id": case_id})
+    if images:
+        jobs.append({"type": "files", "paths": images, "case_id": case_id})
+    return jobs
+
+def prioritize_jobs(jobs, hot_case=None):
+    """Orders jobs cheapest/most urgent first; jobs of hot_case go ahead of everything."""
+    def key(job):
+        rank, size = job_priority([job["path"]] if job["type"] == "archive" else job["paths"])
+        return (HOT_PRIORITY if hot_case and job["case_id"] == hot_case else rank, size)
+    return sorted(jobs, key=key)
+
+def run_job(gm, job, resume=False, delta=True):
+    """
+    Runs one job and returns its per-file results. Archive progress is checkpointed;
+    with resume=True a previously interrupted archive continues where it stopped.
+    delta=False re-reads CDR/bank files in full instead of only their appended rows.
+    """
+    def on_result(file_path, result):
+        emit("file", path=file_path, case_id=job["case_id"], **result)
+
+    if job["type"] == "archive":
+        archive_key = os.path.abspath(job["path"])
+        fingerprint = archive_fingerprint(job["path"])
+        # A dry run (no graph) neither reads nor resets checkpoints, so loaded archives stay finished
+        state = IngestState() if gm else None
+        try:
+            if state and resume and state.archive_done(archive_key, fingerprint):
+                emit("archive_skipped", path=job["path"], case_id=job["case_id"])
+                return []
+            emit("archive", path=job["path"], case_id=job["case_id"])
+            if state: state.start_archive(archive_key, fingerprint, resume, job["case_id"])
+            with tempfile.TemporaryDirectory() as temp_dir:
+                with zipfile.ZipFile(job["path"], 'r') as zip_ref:
+                    zip_ref.extractall(temp_dir)
+                checkpoint = Checkpoint(state, archive_key, temp_dir, barrier=gm.flush) if state else None
+                results = ingest_files(gm, walk_files(temp_dir), case_id=job["case_id"], on_result=on_result, checkpoint=checkpoint, delta=delta)
+            # Archives with failed files stay open so a resumed run retries those files
+            if state and archive_complete(results): state.finish_archive(archive_key)
+            return results
+        finally:
+            if state: state.close()
+    return ingest_files(gm, job["paths"], case_id=job["case_id"], on_result=on_result, delta=delta)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.ingest_cli", description="Headless IntelliCase evidence ingestion.")
+    parser.add_argument("paths", nargs="+", help="ZIP case archives, evidence folders or individual files")
+    parser.add_argument("--workers", type=int, default=1, help="jobs processed concurrently (default 1)")
+    parser.add_argument("--batch-size", type=int, default=None, help="rows per graph write transaction (write-behind batch size)")
+    parser.add_argument("--dry-run", action="store_true", help="route and process files but write nothing to Neo4j")
+    parser.add_argument("--case", dest="case_id", default=None, help="link everything to this case id")
+    parser.add_argument("--resume", action="store_true", help="skip finished archives and continue interrupted ones from their last checkpoint")
+    parser.add_argument("--hot-case", default=None, help="run jobs of this case id before all others")
+    parser.add_argument("--full", action="store_true", help="re-read CDR/bank files in full instead of only rows appended since the last load")
+    args = parser.parse_args(argv)
+
+    gm = None
+    if not args.dry_run:
+        from src.graph_manager import GraphManager
+        gm = GraphManager(write_batch_size=args.batch_size, write_behind=True)
+        if not gm.driver:
+            emit("error", message="Could not connect to Neo4j")
+            return 2
+
+    jobs = prioritize_jobs(build_jobs(args.paths, case_id=args.case_id), hot_case=args.hot_case)
+    emit("start", jobs=len(jobs), workers=args.workers, batch_size=args.batch_size, dry_run=args.dry_run)
+
+    start = time.monotonic()
+    results = []
+    failed_jobs = 0
+
+    # Processors print human-readable progress; keep stdout clean for the JSON stream
+    with contextlib.redirect_stdout(sys.stderr):
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = {pool.submit(run_job, gm, job, args.resume, not args.full): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    failed_jobs += 1
+                    emit("job_error", job=job.get("path") or job.get("paths"), error=str(e))
+
+    if gm:
+        try:
+            gm.flush()
+        except Exception as e:
+            failed_jobs += 1
+            emit("write_error", error=str(e))
+        gm.close()
+
+    elapsed = max(time.monotonic() - start, 1e-9)
+    files = len(results)
+    rows = sum(r["rows"] for _, r in results)
+    counters = metrics.snapshot()
+    emit("summary",
+         files=files,
+         linked=sum(1 for _, r in results if r["linked"]),
+         errors=sum(1 for _, r in results if r["error"]) + failed_jobs,
+         rows=rows,
+         elapsed_sec=round(elapsed, 2),
+         files_per_sec=round(files / elapsed, 2),
+         rows_per_sec=round(rows / elapsed, 1),
+         llm_calls=counters.get("llm_calls", 0),
+         ocr_calls=counters.get("ocr_calls", 0),
+         fir_rules=counters.get("fir_rules", 0),
+         phone_lookups=counters.get("phone_lookups", 0))
+    return 0 if failed_jobs == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
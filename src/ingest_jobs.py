@@ -0,0 +1,117 @@
+import os
+import time
+import uuid
+import shutil
+import zipfile
+import threading
+from src.utils.disk_cache import CACHE_DIR
+from src.ingest_scheduler import WorkQueue, job_priority
+
+SPOOL_DIR = CACHE_DIR / "spool"
+COPY_CHUNK = 1 << 20  # uploads are streamed to disk 1 MB at a time
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+
+def spool_upload(uploaded_file, job_dir):
+    """Streams an uploaded file (any file-like with .name/.read) into job_dir without buffering it whole."""
+    os.makedirs(job_dir, exist_ok=True)
+    path = os.path.join(job_dir, os.path.basename(uploaded_file.name))
+    uploaded_file.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(uploaded_file, out, COPY_CHUNK)
+    return path
+
+class IngestJobManager:
+    """
+    Runs uploads off the Streamlit script thread. One instance is shared by all sessions
+    (st.cache_resource), so jobs keep running when the analyst navigates away and the
+    UI only polls job state. Queued jobs are started cheapest/most urgent first
+    (see ingest_scheduler), so a FIR upload does not wait behind a video batch.
+    """
+
+    def __init__(self, max_workers=INGEST_WORKERS):
+        self._queue = WorkQueue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._worker, name=f"ingest-{i}", daemon=True) for i in range(max_workers)]
+        for worker in self._workers: worker.start()
+
+    def _worker(self):
+        while True:
+            claimed = self._queue.get()
+            if claimed is None:
+                return
+            job_id, (job_dir, paths, case_id) = claimed
+            self._run(job_id, job_dir, paths, case_id)
+
+    def submit_uploads(self, uploaded_files, label, case_id=None):
+        """Spools uploads to disk and queues them by priority. Returns the job id immediately."""
+        job_id = uuid.uuid4().hex[:8]
+        job_dir = str(SPOOL_DIR / job_id)
+        paths = [spool_upload(f, job_dir) for f in uploaded_files]
+
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id, "label": label, "status": "queued",
+                "total": len(paths), "done": 0, "rows": 0, "errors": [],
+                "submitted": time.time(), "finished": None
+            }
+        self._queue.put(job_id, (job_dir, paths, case_id), priority=job_priority(paths))
+        return job_id
+
+    def promote(self, job_id):
+        """Hot override: runs a queued job next, ahead of everything else waiting."""
+        return self._queue.promote(job_id)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _run(self, job_id, job_dir, paths, case_id):
+        from src.graph_manager import GraphManager
+        from src.bulk_loader import ingest_files, walk_files
+
+        self._update(job_id, status="running")
+        gm = GraphManager(write_behind=True)
+        try:
+            # Archives are unpacked inside the job's spool dir and ingested like Evidence_DB cases
+            files = []
+            for path in paths:
+                if path.lower().endswith('.zip'):
+                    extract_dir = os.path.join(job_dir, os.path.splitext(os.path.basename(path))[0])
+                    with zipfile.ZipFile(path, 'r') as z: z.extractall(extract_dir)
+                    files.extend(walk_files(extract_dir))
+                else:
+                    files.append(path)
+            self._update(job_id, total=len(files))
+
+            def on_result(file_path, result):
+                with self._lock:
+                    job = self._jobs[job_id]
+                    job["done"] += 1
+                    job["rows"] += result["rows"]
+                    if result["error"]:
+                        job["errors"].append(f"{os.path.basename(file_path)}: {result['error']}")
+
+            ingest_files(gm, files, case_id=case_id, on_result=on_result)
+            gm.flush()
+            self._update(job_id, status="done", finished=time.time())
+        except Exception as e:
+            with self._lock:
+                self._jobs[job_id]["errors"].append(str(e))
+            self._update(job_id, status="failed", finished=time.time())
+        finally:
+            gm.close()
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    def _snapshot(self, job):
+        return dict(job, errors=list(job["errors"]), position=self._queue.position(job["id"]))
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def list_jobs(self, job_ids=None):
+        with self._lock:
+            ids = job_ids if job_ids is not None else list(self._jobs)
+            return [self._snapshot(self._jobs[j]) for j in ids if j in self._jobs]
@@ -0,0 +1,256 @@
+"""
+Lease-based ingestion job queue on SQLite.
+
+    python -m src.ingest_queue enqueue Evidence_DB/            # coordinator
+    python -m src.ingest_queue work --workers 4                # worker processes
+    python -m src.ingest_queue promote FIR_2024_9900           # hot case jumps the queue
+    python -m src.ingest_queue status
+
+Coordinator and workers must run on the host whose local disk holds the queue file:
+SQLite's file locking is not reliable over NFS/SMB, so two workers on a network share
+could claim the same job.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from src.utils.disk_cache import CACHE_DIR
+from src.ingest_scheduler import HOT_PRIORITY, job_priority
+
+DEFAULT_QUEUE_PATH = os.getenv("INGEST_QUEUE_PATH", str(CACHE_DIR / "ingest_queue.sqlite"))
+LEASE_SECONDS = 600
+MAX_ATTEMPTS = 3
+
+class JobQueue:
+    """
+    Jobs move queued -> leased -> done/failed. A lease that is not renewed before it
+    expires (worker crashed or was killed) puts the job back to queued, up to MAX_ATTEMPTS.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_key TEXT UNIQUE NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                enqueued_at REAL NOT NULL,
+                finished_at REAL,
+                error TEXT,
+                result TEXT
+            )""")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "priority" not in columns:
+            # Queues created before prioritisation
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN est_bytes INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_priority ON jobs (status, priority, est_bytes, id)")
+
+    def _txn(self, fn):
+        # BEGIN IMMEDIATE takes the write lock up front so two workers never claim the same job
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return out
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, job, priority=(0, 0)):
+        """
+        Adds a job dict (see ingest_cli.build_jobs) with a (work class, bytes) priority from
+        ingest_scheduler.job_priority. Re-enqueueing a finished job runs it again.
+        Paths are stored absolute, so workers started elsewhere find the files and one
+        file enqueued through different relative paths is still one job.
+        """
+        job = dict(job)
+        if job.get('path'): job['path'] = os.path.abspath(job['path'])
+        if job.get('paths'): job['paths'] = [os.path.abspath(p) for p in job['paths']]
+        key = f"{job['type']}:{job.get('path') or '|'.join(job.get('paths', []))}:{job.get('case_id')}"
+        def fn(conn):
+            conn.execute("""
+                INSERT INTO jobs (job_key, payload, enqueued_at, priority, est_bytes) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(job_key) DO UPDATE SET status = 'queued', attempts = 0, error = NULL,
+                    lease_owner = NULL, lease_expires = NULL, payload = excluded.payload,
+                    priority = excluded.priority, est_bytes = excluded.est_bytes
+                WHERE jobs.status IN ('done', 'failed')
+            """, (key, json.dumps(job), time.time(), priority[0], priority[1]))
+        self._txn(fn)
+
+    def promote_case(self, case_id):
+        """Hot override: queued jobs of case_id are claimed before any other. Returns how many moved."""
+        def fn(conn):
+            cur = conn.execute("UPDATE jobs SET priority = ? WHERE status = 'queued' AND json_extract(payload, '$.case_id') = ?",
+                               (HOT_PRIORITY, case_id))
+            return cur.rowcount
+        return self._txn(fn)
+
+    def _expire_leases(self, conn, now):
+        conn.execute("""
+            UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                   error = COALESCE(error, 'lease expired'), lease_owner = NULL, lease_expires = NULL
+            WHERE status = 'leased' AND lease_expires < ?
+        """, (self.max_attempts, now))
+
+    def claim(self, worker_id):
+        """Leases the most urgent queued job to worker_id. Returns (job_id, job) or None."""
+        def fn(conn):
+            now = time.time()
+            self._expire_leases(conn, now)
+            row = conn.execute("SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY priority, est_bytes, id LIMIT 1").fetchone()
+            if not row:
+                return None
+            conn.execute("""
+                UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE id = ?
+            """, (worker_id, now + self.lease_seconds, row[0]))
+            return row[0], json.loads(row[1])
+        return self._txn(fn)
+
+    def renew(self, job_id, worker_id):
+        """Extends the lease; returns False if the job was taken away (lease already expired)."""
+        def fn(conn):
+            cur = conn.execute("UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                               (time.time() + self.lease_seconds, job_id, worker_id))
+            return cur.rowcount == 1
+        return self._txn(fn)
+
+    def complete(self, job_id, worker_id, result=None):
+        def fn(conn):
+            conn.execute("""
+                UPDATE jobs SET status = 'done', finished_at = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL
+                WHERE id = ? AND lease_owner = ?
+            """, (time.time(), json.dumps(result), job_id, worker_id))
+        self._txn(fn)
+
+    def fail(self, job_id, worker_id, error):
+        def fn(conn):
+            conn.execute("""
+                UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                       error = ?, lease_owner = NULL, lease_expires = NULL
+                WHERE id = ? AND lease_owner = ?
+            """, (self.max_attempts, str(error), job_id, worker_id))
+        self._txn(fn)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, count(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        self._conn.close()
+
+def _heartbeat(queue, job_id, worker_id, stop):
+    while not stop.wait(queue.lease_seconds / 3):
+        if not queue.renew(job_id, worker_id):
+            print(f"⚠️ [QUEUE] Lost lease on job {job_id}", flush=True)
+            return
+
+def run_worker(queue_path=DEFAULT_QUEUE_PATH, batch_size=None, drain=False, poll_interval=5.0):
+    """
+    Claims and runs jobs until the queue is empty (drain=True) or forever.
+    Each job goes through the same pipeline as the CLI and writes via GraphManager.
+    """
+    from src.graph_manager import GraphManager
+    from src.ingest_cli import run_job
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    queue = JobQueue(queue_path)
+    gm = GraphManager(write_batch_size=batch_size, write_behind=True)
+    if not gm.driver:
+        print(f"❌ [QUEUE] {worker_id} could not connect to Neo4j.", flush=True)
+        return
+
+    print(f"👷 [QUEUE] Worker {worker_id} started.", flush=True)
+    try:
+        while True:
+            claimed = queue.claim(worker_id)
+            if not claimed:
+                if drain: break
+                time.sleep(poll_interval)
+                continue
+
+            job_id, job = claimed
+            stop = threading.Event()
+            beat = threading.Thread(target=_heartbeat, args=(queue, job_id, worker_id, stop), daemon=True)
+            beat.start()
+            try:
+                # A re-leased job (crashed worker) picks up from the previous attempt's checkpoints
+                results = run_job(gm, job, resume=True)
+                gm.flush()  # only report done once every queued write is committed
+                summary = {
+                    "files": len(results),
+                    "linked": sum(1 for _, r in results if r["linked"]),
+                    "rows": sum(r["rows"] for _, r in results)
+                }
+                queue.complete(job_id, worker_id, summary)
+                print(f"✅ [QUEUE] Job {job_id} done: {summary}", flush=True)
+            except Exception as e:
+                queue.fail(job_id, worker_id, e)
+                print(f"❌ [QUEUE] Job {job_id} failed: {e}", flush=True)
+            finally:
+                stop.set()
+                beat.join()
+    finally:
+        gm.close()
+        queue.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.ingest_queue", description="Distributed IntelliCase ingestion queue.")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="path of the SQLite queue file (local disk)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_enqueue = sub.add_parser("enqueue", help="add archive/file jobs")
+    p_enqueue.add_argument("paths", nargs="+")
+    p_enqueue.add_argument("--case", dest="case_id", default=None)
+
+    p_work = sub.add_parser("work", help="run worker processes on this machine")
+    p_work.add_argument("--workers", type=int, default=1)
+    p_work.add_argument("--batch-size", type=int, default=None)
+    p_work.add_argument("--drain", action="store_true", help="exit once the queue is empty")
+
+    p_promote = sub.add_parser("promote", help="run queued jobs of a case before all others")
+    p_promote.add_argument("case_id")
+
+    sub.add_parser("status", help="job counts by status")
+    args = parser.parse_args(argv)
+
+    if args.command == "enqueue":
+        from src.ingest_cli import build_jobs
+        queue = JobQueue(args.queue)
+        jobs = build_jobs(args.paths, case_id=args.case_id)
+        for job in jobs:
+            queue.enqueue(job, job_priority([job["path"]] if job["type"] == "archive" else job["paths"]))
+        print(f"📥 [QUEUE] Enqueued {len(jobs)} job(s). {queue.stats()}", flush=True)
+
+    elif args.command == "work":
+        procs = [multiprocessing.Process(target=run_worker, args=(args.queue, args.batch_size, args.drain)) for _ in range(args.workers)]
+        for p in procs: p.start()
+        for p in procs: p.join()
+
+    elif args.command == "promote":
+        moved = JobQueue(args.queue).promote_case(args.case_id)
+        print(f"⚡ [QUEUE] Promoted {moved} queued job(s) of {args.case_id}.", flush=True)
+
+    elif args.command == "status":
+        print(json.dumps(JobQueue(args.queue).stats()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Cost/value ordering for ingestion work.
+
+FIRs are cheap (rules or cached LLM) and are what analysts triage from, so they land
+first; small CDRs next, then bank statements and large CDRs, then CCTV stills (OCR)
+and finally video. Jobs for a "hot" case jump ahead of everything still queued.
+"""
+import os
+import heapq
+import zipfile
+import functools
+import itertools
+import threading
+from src.processors.router import open_routed
+
+# Lower runs first
+HOT_PRIORITY = -1
+KIND_PRIORITY = {"fir": 0, "cdr": 1, "bank": 2, "archive": 2, "cctv": 3, "video": 4, "unknown": 5}
+
+# CDRs above this are ordered with bank statements instead of ahead of them
+SMALL_CDR_BYTES = int(os.getenv("INGEST_SMALL_CDR_MB", "50")) * 1024 * 1024
+
+# Sniffs remembered per (path, size, mtime), so a file prioritised at submit is not sniffed again at load
+SNIFF_CACHE_SIZE = 4096
+
+# Used for ZIP members, which are prioritised from the archive index without extracting
+EXTENSION_KINDS = {
+    ".pdf": "fir", ".txt": "fir", ".csv": "cdr",
+    ".jpg": "cctv", ".jpeg": "cctv", ".png": "cctv",
+    ".mp4": "video", ".avi": "video", ".mov": "video", ".mkv": "video", ".webm": "video", ".3gp": "video",
+}
+
+def work_class(kind, size_bytes=0):
+    if kind == "cdr" and size_bytes > SMALL_CDR_BYTES:
+        return KIND_PRIORITY["bank"]
+    return KIND_PRIORITY.get(kind, KIND_PRIORITY["unknown"])
+
+@functools.lru_cache(maxsize=SNIFF_CACHE_SIZE)
+def _sniff(path, size, mtime_ns):
+    handle, sniff = open_routed(path)
+    handle.close()
+    return sniff
+
+def sniff_file(path):
+    """Router sniff of a file's head; an unchanged file is only read the first time."""
+    stat = os.stat(path)
+    return _sniff(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+def plan_files(file_paths):
+    """
+    Sniffs every file once and returns [(path, sniff)] ordered by (work class, size).
+    Files that cannot be opened get sniff=None and sort last.
+    """
+    planned = []
+    for path in file_paths:
+        try:
+            sniff = sniff_file(path)
+            size = os.path.getsize(path)
+        except OSError:
+            sniff, size = None, 0
+        kind = sniff["kind"] if sniff else "unknown"
+        planned.append(((work_class(kind, size), size), path, sniff))
+    planned.sort(key=lambda p: p[0])
+    return [(path, sniff) for _, path, sniff in planned]
+
+def _archive_members(path):
+    with zipfile.ZipFile(path, 'r') as z:
+        return [(info.file_size, EXTENSION_KINDS.get(os.path.splitext(info.filename)[1].lower(), "unknown"))
+                for info in z.infolist() if not info.is_dir()]
+
+def job_priority(paths):
+    """
+    (work class, total bytes) for a job over paths: the class of its most urgent file,
+    then smallest first. ZIP archives are judged by their member names and sizes.
+    """
+    best, total = KIND_PRIORITY["unknown"], 0
+    for path in paths:
+        try:
+            if path.lower().endswith('.zip'):
+                members = _archive_members(path)
+            else:
+                members = [(os.path.getsize(path), sniff_file(path)["kind"])]
+        except (OSError, zipfile.BadZipFile):
+            continue
+        for size, kind in members:
+            best = min(best, work_class(kind, size))
+            total += size
+    return best, total
+
+class WorkQueue:
+    """
+    Blocking priority queue for ingestion jobs. Entries order by (priority, est. bytes,
+    arrival); promote() moves a queued entry to HOT_PRIORITY.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, key, item, priority=(KIND_PRIORITY["unknown"], 0)):
+        with self._cond:
+            entry = [priority[0], priority[1], next(self._seq), key, item]
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            self._cond.notify()
+
+    def get(self):
+        """Blocks for the most urgent entry; returns (key, item), or None once closed."""
+        with self._cond:
+            while not self._heap and not self._closed:
+                self._cond.wait()
+            if not self._heap:
+                return None
+            entry = heapq.heappop(self._heap)
+            del self._entries[entry[3]]
+            return entry[3], entry[4]
+
+    def promote(self, key):
+        """Moves one queued entry to the front. Returns False if it is no longer queued."""
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if entry[0] != HOT_PRIORITY:
+                entry[0] = HOT_PRIORITY
+                heapq.heapify(self._heap)
+            return True
+
+    def position(self, key):
+        """0-based place in line, or None if not queued."""
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return sum(1 for e in self._entries.values() if e[:3] < entry[:3])
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,246 @@
+import os
+import time
+import sqlite3
+import threading
+from src.utils.disk_cache import CACHE_DIR, file_sha256
+from src.processors.csv_delta import complete_lines_end, prefix_fingerprint
+
+DEFAULT_STATE_PATH = os.getenv("INGEST_STATE_PATH", str(CACHE_DIR / "ingest_state.sqlite"))
+
+# Rows written (and checkpointed) per transaction when a checkpoint is active
+CHECKPOINT_BATCH = int(os.getenv("INGEST_CHECKPOINT_BATCH", "5000"))
+
+class IngestState:
+    """
+    Persistent ingestion progress: which archives and files are fully loaded, and how
+    many rows of a partially written file are already committed to the graph.
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS archives (
+                archive_key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL,
+                status TEXT NOT NULL, updated REAL NOT NULL, case_id TEXT
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                archive_key TEXT NOT NULL, file_key TEXT NOT NULL, fingerprint TEXT NOT NULL,
+                status TEXT NOT NULL, rows_committed INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL,
+                PRIMARY KEY (archive_key, file_key)
+            );
+            CREATE TABLE IF NOT EXISTS streams (
+                stream_key TEXT PRIMARY KEY, byte_offset INTEGER NOT NULL,
+                rows_consumed INTEGER NOT NULL, fingerprint TEXT NOT NULL, updated REAL NOT NULL,
+                parsed_end INTEGER
+            );
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(archives)")}
+        if "case_id" not in columns:
+            # State files created before per-case purging
+            self._conn.execute("ALTER TABLE archives ADD COLUMN case_id TEXT")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(streams)")}
+        if "parsed_end" not in columns:
+            # State files created before unterminated last rows were parsed
+            self._conn.execute("ALTER TABLE streams ADD COLUMN parsed_end INTEGER")
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cur
+
+    def _fetchone(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def archive_done(self, archive_key, fingerprint):
+        row = self._fetchone("SELECT fingerprint, status FROM archives WHERE archive_key = ?", (archive_key,))
+        return bool(row) and row[0] == fingerprint and row[1] == 'done'
+
+    def start_archive(self, archive_key, fingerprint, resume, case_id=None):
+        """Fresh runs (or a changed archive) drop previous file checkpoints for it."""
+        row = self._fetchone("SELECT fingerprint FROM archives WHERE archive_key = ?", (archive_key,))
+        if not resume or not row or row[0] != fingerprint:
+            self._execute("DELETE FROM files WHERE archive_key = ?", (archive_key,))
+        self._execute("INSERT OR REPLACE INTO archives (archive_key, fingerprint, status, updated, case_id) VALUES (?, ?, 'running', ?, ?)",
+                      (archive_key, fingerprint, time.time(), case_id))
+
+    def finish_archive(self, archive_key):
+        self._execute("UPDATE archives SET status = 'done', updated = ? WHERE archive_key = ?", (time.time(), archive_key))
+
+    def file_progress(self, archive_key, file_key, fingerprint):
+        """Returns (done, rows_committed) for a file; a changed file starts over."""
+        row = self._fetchone("SELECT fingerprint, status, rows_committed FROM files WHERE archive_key = ? AND file_key = ?", (archive_key, file_key))
+        if not row or row[0] != fingerprint:
+            return False, 0
+        return row[1] == 'done', row[2]
+
+    def commit_rows(self, archive_key, file_key, fingerprint, rows_committed):
+        self._execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, 'running', ?, ?)",
+                      (archive_key, file_key, fingerprint, rows_committed, time.time()))
+
+    def finish_file(self, archive_key, file_key, fingerprint, rows_committed=0):
+        self._execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, 'done', ?, ?)",
+                      (archive_key, file_key, fingerprint, rows_committed, time.time()))
+
+    def stream_offset(self, stream_key):
+        """
+        (byte_offset, rows_consumed, prefix fingerprint, parsed_end) already ingested for a
+        growing CSV; parsed_end is the file size last parsed (past byte_offset if it ended
+        in an unterminated row), None if unknown.
+        """
+        row = self._fetchone("SELECT byte_offset, rows_consumed, fingerprint, parsed_end FROM streams WHERE stream_key = ?", (stream_key,))
+        return tuple(row) if row else (0, 0, None, None)
+
+    def commit_stream(self, stream_key, byte_offset, rows_consumed, fingerprint, parsed_end=None):
+        self._execute("INSERT OR REPLACE INTO streams (stream_key, byte_offset, rows_consumed, fingerprint, updated, parsed_end) "
+                      "VALUES (?, ?, ?, ?, ?, ?)",
+                      (stream_key, byte_offset, rows_consumed, fingerprint, time.time(), parsed_end))
+
+    def reset_streams(self, case_id=None):
+        """Forget consumed offsets (all, or one case's) so the next load re-reads files in full."""
+        if case_id is None:
+            self._execute("DELETE FROM streams")
+        else:
+            prefix = f"{case_id}|"
+            self._execute("DELETE FROM streams WHERE substr(stream_key, 1, ?) = ?", (len(prefix), prefix))
+
+    def reset_case(self, case_id):
+        """Forget everything loaded for one case: its archives, their file checkpoints and its CSV offsets."""
+        with self._lock:
+            rows = self._conn.execute("SELECT archive_key, case_id FROM archives").fetchall()
+        # Archives recorded before case_id was stored are named after their case
+        keys = [key for key, archive_case in rows
+                if archive_case == case_id or (archive_case is None and os.path.splitext(os.path.basename(key))[0] == case_id)]
+        for key in keys:
+            self._execute("DELETE FROM files WHERE archive_key = ?", (key,))
+            self._execute("DELETE FROM archives WHERE archive_key = ?", (key,))
+        self.reset_streams(case_id)
+
+    def reset(self):
+        """Forget all progress (after the graph itself was purged)."""
+        for table in ("archives", "files", "streams"):
+            self._execute(f"DELETE FROM {table}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def archive_fingerprint(path):
+    # Size + mtime: hashing multi-GB archives on every run would defeat the point of resuming
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+class Checkpoint:
+    """
+    Binds IngestState to one archive extracted under root; file keys are paths relative to root.
+    With a write-behind GraphManager pass barrier=gm.flush: progress marks are then held
+    back and only recorded by sync(), after the writes they describe are committed.
+    """
+
+    def __init__(self, state, archive_key, root, batch_size=CHECKPOINT_BATCH, barrier=None):
+        self.state = state
+        self.archive_key = archive_key
+        self.root = root
+        self.batch_size = batch_size
+        self.barrier = barrier
+        self._fingerprints = {}
+        self._marks = []
+
+    def _key(self, file_path):
+        return os.path.relpath(file_path, self.root)
+
+    def _fingerprint(self, file_path):
+        if file_path not in self._fingerprints:
+            self._fingerprints[file_path] = file_sha256(file_path)
+        return self._fingerprints[file_path]
+
+    def progress(self, file_path):
+        return self.state.file_progress(self.archive_key, self._key(file_path), self._fingerprint(file_path))
+
+    def _mark(self, record, file_path, rows_committed):
+        self._marks.append((record, self._key(file_path), self._fingerprint(file_path), rows_committed))
+        if self.barrier is None:
+            self.sync()
+
+    def commit(self, file_path, rows_committed):
+        self._mark(self.state.commit_rows, file_path, rows_committed)
+
+    def finish(self, file_path, rows_committed=0):
+        self._mark(self.state.finish_file, file_path, rows_committed)
+
+    def sync(self):
+        """Waits for queued graph writes, then records the progress marks made before them."""
+        if self.barrier is not None and self._marks:
+            self.barrier()
+        marks, self._marks = self._marks, []
+        for record, file_key, fingerprint, rows_committed in marks:
+            record(self.archive_key, file_key, fingerprint, rows_committed)
+
+    def write_batches(self, file_path, rows, write, start=0):
+        """
+        Writes rows[start:] in batches, checkpointing after each committed batch.
+        MERGE-based writes make a replayed batch idempotent if we crash between
+        the graph commit and the checkpoint.
+        """
+        for i in range(start, len(rows), self.batch_size):
+            chunk = rows[i:i + self.batch_size]
+            write(chunk)
+            self.commit(file_path, i + len(chunk))
+            self.sync()
+        self.finish(file_path, len(rows))
+
+class CsvDelta:
+    """
+    How much of a growing CDR/bank CSV is new since the last load. Streams are keyed by
+    case + kind + file name, so a daily re-export lands on the same key; if the consumed
+    prefix no longer matches (file replaced or rewritten) the file is read in full again.
+    """
+
+    def __init__(self, state, stream_key, handle):
+        self.state = state
+        self.stream_key = stream_key
+        self.handle = handle
+        offset, rows, fingerprint, parsed_end = state.stream_offset(stream_key)
+        handle.seek(0, os.SEEK_END)
+        self.size = handle.tell()
+        # Only whole lines count as consumed. An unterminated last row (a file saved without
+        # a final newline, or one the exporter is still writing) is parsed, but read again
+        # next time in case it was still growing; writes are MERGEs, so that is harmless
+        self.end = complete_lines_end(handle)
+        if offset and (offset > self.end or prefix_fingerprint(handle, offset) != fingerprint):
+            offset, rows, parsed_end = 0, 0, None
+        self.start = offset
+        self.rows_before = rows
+        self._parsed_end = parsed_end
+        handle.seek(self.end)
+        self.tail_row = bool(handle.read(self.size - self.end).strip())
+
+    @property
+    def byte_range(self):
+        return (self.start, self.size)
+
+    def has_new_rows(self):
+        # Same size as last parsed: only the unterminated row seen last time is left
+        return self.size > self.start and self.size != self._parsed_end
+
+    def commit(self, rows):
+        consumed = self.rows_before + rows - (1 if self.tail_row and rows else 0)
+        self.state.commit_stream(self.stream_key, self.end, consumed, prefix_fingerprint(self.handle, self.end), self.size)
+
+def stream_key(case_id, kind, file_path):
+    return f"{case_id or ''}|{kind}|{os.path.basename(file_path)}"
+
+_shared_state = None
+_shared_lock = threading.Lock()
+
+def get_ingest_state():
+    """Process-wide IngestState for callers that are not running a checkpointed archive."""
+    global _shared_state
+    with _shared_lock:
+        if _shared_state is None:
+            _shared_state = IngestState()
+        return _shared_state
@@ -1,14 +1,20 @@
 import pandas as pd
 import os
+from src.processors.csv_delta import read_csv_sniffed
 
-def process_bank_statement(file_path):
+def process_bank_statement(file_path, sniff=None, byte_range=None):
     """
     Process Bank Statement CSV.
     Expected Columns: Date, Description, Amount, (optional: Type, Balance)
+    file_path may be a path or an open handle; sniff is the router result for it.
+    byte_range=(start, end) parses only that slice of the handle (appended rows).
     """
     print(f"   ↳ [INTERNAL] Analyzing bank statement...", flush=True)
     try:
-        df = pd.read_csv(file_path)
+        if sniff:
+            df = read_csv_sniffed(file_path, sniff, byte_range)
+        else:
+            df = pd.read_csv(file_path)
         
         # Normalize headers: strip whitespace, title case might be risky, let's just strip
         df.columns = [str(c).strip() for c in df.columns]
@@ -1,11 +1,50 @@
-import easyocr
 import warnings
 import re
+import os
+from collections import Counter
+from src.utils.disk_cache import DiskCache, file_sha256
+from src.utils.image_hash import FrameIndex, dhash
+from src.utils import metrics
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
 
+# Hamming distance (out of 64 bits) under which two frames are treated as the same shot
+DUPLICATE_MAX_DISTANCE = 5
+# The plate is a tiny part of a fixed camera's frame, so the hash alone cannot tell two cars
+# apart: stills share OCR only with the previous frame of their burst (same folder, next
+# name), video samples only within this many seconds of the group's last sample
+DUPLICATE_WINDOW_SEC = 2.0
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.3gp')
+
+# Adaptive video sampling (seconds / grey levels)
+PROBE_INTERVAL_SEC = 0.5    # how often a cheap motion probe is taken
+MIN_SAMPLE_GAP_SEC = 1.0    # densest OCR rate while there is motion
+MAX_SAMPLE_GAP_SEC = 30.0   # sparsest OCR rate on static footage
+MOTION_THRESHOLD = 8.0      # mean abs diff of a 64x36 grey thumbnail
+
+_reader = None
+_ocr_cache = None
+
+def _get_reader():
+    """EasyOCR model load is the expensive part, so keep one reader per process."""
+    global _reader
+    if _reader is None:
+        # easyocr pulls in torch; import it only when a frame actually needs OCR
+        import easyocr
+
+        # Initialize EasyOCR Reader (using CPU for compatibility)
+        _reader = easyocr.Reader(['en'], gpu=False, verbose=False)
+    return _reader
+
+def _get_ocr_cache():
+    global _ocr_cache
+    if _ocr_cache is None:
+        _ocr_cache = DiskCache("ocr")
+    return _ocr_cache
+
 def extract_license_plate(text_list):
     """
     Scans a list of text strings for Indian License Plate patterns.
@@ -26,46 +65,223 @@ def extract_license_plate(text_list):
             
     return None
 
+def read_image_text(image_path, file_hash=None):
+    """
+    OCR an image, returning text blocks with confidence > 0.3.
+    Results are cached on disk by exact file hash, so re-ingesting the same image is free.
+    """
+    file_hash = file_hash or file_sha256(image_path)
+    cache = _get_ocr_cache()
+    cached = cache.get(file_hash)
+    if cached is not None:
+        return cached
+
+    detected_text = _run_ocr(image_path)
+    cache.set(file_hash, detected_text)
+    return detected_text
+
+def _run_ocr(image):
+    """Runs EasyOCR on a file path or decoded frame and keeps confident text blocks."""
+    # Read text from image
+    metrics.incr("ocr_calls")
+    results = _get_reader().readtext(image)
+    
+    detected_text = []
+    for (bbox, text, prob) in results:
+        if prob > 0.3:
+            detected_text.append(text)
+    return detected_text
+
+def _build_result(detected_text, source=None):
+    # Smart Extraction: Look for a license plate
+    plate_number = extract_license_plate(detected_text)
+    
+    if plate_number:
+        print(f"   ✅ [SUCCESS] Vehicle Identified: {plate_number}", flush=True)
+        return {
+            "vehicle_number": plate_number,
+            "raw_text": detected_text,
+            "source": source,
+            "status": "success"
+        }
+    else:
+        print(f"   ⚠️ [INFO] No clear license plate found in {len(detected_text)} text blocks.", flush=True)
+        return {
+            "vehicle_number": None,
+            "raw_text": detected_text,
+            "source": source,
+            "status": "partial_success"
+        }
+
 def process_cctv(image_path):
     """
     Process CCTV image to extract text and identify vehicles.
     """
+    if str(image_path).lower().endswith(VIDEO_EXTENSIONS):
+        return process_cctv_video(image_path)
+
     print(f"   ↳ [INTERNAL] Scanning image for text via OCR: {image_path}...", flush=True)
     
     try:
-        # Initialize EasyOCR Reader (using CPU for compatibility)
-        reader = easyocr.Reader(['en'], gpu=False, verbose=False)
-        
-        # Read text from image
-        results = reader.readtext(image_path)
-        
-        detected_text = []
-        for (bbox, text, prob) in results:
-            if prob > 0.3:
-                detected_text.append(text)
-        
-        # Smart Extraction: Look for a license plate
-        plate_number = extract_license_plate(detected_text)
+        return _build_result(read_image_text(image_path), source=str(image_path))
         
-        if plate_number:
-            print(f"   ✅ [SUCCESS] Vehicle Identified: {plate_number}", flush=True)
-            return {
-                "vehicle_number": plate_number,
-                "raw_text": detected_text,
-                "status": "success"
-            }
-        else:
-            print(f"   ⚠️ [INFO] No clear license plate found in {len(detected_text)} text blocks.", flush=True)
-            return {
+    except Exception as e:
+        print(f"   ❌ [ERROR] Processing CCTV image: {str(e)}", flush=True)
+        return {
+            "vehicle_number": None,
+            "error": str(e),
+            "source": str(image_path),
+            "status": "error"
+        }
+
+def process_cctv_batch(image_paths, max_distance=DUPLICATE_MAX_DISTANCE):
+    """
+    Process a set of CCTV frames (e.g. a burst export) with near-duplicate suppression.
+    Frames of one burst (same folder, consecutive in name order) are grouped by
+    perceptual hash; only the first frame of each group is OCR'd and its text is reused
+    for the rest of the group. Unrelated stills never share OCR.
+    Returns a list of results in the same order as image_paths.
+    """
+    print(f"   ↳ [INTERNAL] Scanning {len(image_paths)} CCTV frames (dedupe distance={max_distance})...", flush=True)
+    cache = _get_ocr_cache()
+    indexes = {}
+    group_text = {}
+    results = [None] * len(image_paths)
+    ocr_calls = 0
+
+    order = sorted(range(len(image_paths)), key=lambda i: os.path.split(str(image_paths[i])))
+    for position, i in enumerate(order):
+        image_path = image_paths[i]
+        try:
+            file_hash = file_sha256(image_path)
+            detected_text = cache.get(file_hash)
+            folder = os.path.dirname(str(image_path))
+            index = indexes.setdefault(folder, FrameIndex(max_distance=max_distance, window=1))
+            group_id, is_new = index.group(dhash(image_path), at=position)
+            group_id = (folder, group_id)
+
+            if detected_text is not None:
+                if is_new: group_text[group_id] = detected_text
+            elif is_new:
+                detected_text = read_image_text(image_path, file_hash=file_hash)
+                ocr_calls += 1
+                group_text[group_id] = detected_text
+            else:
+                detected_text = group_text[group_id]
+                # Remember the propagated result so the exact file is free next time too
+                cache.set(file_hash, detected_text)
+
+            results[i] = _build_result(detected_text, source=str(image_path))
+
+        except Exception as e:
+            print(f"   ❌ [ERROR] Processing CCTV image {image_path}: {str(e)}", flush=True)
+            results[i] = {
                 "vehicle_number": None,
-                "raw_text": detected_text,
-                "status": "partial_success"
+                "error": str(e),
+                "source": str(image_path),
+                "status": "error"
             }
-        
+
+    shots = sum(len(index.representatives) for index in indexes.values())
+    print(f"   ℹ️ OCR ran on {ocr_calls}/{len(image_paths)} frames ({shots} distinct shots).", flush=True)
+    return results
+
+def _sample_video_frames(video_path):
+    """
+    Yields (offset_sec, frame) for frames worth OCR-ing.
+    Every PROBE_INTERVAL_SEC a thumbnail is diffed against the previous probe; frames are
+    sampled densely while there is motion or a scene change and only every
+    MAX_SAMPLE_GAP_SEC on static footage. Skipped frames are grabbed but never converted.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video {video_path}")
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        probe_every = max(1, int(round(fps * PROBE_INTERVAL_SEC)))
+        frame_no = 0
+        last_probe = None
+        last_sample = None
+
+        while cap.grab():
+            if frame_no % probe_every == 0:
+                ok, frame = cap.retrieve()
+                if ok:
+                    offset = frame_no / fps
+                    thumb = cv2.cvtColor(cv2.resize(frame, (64, 36)), cv2.COLOR_BGR2GRAY)
+                    motion = float(cv2.absdiff(thumb, last_probe).mean()) if last_probe is not None else float('inf')
+                    last_probe = thumb
+
+                    gap = offset - last_sample if last_sample is not None else float('inf')
+                    if (motion > MOTION_THRESHOLD and gap >= MIN_SAMPLE_GAP_SEC) or gap >= MAX_SAMPLE_GAP_SEC:
+                        last_sample = offset
+                        yield offset, frame
+            frame_no += 1
+    finally:
+        cap.release()
+
+def process_cctv_video(video_path, max_distance=DUPLICATE_MAX_DISTANCE):
+    """
+    Process a CCTV clip: sample frames adaptively, OCR them and collect plate sightings
+    with their offset (seconds) into the clip. Whole-clip results are cached by file hash.
+    """
+    print(f"   ↳ [INTERNAL] Sampling video for plates: {video_path}...", flush=True)
+    source = str(video_path)
+
+    try:
+        from PIL import Image
+        import cv2
+
+        cache = _get_ocr_cache()
+        cache_key = f"video:{file_sha256(video_path)}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"   ℹ️ Using cached video scan ({len(cached['sightings'])} sightings).", flush=True)
+            return {**cached, "source": source}
+
+        index = FrameIndex(max_distance=max_distance, window=DUPLICATE_WINDOW_SEC)
+        group_text = {}
+        sightings = []
+        frames_sampled = 0
+        ocr_calls = 0
+
+        for offset, frame in _sample_video_frames(video_path):
+            frames_sampled += 1
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            group_id, is_new = index.group(dhash(Image.fromarray(rgb)), at=offset)
+            if is_new:
+                group_text[group_id] = _run_ocr(rgb)
+                ocr_calls += 1
+
+            plate = extract_license_plate(group_text[group_id])
+            if plate:
+                sightings.append({"vehicle_number": plate, "offset_sec": round(offset, 2)})
+
+        plates = Counter(s["vehicle_number"] for s in sightings)
+        result = {
+            "vehicle_number": plates.most_common(1)[0][0] if plates else None,
+            "vehicle_numbers": list(plates),
+            "sightings": sightings,
+            "raw_text": [t for texts in group_text.values() for t in texts],
+            "media": "video",
+            "frames_sampled": frames_sampled,
+            "ocr_calls": ocr_calls,
+            "status": "success" if plates else "partial_success"
+        }
+        cache.set(cache_key, result)
+
+        print(f"   ✅ [SUCCESS] {os.path.basename(source)}: {len(plates)} plate(s), OCR ran on {ocr_calls}/{frames_sampled} sampled frames.", flush=True)
+        return {**result, "source": source}
+
     except Exception as e:
-        print(f"   ❌ [ERROR] Processing CCTV image: {str(e)}", flush=True)
+        print(f"   ❌ [ERROR] Processing CCTV video: {str(e)}", flush=True)
         return {
             "vehicle_number": None,
             "error": str(e),
+            "source": source,
+            "media": "video",
             "status": "error"
-        }
\ No newline at end of file
+        }
@@ -1,6 +1,7 @@
 import pandas as pd
 import re
 import sys
+from src.processors.csv_delta import read_csv_sniffed
 
 def normalize_columns(df):
     """
@@ -57,15 +58,23 @@ def clean_phone_number(num):
         
     return clean_num
 
-def process_cdr(file_path):
-    print(f"   ↳ [INTERNAL] Processing CDR file: {file_path}...", flush=True)
+def process_cdr(file_path, sniff=None, byte_range=None):
+    """
+    file_path may be a path or an already-open handle from the router;
+    sniff (router result) supplies encoding and delimiter so nothing is re-detected.
+    byte_range=(start, end) parses only that slice of an open handle (appended rows).
+    """
+    print(f"   ↳ [INTERNAL] Processing CDR file: {getattr(file_path, 'name', file_path)}...", flush=True)
     
     try:
-        # Read CSV (try different encodings just in case)
-        try:
-            df = pd.read_csv(file_path)
-        except UnicodeDecodeError:
-            df = pd.read_csv(file_path, encoding='latin1')
+        if sniff:
+            df = read_csv_sniffed(file_path, sniff, byte_range)
+        else:
+            # Read CSV (try different encodings just in case)
+            try:
+                df = pd.read_csv(file_path)
+            except UnicodeDecodeError:
+                df = pd.read_csv(file_path, encoding='latin1')
 
         # 1. Normalize Column Names
         df = normalize_columns(df)
@@ -0,0 +1,88 @@
+import io
+import hashlib
+
+# Bytes hashed at each end of an already-consumed prefix
+FINGERPRINT_BYTES = 64 * 1024
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of handle[start:end] so pandas parses just the appended rows."""
+
+    def __init__(self, handle, start, end):
+        self._handle = handle
+        self._pos = start
+        self._end = end
+        handle.seek(start)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._end - self._pos)
+        if n <= 0:
+            return 0
+        data = self._handle.read(n)
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+def complete_lines_end(handle):
+    """
+    Offset just past the last newline. A trailing line without one may still be
+    being written by the exporter, so it is parsed but not counted as consumed.
+    """
+    handle.seek(0, io.SEEK_END)
+    pos = handle.tell()
+    while pos > 0:
+        step = min(FINGERPRINT_BYTES, pos)
+        handle.seek(pos - step)
+        block = handle.read(step)
+        idx = block.rfind(b'\n')
+        if idx != -1:
+            return pos - step + idx + 1
+        pos -= step
+    return 0
+
+def prefix_fingerprint(handle, offset):
+    """
+    Identifies handle[:offset] from its length, head and tail. Constant cost, so
+    checking a 5 GB file that only grew does not re-read what was consumed.
+    """
+    digest = hashlib.sha256(str(offset).encode())
+    handle.seek(0)
+    digest.update(handle.read(min(offset, FINGERPRINT_BYTES)))
+    tail = max(0, offset - FINGERPRINT_BYTES)
+    handle.seek(tail)
+    digest.update(handle.read(offset - tail))
+    return digest.hexdigest()
+
+def read_csv_range(handle, sniff, byte_range):
+    """
+    Parses rows in handle[start:end]. A range past the header carries no header
+    line, so the router's column names are applied instead.
+    """
+    import pandas as pd  # offset bookkeeping above is also used before any CSV is parsed
+
+    start, end = byte_range
+    stream = io.BufferedReader(_ByteRange(handle, start, end))
+    options = {"encoding": sniff.get('encoding'), "sep": sniff.get('delimiter') or ','}
+    if start > 0:
+        options.update(header=None, names=sniff.get('columns'))
+    return pd.read_csv(stream, **options)
+
+def read_csv_sniffed(source, sniff, byte_range=None):
+    """
+    Reads a CSV the router sniffed, whole or only byte_range. The sniffed head can be
+    valid UTF-8 while a later row is not; such files are re-read as latin1.
+    """
+    import pandas as pd
+
+    def read(encoding):
+        if byte_range:
+            return read_csv_range(source, dict(sniff, encoding=encoding), byte_range)
+        if hasattr(source, 'seek'): source.seek(0)
+        return pd.read_csv(source, encoding=encoding, sep=sniff.get('delimiter') or ',')
+
+    try:
+        return read(sniff.get('encoding'))
+    except UnicodeDecodeError:
+        return read('latin1')
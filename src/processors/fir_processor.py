@@ -1,37 +1,121 @@
 import os
+import re
 import json
+import time
+import random
+import hashlib
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 from dotenv import load_dotenv
 import warnings
+from src.utils.disk_cache import DiskCache
+from src.utils.rate_limit import TokenBucket
+from src.utils import metrics
+from src.processors.fir_rules import extract_fir_rules
+from src.processors.fir_sections import reduce_fir_text
+from src.processors.pdf_text import extract_pdf_text
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
 
-import google.generativeai as genai
-
 # Load Environment Variables
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 load_dotenv(BASE_DIR / ".env")
 
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in environment variables.")
+MODEL_NAME = 'gemini-flash-latest'
+
+# Bump whenever the prompt or post-processing changes so stale cache entries are ignored
+PROMPT_VERSION = "fir-v1"
+
+# Templated FIRs scoring at least this on the rule extractor never reach the LLM
+RULES_MIN_CONFIDENCE = float(os.getenv("FIR_RULES_MIN_CONFIDENCE", "0.8"))
+
+# Max FIR tokens sent to the LLM; low-value sections (annexures, witness statements) are dropped first
+PROMPT_TOKEN_BUDGET = int(os.getenv("FIR_PROMPT_TOKEN_BUDGET", "2000"))
+
+# Disk budget for cached extractions (LRU eviction beyond this)
+LLM_CACHE_MAX_BYTES = int(os.getenv("FIR_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+class GeminiBackend:
+    """Default extraction backend. Any object with `model_name` and `generate(prompt) -> str` can replace it."""
+
+    def __init__(self, model_name=MODEL_NAME):
+        # google.generativeai is slow to import and needs the API key, so both wait until the first LLM call
+        import google.generativeai as genai
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables.")
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt):
+        return self._model.generate_content(prompt).text
+
+class HttpBackend:
+    """
+    Minimal JSON-over-HTTP backend: POSTs {"model", "prompt"} and reads {"text"}.
+    Point LLM_BACKEND_URL at a local stub server to exercise the bulk path without Gemini.
+    """
+
+    def __init__(self, url, model_name=MODEL_NAME, timeout=60):
+        self.url = url
+        self.model_name = model_name
+        self.timeout = timeout
+
+    def generate(self, prompt):
+        body = json.dumps({"model": self.model_name, "prompt": prompt}).encode('utf-8')
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode('utf-8'))["text"]
+
+_backend = None
+_llm_cache = None
+
+def set_llm_backend(backend):
+    """Swap the model used by process_fir (e.g. a local fake model in tests)."""
+    global _backend
+    _backend = backend
+
+def get_llm_backend():
+    global _backend
+    if _backend is None:
+        url = os.getenv("LLM_BACKEND_URL")
+        _backend = HttpBackend(url) if url else GeminiBackend()
+    return _backend
+
+def get_llm_cache():
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = DiskCache("fir_llm", max_bytes=LLM_CACHE_MAX_BYTES)
+    return _llm_cache
+
+def llm_cache_key(file_text, model_name):
+    """Hash of whitespace-normalized FIR text + model + prompt version (incl. token budget)."""
+    normalized = " ".join(file_text.split())
+    return hashlib.sha256(f"{PROMPT_VERSION}:{PROMPT_TOKEN_BUDGET}\0{model_name}\0{normalized}".encode('utf-8')).hexdigest()
 
-genai.configure(api_key=api_key)
+def prepare_prompt_text(file_text, label=""):
+    """Applies the section filter and logs how much of the FIR was kept."""
+    reduced, info = reduce_fir_text(file_text, PROMPT_TOKEN_BUDGET)
+    if info["kept_tokens"] < info["original_tokens"]:
+        saved = 1 - info["kept_tokens"] / info["original_tokens"]
+        print(f"   ✂️ [REDUCE] {label}~{info['original_tokens']} -> ~{info['kept_tokens']} tokens "
+              f"({info['sections_kept']}/{info['sections_total']} sections, -{saved:.0%})", flush=True)
+    return reduced
 
 def read_file_content(file_path):
     """Helper to read text from file path."""
     try:
-        if str(file_path).endswith('.pdf'):
-            # Basic PDF text extraction (requires pypdf, falls back if not found)
+        if str(file_path).lower().endswith('.pdf'):
+            # Streamed, page-parallel PDF extraction with a text cache (requires pypdf or PyPDF2)
             try:
-                from pypdf import PdfReader
-                reader = PdfReader(file_path)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+                return extract_pdf_text(file_path)
             except ImportError:
                 return "Error: PDF found but 'pypdf' library not installed. Please install pypdf."
         else:
@@ -41,27 +125,8 @@ def read_file_content(file_path):
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
-def process_fir(file_path):
-    # Robust Input Handling: Check if input is a Path or Text
-    import os
-    file_text = ""
-    path_str = str(file_path)
-    
-    # Heuristic: If it looks like a path and exists, read it. Else treat as text.
-    if len(path_str) < 300 and (os.path.exists(path_str) or "assets/" in path_str or "/tmp/" in path_str):
-        print(f"   ↳ [INTERNAL] Processing FIR file path: {path_str}...", flush=True)
-        file_text = read_file_content(path_str)
-    else:
-        print(f"   ↳ [INTERNAL] Processing FIR text content (len={len(path_str)})...", flush=True)
-        file_text = path_str
-    
-    if not file_text or "Error" in file_text[:20]:
-         return {"error": "File read failed"}
-
-    print(f"   ↳ [INTERNAL] Sending to Gemini...", flush=True)
-    model = genai.GenerativeModel('gemini-flash-latest')
-    
-    prompt = f"""
+def build_prompt(file_text):
+    return f"""
     You are a police intelligence AI. Extract entities from this FIR text into valid JSON.
     
     CRITICAL: You MUST extract the 'fir_id'. 
@@ -85,32 +150,314 @@ def process_fir(file_path):
     
     Return ONLY valid JSON. No markdown formatting.
     """
+
+def build_batch_prompt(items):
+    """Packs several (input_id, text) FIRs into one prompt that answers with a JSON array."""
+    blocks = "\n".join(f"<<<FIR input_id={input_id}>>>\n{text}\n<<<END>>>" for input_id, text in items)
+    return f"""
+    You are a police intelligence AI. Extract entities from EACH FIR below into valid JSON.
+    
+    CRITICAL: You MUST extract the 'fir_id' for every FIR.
+    - Look for "FIR No", "Crime No", or "Case No".
+    - If found (e.g., "0305"), combine with Year/Station to make a unique ID like "FIR_2023_305".
+    - NEVER return null or empty for fir_id.
+    
+    STRICT JSON OUTPUT: an array with exactly one object per FIR, echoing its input_id:
+    [
+        {{
+            "input_id": "0",
+            "fir_id": "FIR_2023_305",
+            "crime_type": "Robbery",
+            "date": "2023-06-15",
+            "station": "Indiranagar PS",
+            "suspects": ["Ravi Kumar"],
+            "vehicles": ["MH12HG9999"],
+            "phones": ["9848022338"]
+        }}
+    ]
+    
+    Input FIRs:
+    {blocks}
+    
+    Return ONLY valid JSON. No markdown formatting.
+    """
+
+def parse_llm_json(raw_text):
+    """Strips markdown fences the model sometimes adds and parses the JSON payload."""
+    cleaned_text = raw_text.strip()
+    if cleaned_text.startswith("```json"): cleaned_text = cleaned_text[7:]
+    if cleaned_text.startswith("```"): cleaned_text = cleaned_text[3:]
+    if cleaned_text.endswith("```"): cleaned_text = cleaned_text[:-3]
+    return json.loads(cleaned_text.strip())
+
+def apply_id_fallback(data, file_text):
+    # --- REGEX FALLBACK FOR ID ---
+    if not data.get('fir_id'):
+        # Try to find "FIR No: XXXX" pattern
+        match = re.search(r'FIR\s*(?:No|Number)?\.?\s*[:\-]?\s*(\w+)', file_text, re.IGNORECASE)
+        if match:
+            raw_id = match.group(1)
+            # Try to find year
+            year_match = re.search(r'Year\s*[:\-]?\s*(\d{4})', file_text, re.IGNORECASE)
+            year = year_match.group(1) if year_match else "Unknown"
+            data['fir_id'] = f"FIR_{year}_{raw_id}"
+            print(f"   ⚠️ [FALLBACK] Regex recovered ID: {data['fir_id']}", flush=True)
+    return data
+
+def load_fir_text(file_path):
+    """Resolves process_fir input (path or raw text) to the FIR text. Returns None on read failure."""
+    file_text = ""
+    path_str = str(file_path)
+    
+    # Heuristic: If it looks like a path and exists, read it. Else treat as text.
+    if len(path_str) < 300 and (os.path.exists(path_str) or "assets/" in path_str or "/tmp/" in path_str):
+        print(f"   ↳ [INTERNAL] Processing FIR file path: {path_str}...", flush=True)
+        file_text = read_file_content(path_str)
+    else:
+        print(f"   ↳ [INTERNAL] Processing FIR text content (len={len(path_str)})...", flush=True)
+        file_text = path_str
+    
+    if not file_text or "Error" in file_text[:20]:
+        return None
+    return file_text
+
+def try_rules(file_text):
+    """Fast path: returns the rule-based extraction if it is confident enough, else None."""
+    data = extract_fir_rules(file_text)
+    if data["confidence"] >= RULES_MIN_CONFIDENCE:
+        return data
+    return None
+
+def process_fir(file_path, backend=None, cache=None):
+    """
+    Extract FIR entities. Templated FIRs are handled by the local rule extractor;
+    only low-confidence documents are sent to the LLM backend.
+    LLM results are cached on disk by (normalized text, model, prompt version), so
+    re-syncing CCTNS or re-uploading a case does not pay LLM latency again.
+    """
+    file_text = load_fir_text(file_path)
+    if file_text is None:
+         return {"error": "File read failed"}
+
+    data = try_rules(file_text)
+    if data:
+        metrics.incr("fir_rules")
+        print(f"   ⚡ [RULES] Templated FIR extracted locally: {data['fir_id']} (confidence {data['confidence']:.2f})", flush=True)
+        return data
+
+    backend = backend or get_llm_backend()
+    cache = cache or get_llm_cache()
+    key = llm_cache_key(file_text, backend.model_name)
+
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"   ⚡ [CACHE] FIR extraction hit (hit rate {cache.stats()['hit_rate']:.0%})", flush=True)
+        return cached
+
+    print(f"   ↳ [INTERNAL] Sending to Gemini...", flush=True)
     
     try:
-        response = model.generate_content(prompt)
-        cleaned_text = response.text.strip()
-        if cleaned_text.startswith("```json"): cleaned_text = cleaned_text[7:]
-        if cleaned_text.startswith("```"): cleaned_text = cleaned_text[3:]
-        if cleaned_text.endswith("```"): cleaned_text = cleaned_text[:-3]
-        
-        data = json.loads(cleaned_text.strip())
-        
-        # --- REGEX FALLBACK FOR ID ---
-        if not data.get('fir_id'):
-            import re
-            # Try to find "FIR No: XXXX" pattern
-            match = re.search(r'FIR\s*(?:No|Number)?\.?\s*[:\-]?\s*(\w+)', file_text, re.IGNORECASE)
-            if match:
-                raw_id = match.group(1)
-                # Try to find year
-                year_match = re.search(r'Year\s*[:\-]?\s*(\d{4})', file_text, re.IGNORECASE)
-                year = year_match.group(1) if year_match else "Unknown"
-                data['fir_id'] = f"FIR_{year}_{raw_id}"
-                print(f"   ⚠️ [FALLBACK] Regex recovered ID: {data['fir_id']}", flush=True)
-
-        print(f"   ✅ [SUCCESS] Extracted FIR details for {data.get('suspect_name')}", flush=True)
+        metrics.incr("llm_calls")
+        data = parse_llm_json(backend.generate(build_prompt(prepare_prompt_text(file_text))))
+        data = apply_id_fallback(data, file_text)
+
+        cache.set(key, data)
+        print(f"   ✅ [SUCCESS] Extracted FIR details for {data.get('suspect_name')} (cache hit rate {cache.stats()['hit_rate']:.0%})", flush=True)
         return data
 
     except Exception as e:
         print(f"   ❌ [ERROR] LLM Extraction Failed: {str(e)}", flush=True)
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+
+# --- BULK EXTRACTION ---
+
+# FIRs shorter than this are packed together into one prompt
+BATCH_SHORT_FIR_CHARS = 4000
+BATCH_MAX_CHARS = 12000
+BATCH_MAX_ITEMS = 5
+
+class _LatencyTracker:
+    """Rolling window of call latencies; the hedge deadline follows the observed p95."""
+
+    def __init__(self, window=200, floor=2.0):
+        self.samples = []
+        self.window = window
+        self.floor = floor
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+            if len(self.samples) > self.window:
+                self.samples.pop(0)
+
+    def p95(self):
+        with self._lock:
+            if len(self.samples) < 10:
+                return None
+            ordered = sorted(self.samples)
+        return max(self.floor, ordered[int(len(ordered) * 0.95) - 1])
+
+def _pack_batches(items, max_chars=BATCH_MAX_CHARS, max_items=BATCH_MAX_ITEMS):
+    """Groups (input_id, text) pairs: long FIRs go alone, short ones share a prompt."""
+    batches, current, current_chars = [], [], 0
+    for input_id, text in items:
+        if len(text) >= BATCH_SHORT_FIR_CHARS:
+            batches.append([(input_id, text)])
+            continue
+        if current and (current_chars + len(text) > max_chars or len(current) >= max_items):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append((input_id, text))
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+def _call_hedged(backend, prompt, limiter, call_pool, latency, hedge_after):
+    """
+    One logical model call. If it has not returned by the hedge deadline a duplicate
+    request is sent (also rate limited) and whichever succeeds first wins.
+    """
+    deadline = hedge_after if hedge_after is not None else latency.p95()
+
+    def timed():
+        start = time.monotonic()
+        metrics.incr("llm_calls")
+        text = backend.generate(prompt)
+        latency.record(time.monotonic() - start)
+        return text
+
+    limiter.acquire()
+    futures = [call_pool.submit(timed)]
+    if deadline is not None:
+        done, _ = wait(futures, timeout=deadline)
+        if not done:
+            print(f"   ⏱️ [HEDGE] No reply after {deadline:.1f}s, sending duplicate request.", flush=True)
+            limiter.acquire()
+            futures.append(call_pool.submit(timed))
+
+    pending = set(futures)
+    last_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None:
+                return f.result()
+            last_error = f.exception()
+    raise last_error
+
+def _call_with_retry(call, max_retries, base_delay=1.0):
+    for attempt in range(max_retries + 1):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+            print(f"   🔁 [RETRY] LLM call failed ({e}); retrying in {delay:.1f}s...", flush=True)
+            time.sleep(delay)
+
+def process_fir_bulk(file_paths, backend=None, cache=None, max_workers=8,
+                     requests_per_minute=None, max_retries=3, hedge_after=None):
+    """
+    Bulk version of process_fir for CCTNS syncs and case archives.
+    - Templated FIRs go through the rule extractor; cached FIRs are answered locally.
+    - Short FIRs are packed several to a prompt (JSON array keyed by input_id).
+    - Calls run concurrently under a token-bucket limiter (GEMINI_RPM), so throughput
+      is bounded by quota rather than round-trip latency.
+    - Failed calls retry with exponential backoff; slow calls are hedged.
+    Returns one result dict per input, in input order.
+    """
+    backend = backend or get_llm_backend()
+    cache = cache or get_llm_cache()
+    rpm = requests_per_minute or int(os.getenv("GEMINI_RPM", "60"))
+    limiter = TokenBucket(rate=rpm / 60.0, capacity=max(1, min(max_workers, rpm)))
+    latency = _LatencyTracker()
+
+    results = [None] * len(file_paths)
+    texts, keys, todo = {}, {}, []
+    local = 0
+    for i, file_path in enumerate(file_paths):
+        file_text = load_fir_text(file_path)
+        if file_text is None:
+            results[i] = {"error": "File read failed"}
+            continue
+        data = try_rules(file_text)
+        if data:
+            results[i] = data
+            local += 1
+            metrics.incr("fir_rules")
+            continue
+        key = llm_cache_key(file_text, backend.model_name)
+        cached = cache.get(key)
+        if cached is not None:
+            results[i] = cached
+            continue
+        texts[i], keys[i] = file_text, key
+        todo.append((str(i), prepare_prompt_text(file_text, label=f"{os.path.basename(str(file_path))[:40]}: ")))
+
+    batches = _pack_batches(todo)
+    print(f"   ↳ [INTERNAL] Bulk FIR extraction: {len(file_paths)} files, {local} by rules, {len(file_paths) - len(todo) - local} cached, {len(batches)} LLM requests @ {rpm} rpm...", flush=True)
+
+    def finish(i, data):
+        data = apply_id_fallback(data, texts[i])
+        cache.set(keys[i], data)
+        results[i] = data
+
+    def run_single(input_id, text):
+        raw = _call_with_retry(lambda: _call_hedged(backend, build_prompt(text), limiter, call_pool, latency, hedge_after), max_retries)
+        try:
+            data = parse_llm_json(raw)
+            if not isinstance(data, dict): raise ValueError("answer is not a JSON object")
+        except ValueError as e:
+            # Only this FIR fails; the rest of its batch keeps its answers
+            print(f"   ❌ [ERROR] Unparseable LLM answer for {os.path.basename(str(file_paths[int(input_id)]))}: {e}", flush=True)
+            results[int(input_id)] = {"error": f"Unparseable LLM answer: {e}"}
+            return
+        finish(int(input_id), data)
+
+    def run_batch(batch):
+        if len(batch) == 1:
+            return run_single(*batch[0])
+
+        raw = _call_with_retry(lambda: _call_hedged(backend, build_batch_prompt(batch), limiter, call_pool, latency, hedge_after), max_retries)
+        try:
+            answers = parse_llm_json(raw)
+            if not isinstance(answers, list): raise ValueError("answer is not a JSON array")
+        except ValueError as e:
+            # Usually one malformed or truncated object: halves are shorter and fail on their own
+            print(f"   ⚠️ [RETRY] Unparseable answer for {len(batch)} FIRs ({e}); splitting the batch.", flush=True)
+            middle = len(batch) // 2
+            run_batch(batch[:middle])
+            run_batch(batch[middle:])
+            return
+        by_id = {str(a.pop('input_id', '')): a for a in answers if isinstance(a, dict)}
+        for input_id, text in batch:
+            if input_id in by_id:
+                finish(int(input_id), by_id[input_id])
+            else:
+                # Model dropped this FIR from the array (or answered it malformed); ask for it on its own
+                run_single(input_id, text)
+
+    # Raw calls get their own pool so hedged duplicates never wait behind batch workers
+    call_pool = ThreadPoolExecutor(max_workers=max_workers * 2)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as batch_pool:
+            futures = {batch_pool.submit(run_batch, b): b for b in batches}
+            for future, batch in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"   ❌ [ERROR] LLM Extraction Failed for {len(batch)} FIR(s): {str(e)}", flush=True)
+                    for input_id, _ in batch:
+                        if results[int(input_id)] is None:
+                            results[int(input_id)] = {"error": str(e)}
+    finally:
+        # The losing side of a hedge may still be waiting on the model; its answer is not needed
+        call_pool.shutdown(wait=False, cancel_futures=True)
+
+    stats = cache.stats()
+    print(f"   ✅ [SUCCESS] Bulk FIR extraction done (cache hit rate {stats['hit_rate']:.0%}).", flush=True)
+    return results
@@ -0,0 +1,118 @@
+import re
+
+# Compiled once: templated CCTNS FIRs use "Label: value" lines
+FIR_NO_RE = re.compile(r'^\s*(?:\d+\.\s*)?(?:FIR|Crime|Case)\s*(?:No|Number)\.?\s*[:\-]\s*([A-Za-z0-9/\-]+)', re.IGNORECASE | re.MULTILINE)
+YEAR_RE = re.compile(r'^\s*(?:\d+\.\s*)?Year\s*[:\-]\s*(\d{4})', re.IGNORECASE | re.MULTILINE)
+DATE_RE = re.compile(r'^\s*(?:\d+\.\s*)?(?:Date(?:\s+of\s+\w+)?)\s*[:\-]\s*(\d{4}-\d{2}-\d{2}|\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4})', re.IGNORECASE | re.MULTILINE)
+STATION_RE = re.compile(r'^\s*(?:\d+\.\s*)?(?:Police\s+)?Station\s*[:\-]\s*(.+)$', re.IGNORECASE | re.MULTILINE)
+CRIME_RE = re.compile(r'^\s*(?:\d+\.\s*)?(?:Crime(?:\s+Type)?|Offence|Nature\s+of\s+Offence)\s*[:\-]\s*(.+)$', re.IGNORECASE | re.MULTILINE)
+ACCUSED_RE = re.compile(r'^\s*(?:\d+\.\s*)?(?:Accused|Suspect)(?:\s+Names?)?s?\s*[:\-]\s*(.+)$', re.IGNORECASE | re.MULTILINE)
+HEADER_RE = re.compile(r'FIRST\s+INFORMATION\s+REPORT', re.IGNORECASE)
+
+PLATE_RE = re.compile(r'\b[A-Z]{2}[\s\-]?[0-9]{1,2}[\s\-]?[A-Z]{1,3}[\s\-]?[0-9]{3,4}\b')
+PHONE_RE = re.compile(r'(?<!\d)(?:\+?91[\s\-]?)?([6-9]\d{9})(?!\d)')
+NAME_SPLIT_RE = re.compile(r'\s*(?:,|;|&|\band\b)\s*', re.IGNORECASE)
+PAREN_RE = re.compile(r'\s*\(.*?\)')
+# "0123/2023": the year suffix is not part of the number (the LLM path drops it too)
+FIR_YEAR_SUFFIX_RE = re.compile(r'^(.+?)[/\-]((?:19|20)\d{2})$')
+# Narrative references to the accused ("The accused was using mobile ...")
+ACCUSED_MENTION_RE = re.compile(r'\b(?:accused|suspects?)\b', re.IGNORECASE)
+# A number is the accused's only on the line of a suspect mention (the accused line, a
+# suspect's name or "the accused") or within this many characters after one in the same
+# sentence; complainant and witness numbers elsewhere in the report are left out
+PHONE_WINDOW = 80
+SENTENCE_END_RE = re.compile(r'\.(?:\s|$)')
+# Numbers in the text that none of the above claims need the LLM to attribute them
+UNATTRIBUTED_PHONE_CONFIDENCE = 0.5
+
+# Field weights for the confidence score (sum = 1.0)
+WEIGHTS = {
+    "fir_id": 0.3,
+    "suspects": 0.2,
+    "station": 0.15,
+    "crime_type": 0.15,
+    "date": 0.1,
+    "template": 0.1
+}
+
+def _first(pattern, text):
+    match = pattern.search(text)
+    return match.group(1).strip() if match else None
+
+def _suspect_phones(file_text, suspects, accused_span):
+    spans = [accused_span] if accused_span else []
+    for name in suspects:
+        spans.extend(m.span() for m in re.finditer(re.escape(name), file_text, re.IGNORECASE))
+    if suspects:
+        spans.extend(m.span() for m in ACCUSED_MENTION_RE.finditer(file_text))
+    # Each mention covers its own line and the rest of its sentence, up to the window
+    spans = [(file_text.rfind('\n', 0, start) + 1, max(_reach(file_text, end), _line_end(file_text, end)))
+             for start, end in spans]
+    phones = (m for m in PHONE_RE.finditer(file_text)
+              if any(start <= m.start() and m.end() <= end for start, end in spans))
+    return list(dict.fromkeys(m.group(1) for m in phones))
+
+def _reach(text, pos):
+    sentence_end = SENTENCE_END_RE.search(text, pos, pos + PHONE_WINDOW)
+    return sentence_end.start() if sentence_end else pos + PHONE_WINDOW
+
+def _line_end(text, pos):
+    end = text.find('\n', pos)
+    return len(text) if end < 0 else end
+
+def extract_fir_rules(file_text):
+    """
+    Local extractor for templated FIRs. Returns the same schema as the LLM path
+    plus a 'confidence' in [0, 1] describing how much of the template was found.
+    """
+    fir_no = _first(FIR_NO_RE, file_text)
+    year = _first(YEAR_RE, file_text)
+    date = _first(DATE_RE, file_text)
+    station = _first(STATION_RE, file_text)
+    crime = _first(CRIME_RE, file_text)
+    accused_match = ACCUSED_RE.search(file_text)
+    accused = accused_match.group(1).strip() if accused_match else None
+
+    suffix = FIR_YEAR_SUFFIX_RE.match(fir_no) if fir_no else None
+    if suffix:
+        fir_no, year = suffix.group(1), year or suffix.group(2)
+    if not year and date:
+        year_match = re.search(r'\d{4}', date)
+        year = year_match.group(0) if year_match else None
+
+    fir_id = None
+    if fir_no:
+        # Same convention as the LLM prompt: "0305" in 2023 -> FIR_2023_305
+        fir_id = f"FIR_{year or 'Unknown'}_{fir_no.lstrip('0') or '0'}"
+
+    suspects = NAME_SPLIT_RE.split(PAREN_RE.sub('', accused)) if accused else []
+    suspects = [n.strip(' .') for n in suspects if n.strip(' .') and n.strip(' .').lower() not in ('unknown', 'n/a', 'none')]
+
+    vehicles = list(dict.fromkeys(re.sub(r'[\s\-]', '', p) for p in PLATE_RE.findall(file_text.upper())))
+    phones = _suspect_phones(file_text, suspects, accused_match.span() if accused_match else None)
+
+    found = {
+        "fir_id": WEIGHTS["fir_id"] if fir_id and year else (WEIGHTS["fir_id"] / 2 if fir_id else 0),
+        "suspects": WEIGHTS["suspects"] if suspects else 0,
+        "station": WEIGHTS["station"] if station else 0,
+        "crime_type": WEIGHTS["crime_type"] if crime else 0,
+        "date": WEIGHTS["date"] if date else 0,
+        "template": WEIGHTS["template"] if HEADER_RE.search(file_text) else 0
+    }
+
+    confidence = sum(found.values())
+    if not phones and PHONE_RE.search(file_text):
+        confidence = min(confidence, UNATTRIBUTED_PHONE_CONFIDENCE)
+
+    data = {
+        "fir_id": fir_id,
+        "suspects": suspects,
+        "vehicles": vehicles,
+        "phones": phones,
+        "confidence": round(confidence, 2),
+        "extraction": "rules"
+    }
+    # Fields the template lacks are left out, so add_fir_data's defaults apply
+    optional = {"crime_type": PAREN_RE.sub('', crime).strip() if crime else None, "date": date, "station": station}
+    data.update((key, value) for key, value in optional.items() if value)
+    return data
@@ -0,0 +1,77 @@
+import re
+
+# Rough chars-per-token for Gemini-style tokenizers on English/transliterated text
+CHARS_PER_TOKEN = 4
+
+# Lines that open a new section: "3. Incident:", "ANNEXURE A", "STATEMENT OF WITNESS", ...
+HEADING_RE = re.compile(r'^\s*(?:\d+[.)]\s+\S|[A-Z][A-Z0-9 /&\-]{4,}:?\s*$|(?:Annexure|Statement|Schedule|Enclosure)\b)', re.IGNORECASE)
+
+ENTITY_PATTERNS = [
+    (re.compile(r'\b(?:FIR|Crime|Case)\s*(?:No|Number)\b', re.IGNORECASE), 5.0),
+    (re.compile(r'\b(?:Accused|Suspect|Police\s+Station|Station|Year|Date|Crime|Offence|Sec(?:tion)?\s*\d+)\b', re.IGNORECASE), 2.0),
+    (re.compile(r'\b[A-Z]{2}[\s\-]?[0-9]{1,2}[\s\-]?[A-Z]{1,3}[\s\-]?[0-9]{3,4}\b'), 3.0),  # plates
+    (re.compile(r'(?<!\d)(?:\+?91[\s\-]?)?[6-9]\d{9}(?!\d)'), 3.0),                            # phones
+    (re.compile(r'\b(?:vehicle|registration|mobile|phone|property|seized|recovered)\b', re.IGNORECASE), 1.0),
+]
+
+# Sections that are mostly boilerplate even when they mention a keyword or two
+LOW_VALUE_RE = re.compile(r'\b(?:annexure|witness|statement\s+of|verification|certified|signature|copy\s+to|enclosure)\b', re.IGNORECASE)
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def segment_fir(file_text):
+    """Splits FIR text into sections at headings and blank-line breaks."""
+    sections, current = [], []
+    for line in file_text.splitlines():
+        if (not line.strip() or HEADING_RE.match(line)) and current and any(l.strip() for l in current):
+            sections.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    if current and any(l.strip() for l in current):
+        sections.append("\n".join(current).strip())
+    return [s for s in sections if s]
+
+def score_section(section):
+    """Entity density: weighted entity hits per 100 tokens, damped for annexure/witness boilerplate."""
+    hits = sum(weight * len(pattern.findall(section)) for pattern, weight in ENTITY_PATTERNS)
+    density = hits * 100.0 / estimate_tokens(section)
+    if LOW_VALUE_RE.search(section[:200]):
+        density *= 0.25
+    return density
+
+def reduce_fir_text(file_text, token_budget):
+    """
+    Keeps the most entity-dense sections of a FIR within token_budget, in original order.
+    The opening section (FIR header) is always kept. Returns (text, info) where info
+    describes the reduction for logging.
+    """
+    original_tokens = estimate_tokens(file_text)
+    info = {"original_tokens": original_tokens, "kept_tokens": original_tokens, "sections_total": 1, "sections_kept": 1}
+    if not token_budget or original_tokens <= token_budget:
+        return file_text, info
+
+    sections = segment_fir(file_text)
+    info["sections_total"] = len(sections)
+    if len(sections) <= 1:
+        # Nothing to choose between; truncate rather than blow the budget
+        kept = file_text[:token_budget * CHARS_PER_TOKEN]
+        info["kept_tokens"] = estimate_tokens(kept)
+        return kept, info
+
+    keep = {0}
+    used = estimate_tokens(sections[0])
+    ranked = sorted(range(1, len(sections)), key=lambda i: score_section(sections[i]), reverse=True)
+    for i in ranked:
+        if score_section(sections[i]) <= 0:
+            break
+        cost = estimate_tokens(sections[i])
+        if used + cost > token_budget:
+            continue
+        keep.add(i)
+        used += cost
+
+    kept = "\n\n".join(sections[i] for i in sorted(keep))
+    info["kept_tokens"] = estimate_tokens(kept)
+    info["sections_kept"] = len(keep)
+    return kept, info
@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src.utils.disk_cache import DiskCache, file_sha256
+
+# Bundles smaller than this are not worth the process-pool start-up cost
+PARALLEL_MIN_PAGES = 24
+PAGES_PER_CHUNK = 16
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+_text_cache = None
+
+def _get_text_cache():
+    global _text_cache
+    if _text_cache is None:
+        _text_cache = DiskCache("pdf_text", max_bytes=PDF_CACHE_MAX_BYTES)
+    return _text_cache
+
+def _pdf_reader(file_path):
+    # requirements.txt pins PyPDF2; newer installs ship the same API as pypdf
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        from PyPDF2 import PdfReader
+    return PdfReader(file_path)
+
+def iter_pdf_pages(file_path, start=0, stop=None):
+    """Yields the text of each page in [start, stop) without building one big string."""
+    reader = _pdf_reader(file_path)
+    for page in reader.pages[start:stop]:
+        yield page.extract_text() or ""
+
+def _extract_range(args):
+    file_path, start, stop = args
+    return list(iter_pdf_pages(file_path, start, stop))
+
+def extract_pdf_text(file_path, workers=None):
+    """
+    Full text of a PDF, one page per line block.
+    Large bundles are split into page ranges and extracted in a process pool.
+    Text is cached by file hash so re-ingesting the same chargesheet never re-parses it.
+    """
+    cache = _get_text_cache()
+    key = file_sha256(file_path)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    workers = workers or PDF_WORKERS
+    page_count = len(_pdf_reader(file_path).pages)
+
+    if workers > 1 and page_count >= PARALLEL_MIN_PAGES:
+        ranges = [(str(file_path), s, min(s + PAGES_PER_CHUNK, page_count)) for s in range(0, page_count, PAGES_PER_CHUNK)]
+        print(f"   ↳ [INTERNAL] Extracting {page_count} PDF pages in {len(ranges)} chunks on {workers} workers...", flush=True)
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            pages = [text for chunk in pool.map(_extract_range, ranges) for text in chunk]
+    else:
+        pages = iter_pdf_pages(file_path)
+
+    text = "\n".join(pages) + "\n"
+    cache.set(key, text)
+    return text
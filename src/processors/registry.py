@@ -0,0 +1,45 @@
+import time
+import importlib
+import threading
+
+# kind -> (module, function). Nothing is imported until a file of that kind is first seen,
+# so a dashboard-only process never loads pandas parsers, PDF readers, Gemini or EasyOCR/torch.
+PROCESSORS = {
+    "fir": ("src.processors.fir_processor", "process_fir"),
+    "fir_bulk": ("src.processors.fir_processor", "process_fir_bulk"),
+    "cdr": ("src.processors.cdr_processor", "process_cdr"),
+    "bank": ("src.processors.bank_processor", "process_bank_statement"),
+    "cctv": ("src.processors.cctv_processor", "process_cctv"),
+    "cctv_video": ("src.processors.cctv_processor", "process_cctv_video"),
+    "cctv_batch": ("src.processors.cctv_processor", "process_cctv_batch"),
+}
+
+_loaded = {}
+_import_timings = {}
+_lock = threading.Lock()
+
+def get_processor(kind):
+    """Returns the processor function for a file kind, importing its module on first use."""
+    fn = _loaded.get(kind)
+    if fn is not None:
+        return fn
+
+    with _lock:
+        if kind not in _loaded:
+            if kind not in PROCESSORS:
+                raise KeyError(f"No processor registered for '{kind}'")
+            module_name, attr = PROCESSORS[kind]
+
+            start = time.perf_counter()
+            module = importlib.import_module(module_name)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            # Modules shared by several kinds are only charged once
+            _import_timings.setdefault(module_name, round(elapsed_ms, 1))
+            _loaded[kind] = getattr(module, attr)
+            print(f"   ↳ [REGISTRY] Loaded '{kind}' processor from {module_name} ({elapsed_ms:.0f} ms)", flush=True)
+    return _loaded[kind]
+
+def get_import_timings():
+    """{module: import time in ms} for every processor module loaded so far."""
+    return dict(_import_timings)
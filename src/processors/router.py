@@ -0,0 +1,108 @@
+import os
+import csv
+import io
+
+# One read of the file head is enough to route everything we ingest
+SNIFF_BYTES = 64 * 1024
+
+# Magic numbers checked before falling back to text/CSV sniffing
+MAGIC = [
+    (b'%PDF', 0, "fir"),
+    (b'\xff\xd8\xff', 0, "cctv"),        # JPEG
+    (b'\x89PNG\r\n\x1a\n', 0, "cctv"),   # PNG
+    (b'ftyp', 4, "video"),               # MP4 / MOV
+    (b'\x1aE\xdf\xa3', 0, "video"),      # MKV / WebM
+    (b'PK\x03\x04', 0, "archive"),       # ZIP case archive
+]
+
+# CSV header keywords (matched per normalized column name). Bank is checked first:
+# statements often carry sender/receiver columns that would otherwise look like a CDR.
+BANK_KEYWORDS = ('amount', 'credit', 'debit', 'balance', 'txn', 'transaction')
+CDR_KEYWORDS = ('source', 'caller', 'origin', 'from', 'destination', 'receiver', 'duration', 'call', 'tower', 'cell_id')
+
+TEXT_EXTENSIONS = ('.txt', '.pdf')
+# Share of control bytes (besides tab/newline/CR/form feed) above which a head is binary
+BINARY_CONTROL_RATIO = 0.05
+_TEXT_CONTROLS = {9, 10, 12, 13}
+
+def _looks_binary(head):
+    sample = head[:8192]
+    if not sample: return False
+    if b'\x00' in sample: return True
+    controls = sum(1 for b in sample if b < 32 and b not in _TEXT_CONTROLS)
+    return controls / len(sample) > BINARY_CONTROL_RATIO
+
+def _detect_encoding(head):
+    for encoding in ('utf-8-sig', 'utf-8'):
+        try:
+            head.decode(encoding)
+            return encoding
+        except UnicodeDecodeError as e:
+            # A multi-byte char cut at the SNIFF_BYTES boundary is still valid UTF-8
+            if e.start >= len(head) - 4:
+                return encoding
+    return 'latin1'
+
+def _classify_columns(columns):
+    normalized = [c.strip().lower().replace(" ", "_") for c in columns]
+    if any(k in c for c in normalized for k in BANK_KEYWORDS):
+        return "bank"
+    if any(k in c for c in normalized for k in CDR_KEYWORDS):
+        return "cdr"
+    return "unknown"
+
+def sniff_head(head, file_name=""):
+    """
+    Classifies a file from its first bytes. Returns a sniff dict:
+    {kind, encoding, delimiter, columns} where kind is fir/cdr/bank/cctv/video/archive/unknown.
+    """
+    sniff = {"kind": "unknown", "encoding": None, "delimiter": None, "columns": []}
+
+    for magic, offset, kind in MAGIC:
+        if head[offset:offset + len(magic)] == magic:
+            sniff["kind"] = kind
+            return sniff
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        sniff["kind"] = "video"
+        return sniff
+
+    # GIF, BMP, WebP, Thumbs.db ...: nothing we ingest
+    if _looks_binary(head):
+        return sniff
+
+    encoding = _detect_encoding(head)
+    text = head.decode(encoding, errors='ignore')
+    sniff["encoding"] = encoding
+    first_line = text.splitlines()[0] if text.strip() else ""
+
+    is_text_ext = file_name.lower().endswith(TEXT_EXTENSIONS)
+    if first_line and not is_text_ext:
+        try:
+            dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t|")
+            columns = next(csv.reader(io.StringIO(first_line), dialect))
+        except (csv.Error, StopIteration):
+            columns = []
+        if len(columns) >= 2:
+            sniff["delimiter"] = dialect.delimiter
+            sniff["columns"] = [c.strip() for c in columns]
+            sniff["kind"] = _classify_columns(columns)
+            return sniff
+
+    # Prose in a .txt is treated as an FIR / report; other extensions are not ours
+    if text.strip() and is_text_ext:
+        sniff["kind"] = "fir"
+    return sniff
+
+def open_routed(file_path):
+    """
+    Opens a file once, sniffs its head and rewinds.
+    Returns (handle, sniff); the caller hands both to the processor and closes the handle.
+    """
+    handle = open(file_path, 'rb')
+    try:
+        head = handle.read(SNIFF_BYTES)
+        handle.seek(0)
+    except Exception:
+        handle.close()
+        raise
+    return handle, sniff_head(head, os.path.basename(str(file_path)))
@@ -0,0 +1,47 @@
+import os
+import threading
+
+BATCH_MIN_ROWS = int(os.getenv("GRAPH_BATCH_MIN", "500"))
+BATCH_MAX_ROWS = int(os.getenv("GRAPH_BATCH_MAX", "50000"))
+# Commit latency the sizer steers towards: long enough to amortise round trips,
+# short enough that a transaction never holds much heap or many locks
+BATCH_TARGET_SEC = float(os.getenv("GRAPH_BATCH_TARGET_SEC", "1.0"))
+
+
+class AdaptiveBatchSize:
+    """
+    Thread-safe batch sizer shared by concurrent writers. Grows by half while commits
+    are well under target_sec, scales down towards the target when a commit is slow,
+    and halves (lowering the ceiling too) when the server runs out of memory.
+    """
+
+    def __init__(self, initial=5000, min_size=BATCH_MIN_ROWS, max_size=BATCH_MAX_ROWS, target_sec=BATCH_TARGET_SEC):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.target_sec = target_sec
+        self._size = min(self.max_size, max(min_size, initial))
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        with self._lock:
+            return self._size
+
+    def record(self, rows, seconds):
+        """Feeds back one commit; only full-size batches say anything about the limit."""
+        with self._lock:
+            if rows < self._size:
+                return
+            if seconds < self.target_sec / 2:
+                self._size = min(self.max_size, int(self._size * 1.5))
+            elif seconds > self.target_sec * 2:
+                self._size = max(self.min_size, int(self._size * self.target_sec / seconds))
+
+    def shrink_for_memory(self):
+        """Returns False once already at min_size (the batch cannot get any smaller)."""
+        with self._lock:
+            if self._size <= self.min_size:
+                return False
+            self._size = max(self.min_size, self._size // 2)
+            self.max_size = max(self.min_size, self._size)
+            return True
@@ -1,6 +1,5 @@
 import streamlit as st
 from src.utils.static_icons import StaticIcons
-import hashlib
 
 # 1. ICON MAP & PALETTE
 ICON_MAP = {
@@ -14,15 +13,35 @@ ICON_MAP = {
     "Transaction": StaticIcons.MONEY
 }
 
-CASE_PALETTE = [
+COMMUNITY_PALETTE = [
     "#FF9F40", "#4BC0C0", "#9966FF", "#FF6384", "#36A2EB", 
-    "#FFCD56", "#C9CBCF", "#71B37C"
+    "#FFCD56", "#C9CBCF", "#71B37C", "#E377C2", "#8C564B",
+    "#17BECF", "#BCBD22"
 ]
+NO_COMMUNITY_COLOR = "#888888"
+CROSS_COMMUNITY_COLOR = "#FF0000"
 
-def get_case_color(case_id):
-    if not case_id: return "#888888"
-    hash_val = int(hashlib.sha256(str(case_id).encode('utf-8')).hexdigest(), 16)
-    return CASE_PALETTE[hash_val % len(CASE_PALETTE)]
+def get_community_color(community):
+    """Syndicate colour; community ids survive incremental refinement, so colours stay put."""
+    if community is None: return NO_COMMUNITY_COLOR
+    return COMMUNITY_PALETTE[community % len(COMMUNITY_PALETTE)]
+
+def get_community_lookup(driver):
+    """Communities of the current graph, or None (everything grey) if detection is unavailable."""
+    try:
+        from src.analytics.communities import get_communities
+        return get_communities(driver)
+    except Exception as e:
+        print(f"Community detection unavailable: {e}")
+        return None
+
+def edge_style(src_community, tgt_community):
+    """(color, line style, width): solid inside a syndicate, thick dashed red between two."""
+    if src_community is not None and src_community == tgt_community:
+        return get_community_color(src_community), "solid", 2
+    if src_community is not None and tgt_community is not None:
+        return CROSS_COMMUNITY_COLOR, "dashed", 4
+    return "#CCCCCC", "solid", 2
 
 def clean_label(lbl, node_type):
     if not lbl: return node_type
@@ -44,7 +63,9 @@ STYLESHEET = [
             "background-fit": "cover",
             "background-image": "data(icon)",
             "background-color": "white",
-            "border-width": 0,
+            # Ring in the node's syndicate colour
+            "border-width": 4,
+            "border-color": "data(color)",
             "font-size": "12px",
             "text-valign": "bottom",
             "text-margin-y": "5px",
@@ -86,16 +107,23 @@ STYLESHEET = [
 ]
 
 # 3. DATA GENERATOR
-def get_cytoscape_elements(driver, focus_fir_id="Show All"):
+def get_cytoscape_elements(driver, focus_fir_id="Show All", communities=None):
+    """
+    Nodes and edges for the board. Nodes carry their syndicate (`community`, -1 for
+    none) and are coloured by it; `communities` defaults to the cached detection result.
+    """
     elements = []
     node_metadata = {}
+    if communities is None:
+        communities = get_community_lookup(driver)
+    community_of = communities.of if communities else (lambda element_id: None)
     
     try:
         with driver.session() as session:
             # MODE 1: SHOW ALL
             if focus_fir_id == "Show All":
                 query_nodes = """
-                MATCH (n) 
+                MATCH (n) WHERE NOT n:GraphMeta
                 OPTIONAL MATCH (n)-[:HAS_SUSPECT|INVOLVED_VEHICLE|LINKED_PHONE|PART_OF|LINKED_TO]-(c:Case)
                 RETURN elementId(n) as id, n.label as label, n.name as name, n.number as number, 
                        labels(n) as types, collect(distinct c.id) as fir_ids, n.id as self_fir
@@ -113,14 +141,10 @@ def get_cytoscape_elements(driver, focus_fir_id="Show All"):
                     if node_type == "Case" and rec['self_fir']:
                         fir_ids.add(rec['self_fir'])
                     
-                    if len(fir_ids) == 1:
-                        node_color = get_case_color(list(fir_ids)[0])
-                    elif len(fir_ids) > 1:
-                        node_color = "#FF0000" 
-                    else:
-                        node_color = "#888888"
-
-                    node_metadata[safe_id] = {"fir_ids": fir_ids, "color": node_color, "type": node_type}
+                    community = community_of(raw_id)
+                    node_color = get_community_color(community)
+
+                    node_metadata[safe_id] = {"fir_ids": fir_ids, "community": community, "color": node_color, "type": node_type}
                     raw_lbl = rec.get("label") or rec.get("name") or rec.get("number") or node_type
                     
                     elements.append({
@@ -129,6 +153,7 @@ def get_cytoscape_elements(driver, focus_fir_id="Show All"):
                             "label": clean_label(raw_lbl, node_type),
                             "type": node_type,
                             "color": node_color,
+                            "community": -1 if community is None else community,
                             "icon": ICON_MAP.get(node_type, StaticIcons.DEFAULT),
                             "raw_id": raw_id
                         }
@@ -139,17 +164,7 @@ def get_cytoscape_elements(driver, focus_fir_id="Show All"):
                     src_safe = rec['source'].replace(":", "_")
                     tgt_safe = rec['target'].replace(":", "_")
                     if src_safe in node_metadata and tgt_safe in node_metadata:
-                        src_meta = node_metadata[src_safe]
-                        tgt_meta = node_metadata[tgt_safe]
-                        common = src_meta["fir_ids"].intersection(tgt_meta["fir_ids"])
-                        
-                        if common:
-                            edge_color = get_case_color(list(common)[0])
-                            style, width = "solid", 2
-                        elif src_meta["fir_ids"] and tgt_meta["fir_ids"]:
-                            edge_color, style, width = "#FF0000", "dashed", 4
-                        else:
-                            edge_color, style, width = "#CCCCCC", "solid", 2
+                        edge_color, style, width = edge_style(node_metadata[src_safe]["community"], node_metadata[tgt_safe]["community"])
 
                         edge_elements.append({
                             "data": {
@@ -189,13 +204,14 @@ def get_cytoscape_elements(driver, focus_fir_id="Show All"):
                     raw_id = rec['id']
                     safe_id = raw_id.replace(":", "_")
                     fir_id = rec['fir_id']
-                    node_color = get_case_color(fir_id)
-                    node_metadata[safe_id] = {"fir_ids": {fir_id}, "color": node_color, "type": "Case"}
+                    community = community_of(raw_id)
+                    node_color = get_community_color(community)
+                    node_metadata[safe_id] = {"fir_ids": {fir_id}, "community": community, "color": node_color, "type": "Case"}
                     elements.append({
                         "data": {
                             "id": safe_id, "label": fir_id, "type": "Case", 
-                            "color": node_color, "icon": ICON_MAP["Case"],
-                            "raw_id": raw_id
+                            "color": node_color, "community": -1 if community is None else community,
+                            "icon": ICON_MAP["Case"], "raw_id": raw_id
                         }
                     })
                     found_node_ids.add(raw_id)
@@ -212,18 +228,16 @@ def get_cytoscape_elements(driver, focus_fir_id="Show All"):
                     safe_id = raw_id.replace(":", "_")
                     node_type = rec['types'][0] if rec['types'] else "Unknown"
                     fir_ids = set([f for f in rec['fir_ids'] if f])
-                    
-                    if len(fir_ids) == 1: color = get_case_color(list(fir_ids)[0])
-                    elif len(fir_ids) > 1: color = "#FF0000"
-                    else: color = "#888888"
+                    community = community_of(raw_id)
+                    color = get_community_color(community)
 
-                    node_metadata[safe_id] = {"fir_ids": fir_ids, "color": color, "type": node_type}
+                    node_metadata[safe_id] = {"fir_ids": fir_ids, "community": community, "color": color, "type": node_type}
                     raw_lbl = rec.get("label") or rec.get("name") or rec.get("number") or node_type
                     elements.append({
                         "data": {
                             "id": safe_id, "label": clean_label(raw_lbl, node_type),
-                            "type": node_type, "color": color, "icon": ICON_MAP.get(node_type, StaticIcons.DEFAULT),
-                            "raw_id": raw_id
+                            "type": node_type, "color": color, "community": -1 if community is None else community,
+                            "icon": ICON_MAP.get(node_type, StaticIcons.DEFAULT), "raw_id": raw_id
                         }
                     })
                     found_node_ids.add(raw_id)
@@ -236,11 +250,7 @@ def get_cytoscape_elements(driver, focus_fir_id="Show All"):
                 for rec in session.run(query_edges, n_ids=list(found_node_ids)):
                     src_safe, tgt_safe = rec['source'].replace(":", "_"), rec['target'].replace(":", "_")
                     src_m, tgt_m = node_metadata.get(src_safe, {}), node_metadata.get(tgt_safe, {})
-                    common = src_m.get("fir_ids", set()).intersection(tgt_m.get("fir_ids", set()))
-                    
-                    if common: color, style, width = get_case_color(list(common)[0]), "solid", 2
-                    elif src_m.get("fir_ids") and tgt_m.get("fir_ids"): color, style, width = "#FF0000", "dashed", 4
-                    else: color, style, width = "#CCCCCC", "solid", 2
+                    color, style, width = edge_style(src_m.get("community"), tgt_m.get("community"))
 
                     elements.append({
                         "data": {
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+# Cache lives next to the project so it survives container restarts (volume mounted in docker-compose)
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+CACHE_DIR = Path(os.getenv("INTELLICASE_CACHE_DIR", BASE_DIR / "cache"))
+
+# Access times are written back in batches so a cache hit stays a single indexed read
+TOUCH_FLUSH_EVERY = 256
+
+
+def file_sha256(file_path):
+    """Exact content hash, used as the key for per-file caches (OCR, PDF text)."""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    Tiny persistent key/value store backed by SQLite.
+    Values are stored as JSON so any processor result dict can be cached as-is.
+    With max_bytes set, the least recently used entries are evicted once the
+    stored values exceed that size.
+    """
+
+    def __init__(self, name, max_bytes=None):
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        self.path = CACHE_DIR / f"{name}.sqlite"
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY, value TEXT NOT NULL,
+                size INTEGER NOT NULL DEFAULT 0, last_access REAL NOT NULL DEFAULT 0
+            )""")
+        # Caches created before LRU support only had key/value
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache)")}
+        if 'size' not in columns:
+            self._conn.execute("ALTER TABLE cache ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("ALTER TABLE cache ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE cache SET size = length(value)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_access ON cache (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.max_bytes:
+                self._touched[key] = time.time()
+                if len(self._touched) >= TOUCH_FLUSH_EVERY:
+                    self._flush_touched()
+                    self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        payload = json.dumps(value)
+        with self._lock:
+            self._touched.pop(key, None)
+            self._flush_touched()
+            old = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            self._total_bytes += len(payload) - (old[0] if old else 0)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time())
+            )
+            if self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE cache SET last_access = ? WHERE key = ?",
+                [(ts, key) for key, ts in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Walk oldest-first and drop until we are back under budget
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY last_access ASC"):
+            doomed.append((key,))
+            self._total_bytes -= size
+            if self._total_bytes <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", doomed)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
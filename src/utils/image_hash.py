@@ -0,0 +1,78 @@
+from PIL import Image
+
+HASH_SIZE = 8  # 8x8 difference grid -> 64-bit hash
+BAND_BITS = 8  # 8 bands of 8 bits; pigeonhole guarantees an exact band match for distance <= 7
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """
+    Difference hash: shrink to (hash_size+1 x hash_size) grayscale and compare neighbours.
+    Accepts a file path or a PIL Image. Robust to re-encoding, small shifts and lighting drift.
+    """
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+    pixels = list(image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS).getdata())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class FrameIndex:
+    """
+    Groups near-duplicate frames by perceptual hash.
+    Uses multi-index hashing (exact match on any 8-bit band) so lookups only compare
+    against a handful of candidates instead of every representative seen so far.
+    With a window, a frame only joins a group whose latest frame is at most `window`
+    before it (seconds into a clip, position in a burst): a whole-frame hash cannot tell
+    two cars apart on a fixed camera, so only frames close in time may share OCR.
+    """
+
+    def __init__(self, max_distance=5, window=None):
+        self.max_distance = max_distance
+        self.window = window
+        self.representatives = []  # [(hash, group_id)]
+        self._bands = {}           # (band_no, band_value) -> [representative idx]
+        self._last_seen = {}       # group_id -> `at` of its latest frame
+
+    def _band_keys(self, h):
+        mask = (1 << BAND_BITS) - 1
+        return [(i, (h >> (i * BAND_BITS)) & mask) for i in range(HASH_SIZE * HASH_SIZE // BAND_BITS)]
+
+    def find(self, h, at=None):
+        """Returns the group id of the closest representative within max_distance (and the window), or None."""
+        best_group, best_dist = None, self.max_distance + 1
+        seen = set()
+        for key in self._band_keys(h):
+            for idx in self._bands.get(key, ()):
+                if idx in seen: continue
+                seen.add(idx)
+                rep_hash, group_id = self.representatives[idx]
+                if self.window is not None and at - self._last_seen[group_id] > self.window: continue
+                dist = hamming(h, rep_hash)
+                if dist < best_dist:
+                    best_group, best_dist = group_id, dist
+        return best_group
+
+    def add(self, h, group_id):
+        idx = len(self.representatives)
+        self.representatives.append((h, group_id))
+        for key in self._band_keys(h):
+            self._bands.setdefault(key, []).append(idx)
+
+    def group(self, h, at=None):
+        """Assigns h (seen at `at`) to an existing group or starts a new one. Returns (group_id, is_new)."""
+        group_id = self.find(h, at)
+        is_new = group_id is None
+        if is_new:
+            group_id = len(self.representatives)
+            self.add(h, group_id)
+        self._last_seen[group_id] = at
+        return group_id, is_new
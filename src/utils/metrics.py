@@ -0,0 +1,15 @@
+import threading
+from collections import Counter
+
+# Process-wide counters for expensive calls (LLM requests, OCR runs, cache hits).
+# Read by the ingestion CLI to report throughput at exit.
+_counters = Counter()
+_lock = threading.Lock()
+
+def incr(name, n=1):
+    with _lock:
+        _counters[name] += n
+
+def snapshot():
+    with _lock:
+        return dict(_counters)
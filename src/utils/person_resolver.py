@@ -0,0 +1,153 @@
+import os
+import re
+import threading
+from difflib import SequenceMatcher
+
+# Scores (0..1) at or above MERGE are treated as the same person if the names also sound
+# alike token for token (sounds_same); FLAG and above get a POSSIBLE_SAME_AS edge for an
+# analyst to confirm
+MERGE_THRESHOLD = float(os.getenv("PERSON_MERGE_THRESHOLD", "0.92"))
+FLAG_THRESHOLD = float(os.getenv("PERSON_FLAG_THRESHOLD", "0.80"))
+# Blocks shared by more people than this ("KUMAR") say nothing and are not compared
+MAX_BLOCK_SIZE = 500
+
+HONORIFICS = {"MR", "MRS", "MS", "DR", "SHRI", "SRI", "SMT", "LATE"}
+
+# Transliteration variants collapsed before dropping vowels: Kumaar/Kumar, Bhaskar/Baskar,
+# Mohammed/Muhammad, Shyam/Syam, Vijay/Wijay, Zaheer/Jaheer
+PHONETIC_RULES = [
+    (r'AA|AH$', 'A'), (r'EE|II', 'I'), (r'OO|UU', 'U'), (r'PH', 'F'), (r'([BDGKT])H', r'\1'),
+    (r'SH|CH', 'S'), (r'W', 'V'), (r'Z', 'J'), (r'Q', 'K'), (r'CK', 'K'), (r'Y', 'I'),
+]
+
+
+def normalize_name(name):
+    """Upper-case tokens without punctuation or honorifics: 'Mr. Ravi  kumar' -> 'RAVI KUMAR'."""
+    if not name: return ""
+    tokens = re.sub(r'[^A-Za-z ]', ' ', str(name)).upper().split()
+    return " ".join(t for t in tokens if t not in HONORIFICS)
+
+
+def _fold(token):
+    token = token.upper()
+    for pattern, repl in PHONETIC_RULES:
+        token = re.sub(pattern, repl, token)
+    return token
+
+
+def phonetic_key(token):
+    """Consonant skeleton of a name token after folding common Indian transliteration variants."""
+    token = _fold(token)
+    if not token: return ""
+    skeleton = token[0] + re.sub(r'[AEIOU]', '', token[1:])
+    return re.sub(r'(.)\1+', r'\1', skeleton)
+
+
+def blocking_keys(normalized):
+    """
+    Keys that near-duplicates of a name are very likely to share: the sorted token set,
+    the phonetic keys of first + last token, and initials + phonetic surname ('R KUMAR').
+    """
+    tokens = normalized.split()
+    if not tokens: return []
+    keys = ["N:" + " ".join(sorted(tokens))]
+    first, last = phonetic_key(tokens[0]), phonetic_key(tokens[-1])
+    if len(tokens) > 1:
+        keys.append("P:" + "|".join(sorted((first, last))))
+        keys.append("I:" + "".join(t[0] for t in tokens[:-1]) + "|" + last)
+    else:
+        keys.append("P:" + first)
+    return keys
+
+
+def similarity(a, b):
+    """
+    Order-insensitive similarity of two normalized names. Spellings that sound alike
+    token for token (Mohammed Salim / Muhammad Saleem) score at least flag level even
+    when their letters differ a lot.
+    """
+    a_sorted, b_sorted = " ".join(sorted(a.split())), " ".join(sorted(b.split()))
+    text = max(SequenceMatcher(None, a, b).ratio(), SequenceMatcher(None, a_sorted, b_sorted).ratio())
+    a_keys, b_keys = [phonetic_key(t) for t in a.split()], [phonetic_key(t) for t in b.split()]
+    sound = (sum(k in b_keys for k in a_keys) / len(a_keys) + sum(k in a_keys for k in b_keys) / len(b_keys)) / 2
+    return max(text, (text + sound) / 2)
+
+
+def sounds_same(a, b):
+    """
+    Whether two normalized names have the same number of tokens with pairwise equal
+    phonetic keys and final vowels. Only such variants merge without review: Kumar and
+    Kumari, or Amit and Amita, share a consonant skeleton but are different people.
+    """
+    def keys(name):
+        folded = [_fold(t) for t in name.split()]
+        return sorted(phonetic_key(t) + (t[-1] if t and t[-1] in "AEIOU" else "") for t in folded)
+    return keys(a) == keys(b)
+
+
+class PersonResolver:
+    """
+    In-memory blocking index over known Person names. A new name is only scored against
+    names sharing one of its blocking keys, so resolution stays cheap with millions of
+    people instead of comparing every pair.
+    """
+
+    def __init__(self, merge_threshold=MERGE_THRESHOLD, flag_threshold=FLAG_THRESHOLD):
+        self.merge_threshold = merge_threshold
+        self.flag_threshold = flag_threshold
+        self.names = []         # canonical names as stored on Person.name
+        self._normalized = {}   # normalized -> name idx
+        self._blocks = {}       # blocking key -> [name idx]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        normalized = normalize_name(name)
+        if not normalized or normalized in self._normalized: return
+        idx = len(self.names)
+        self.names.append(name)
+        self._normalized[normalized] = idx
+        for key in blocking_keys(normalized):
+            self._blocks.setdefault(key, []).append(idx)
+
+    def candidates(self, normalized):
+        """[(score, name)] of known people sharing a block with normalized, best first."""
+        seen = set()
+        scored = []
+        for key in blocking_keys(normalized):
+            block = self._blocks.get(key, ())
+            if len(block) > MAX_BLOCK_SIZE: continue
+            for idx in block:
+                if idx in seen: continue
+                seen.add(idx)
+                scored.append((similarity(normalized, normalize_name(self.names[idx])), self.names[idx]))
+        scored.sort(reverse=True)
+        return scored
+
+    def resolve(self, name):
+        """
+        Returns (canonical_name, possible_matches). canonical_name is an existing person
+        when the name is an exact or high-confidence variant of one, otherwise the name
+        itself (which is then indexed). possible_matches lists [(other_name, score)]
+        that are similar enough to flag but not to merge.
+        """
+        normalized = normalize_name(name)
+        if not normalized:
+            return name, []
+        with self._lock:
+            idx = self._normalized.get(normalized)
+            if idx is not None:
+                return self.names[idx], []
+
+            scored = self.candidates(normalized)
+            canonical = next((other for score, other in scored
+                              if score >= self.merge_threshold and sounds_same(normalized, normalize_name(other))), None)
+            if canonical is not None:
+                # Later spellings of the same variant resolve without scoring
+                self._normalized[normalized] = self._normalized[normalize_name(canonical)]
+                return canonical, []
+
+            self.add(name)
+            return name, [(other, round(score, 3)) for score, other in scored if score >= self.flag_threshold]
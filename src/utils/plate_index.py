@@ -0,0 +1,113 @@
+import re
+import threading
+
+# Characters OCR confuses on number plates, folded onto one representative each
+CONFUSION_CLASSES = ["0ODQ", "1IL", "2Z", "5S", "6G", "8B"]
+_FOLD = {c: group[0] for group in CONFUSION_CLASSES for c in group}
+
+MAX_EDIT_DISTANCE = 1
+# Score for an exact read; a read equal only after folding confusions, and each
+# remaining edit, cost a little confidence
+EXACT_SCORE = 1.0
+FOLDED_SCORE = 0.9
+EDIT_PENALTY = 0.15
+MIN_SCORE = 0.7
+
+
+def normalize_plate(text):
+    """'kl-07 ab 1234' -> 'KL07AB1234'."""
+    return re.sub(r'[^A-Z0-9]', '', str(text or '').upper())
+
+
+def canonical_plate(text):
+    """Normalized plate with confusable characters folded: 'KL07AB1234' -> 'K107A81234'."""
+    return "".join(_FOLD.get(c, c) for c in normalize_plate(text))
+
+
+def _deletes(s, depth):
+    """All strings reachable from s by deleting up to depth characters (including s)."""
+    out = {s}
+    frontier = {s}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, or limit + 1 once it is certain to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class PlateIndex:
+    """
+    Registered plates indexed by their confusion-folded form plus its deletion
+    neighbourhood (SymSpell style): a read within max_distance edits of a plate shares
+    at least one deletion variant with it, so lookups are a few dict probes instead of
+    a scan, whatever the number of plates.
+    """
+
+    def __init__(self, max_distance=MAX_EDIT_DISTANCE):
+        self.max_distance = max_distance
+        self._plates = {}    # canonical -> set of Vehicle.number values as stored
+        self._deletes = {}   # deletion variant -> canonical form, or set of them
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(numbers) for numbers in self._plates.values())
+
+    def add(self, number):
+        normalized = normalize_plate(number)
+        if not normalized: return
+        canonical = canonical_plate(normalized)
+        with self._lock:
+            numbers = self._plates.get(canonical)
+            if numbers is None:
+                self._plates[canonical] = {number}
+                for variant in _deletes(canonical, self.max_distance):
+                    bucket = self._deletes.get(variant)
+                    # Most variants belong to one plate: keep a bare string until a second one arrives
+                    if bucket is None:
+                        self._deletes[variant] = canonical
+                    elif isinstance(bucket, str):
+                        if bucket != canonical: self._deletes[variant] = {bucket, canonical}
+                    else:
+                        bucket.add(canonical)
+            else:
+                numbers.add(number)
+
+    def lookup(self, read, min_score=MIN_SCORE, limit=3):
+        """
+        Candidate vehicles for an OCR read, best first: [(Vehicle.number, score)].
+        Exact reads score 1.0, confusion-only differences 0.9, each further edit -0.15.
+        """
+        normalized = normalize_plate(read)
+        if not normalized: return []
+        canonical = canonical_plate(normalized)
+        with self._lock:
+            candidates = set()
+            for variant in _deletes(canonical, self.max_distance):
+                bucket = self._deletes.get(variant)
+                if isinstance(bucket, str):
+                    candidates.add(bucket)
+                elif bucket:
+                    candidates |= bucket
+            scored = {}
+            for cand in candidates:
+                dist = edit_distance(canonical, cand, self.max_distance)
+                if dist > self.max_distance: continue
+                for number in self._plates[cand]:
+                    score = EXACT_SCORE if normalize_plate(number) == normalized else FOLDED_SCORE - EDIT_PENALTY * dist
+                    if score >= min_score:
+                        scored[number] = max(score, scored.get(number, 0.0))
+        return sorted(scored.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
@@ -0,0 +1,93 @@
+import os
+import math
+import hashlib
+import threading
+
+CACHE_MAX_ENTRIES = int(os.getenv("ID_CACHE_MAX_ENTRIES", "2000000"))
+BLOOM_CAPACITY = int(os.getenv("ID_BLOOM_CAPACITY", "10000000"))
+BLOOM_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. `key in bloom` is False only for keys that were
+    never added, so a miss proves an identifier is new without asking the database.
+    """
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class ResolutionCache:
+    """
+    Ingestion-scoped map from normalized identifier ("phone:9876543210") to graph element
+    id. The Bloom filter holds every identifier known to exist, so lookups split into
+    cached hits, definitely-new keys (create without reading) and the few maybe-known
+    keys that need one batched database read.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, bloom=None):
+        self.max_entries = max_entries
+        self.bloom = bloom or BloomFilter()
+        self._ids = {}
+        self._warm_cases = set()
+        self._stats = {"hits": 0, "misses": 0, "definitely_new": 0}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            node_id = self._ids.get(key)
+            self._stats["hits" if node_id else "misses"] += 1
+            return node_id
+
+    def put(self, key, node_id):
+        with self._lock:
+            if key not in self._ids and len(self._ids) >= self.max_entries:
+                # Insertion order: drop the oldest entry
+                del self._ids[next(iter(self._ids))]
+            self._ids[key] = node_id
+            self.bloom.add(key)
+
+    def forget(self, key):
+        """Drops a mapping that may now point at the wrong node (e.g. phone assigned to a person)."""
+        with self._lock:
+            self._ids.pop(key, None)
+
+    def might_exist(self, key):
+        with self._lock:
+            if key in self.bloom:
+                return True
+            self._stats["definitely_new"] += 1
+            return False
+
+    def remember(self, key):
+        """Marks an identifier as existing without knowing its node yet (Bloom warm-up)."""
+        with self._lock:
+            self.bloom.add(key)
+
+    def case_warm(self, case_id):
+        with self._lock:
+            return case_id in self._warm_cases
+
+    def mark_case_warm(self, case_id):
+        with self._lock:
+            self._warm_cases.add(case_id)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._ids))
@@ -0,0 +1,55 @@
+import math
+
+# Points (out of 100) each Person feature contributes once it reaches its saturation value
+RISK_WEIGHTS = {"cross_case": 40, "assets": 20, "calls": 25, "money": 15}
+RISK_SATURATION = {
+    "cross_case": 3,    # extra cases beyond the first
+    "assets": 5,        # phones, transactions and other non-person neighbours
+    "calls": 20,        # distinct call partners, in + out
+    "money": 6,         # log10 of rupees received
+}
+RISK_NAMES = {"cross_case": "cross-case", "assets": "assets", "calls": "calls", "money": "money"}
+
+
+def _capped(expr, cap):
+    return f"(CASE WHEN {expr} >= {cap} THEN 1.0 ELSE toFloat({expr}) / {cap} END)"
+
+
+# Recomputes the stored features of a batch of flagged people from their own
+# neighbourhood only; the score is the same weighted sum risk_breakdown() explains
+REFRESH_QUERY = f"""
+MATCH (p:Person) WHERE p.risk_dirty = true
+WITH p LIMIT $batch
+CALL {{ WITH p OPTIONAL MATCH (p)--(c:Case) RETURN count(DISTINCT c) AS case_count }}
+CALL {{ WITH p OPTIONAL MATCH (p)-[r]-(a) WHERE NOT a:Case AND NOT a:Person AND NOT type(r) IN ['CALLED', 'POSSIBLE_SAME_AS']
+        RETURN count(DISTINCT a) AS asset_count }}
+CALL {{ WITH p OPTIONAL MATCH (p)-[:CALLED]->(x) RETURN count(DISTINCT x) AS fan_out }}
+CALL {{ WITH p OPTIONAL MATCH (x)-[:CALLED]->(p) RETURN count(DISTINCT x) AS fan_in }}
+CALL {{ WITH p OPTIONAL MATCH (t:Transaction)-[:SENT_TO]->(p)
+        RETURN sum(coalesce(toFloat(replace(toString(t.amount), ',', '')), 0.0)) AS txn_volume }}
+WITH p, case_count, asset_count, fan_out, fan_in, txn_volume,
+     CASE WHEN txn_volume > 0 THEN log10(1 + txn_volume) ELSE 0.0 END AS money
+SET p.case_count = case_count,
+    p.asset_count = asset_count,
+    p.call_fan_out = fan_out,
+    p.call_fan_in = fan_in,
+    p.txn_volume = txn_volume,
+    p.risk_score = {RISK_WEIGHTS['cross_case']} * {_capped('CASE WHEN case_count > 1 THEN case_count - 1 ELSE 0 END', RISK_SATURATION['cross_case'])}
+                 + {RISK_WEIGHTS['assets']} * {_capped('asset_count', RISK_SATURATION['assets'])}
+                 + {RISK_WEIGHTS['calls']} * {_capped('fan_in + fan_out', RISK_SATURATION['calls'])}
+                 + {RISK_WEIGHTS['money']} * {_capped('money', RISK_SATURATION['money'])}
+REMOVE p.risk_dirty
+RETURN count(p)
+"""
+
+
+def risk_breakdown(features):
+    """{feature: points} for a person's stored features (case_count, asset_count, ...)."""
+    volume = features.get("txn_volume") or 0.0
+    raw = {
+        "cross_case": max((features.get("case_count") or 0) - 1, 0),
+        "assets": features.get("asset_count") or 0,
+        "calls": (features.get("call_fan_in") or 0) + (features.get("call_fan_out") or 0),
+        "money": math.log10(1 + volume) if volume > 0 else 0.0,
+    }
+    return {name: RISK_WEIGHTS[name] * min(1.0, raw[name] / RISK_SATURATION[name]) for name in RISK_WEIGHTS}
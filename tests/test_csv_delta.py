@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+from src.ingest_state import IngestState, CsvDelta
+from src.processors.csv_delta import complete_lines_end, prefix_fingerprint, read_csv_sniffed
+
+SNIFF = {"encoding": "utf-8", "delimiter": ",", "columns": ["a", "b"]}
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = IngestState(str(tmp_path / "state.sqlite"))
+    yield state
+    state.close()
+
+
+def test_complete_lines_end():
+    assert complete_lines_end(io.BytesIO(b"a,b\n1,2\n3,4")) == 8
+    assert complete_lines_end(io.BytesIO(b"a,b\n1,2\n")) == 8
+    assert complete_lines_end(io.BytesIO(b"a,b")) == 0
+
+
+def test_prefix_fingerprint_ignores_appended_bytes():
+    assert prefix_fingerprint(io.BytesIO(b"a,b\n1,2\n"), 8) == prefix_fingerprint(io.BytesIO(b"a,b\n1,2\n3,4\n"), 8)
+    assert prefix_fingerprint(io.BytesIO(b"a,b\n1,2\n"), 8) != prefix_fingerprint(io.BytesIO(b"a,b\n1,9\n"), 8)
+
+
+def test_unterminated_last_row_is_parsed_but_not_consumed(state):
+    handle = io.BytesIO(b"a,b\n1,2\n3,4")
+    delta = CsvDelta(state, "case|cdr|calls.csv", handle)
+    assert delta.has_new_rows()
+    assert delta.byte_range == (0, 11)
+    pytest.importorskip("pandas")
+    assert read_csv_sniffed(handle, SNIFF, delta.byte_range)["b"].tolist() == [2, 4]
+    delta.commit(2)
+
+    # Unchanged file: nothing to do
+    assert not CsvDelta(state, "case|cdr|calls.csv", io.BytesIO(b"a,b\n1,2\n3,4")).has_new_rows()
+
+    # The last row is completed and another appended: re-read from its start
+    handle = io.BytesIO(b"a,b\n1,2\n3,45\n6,7\n")
+    delta = CsvDelta(state, "case|cdr|calls.csv", handle)
+    assert delta.has_new_rows()
+    assert delta.start == 8 and delta.rows_before == 1
+    assert read_csv_sniffed(handle, SNIFF, delta.byte_range).values.tolist() == [[3, 45], [6, 7]]
+
+
+def test_rewritten_prefix_is_read_in_full(state):
+    delta = CsvDelta(state, "k", io.BytesIO(b"a,b\n1,2\n"))
+    delta.commit(1)
+    delta = CsvDelta(state, "k", io.BytesIO(b"a,b\n9,9\n3,4\n"))
+    assert delta.start == 0 and delta.rows_before == 0
+
+
+def test_latin1_row_after_utf8_head():
+    pytest.importorskip("pandas")
+    df = read_csv_sniffed(io.BytesIO("a,b\n1,caf\xe9\n".encode("latin1")), SNIFF)
+    assert df["b"].tolist() == ["caf\xe9"]
@@ -0,0 +1,121 @@
+import json
+import re
+import threading
+import time
+
+import pytest
+
+from src.processors import fir_processor
+from src.processors.fir_processor import process_fir_bulk
+
+INPUT_ID_RE = re.compile(r'<<<FIR input_id=(\d+)>>>')
+REF_RE = re.compile(r'\bref R(\d+)\b')
+
+
+def narrative(n, extra=""):
+    # No FIR number, accused or phone: the rule extractor gives up and the FIR goes to the model
+    return f"Complaint ref R{n}: a man in a blue shirt was seen near the market late at night. {extra}"
+
+
+class MemoryCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+    def stats(self):
+        return {"hit_rate": 0.0}
+
+
+class FakeBackend:
+    """Answers from the 'ref R<n>' marker; batches above max_batch come back truncated."""
+
+    model_name = "fake-model"
+
+    def __init__(self, max_batch=None, drop=(), delays=()):
+        self.max_batch = max_batch
+        self.drop = set(drop)
+        self.delays = list(delays)
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def answer(self, text):
+        if "POISON" in text:
+            return None
+        return {"fir_id": f"FIR_2024_{REF_RE.search(text).group(1)}", "suspects": [], "vehicles": [], "phones": []}
+
+    def generate(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            delay = self.delays.pop(0) if self.delays else 0
+        time.sleep(delay)
+        blocks = prompt.split("<<<FIR input_id=")[1:]
+        if not blocks:
+            data = self.answer(prompt.split("Input Text:", 1)[1])
+            return json.dumps(data) if data else '{"fir_id": "FIR_2024_'
+        if self.max_batch and len(blocks) > self.max_batch:
+            return '[{"input_id": "0", "fir_id": '
+        answers = []
+        for block in blocks:
+            input_id, text = block.split(">>>", 1)
+            data = self.answer(text)
+            if data is None or input_id in self.drop:
+                continue
+            answers.append(dict(data, input_id=input_id))
+        return json.dumps(answers)
+
+
+@pytest.fixture(autouse=True)
+def quiet_prompts(monkeypatch):
+    # Keeps prompts to the raw text so the fake backend can read the markers back
+    monkeypatch.setattr(fir_processor, "prepare_prompt_text", lambda text, label="": text)
+
+
+def test_unparseable_batch_is_split():
+    backend = FakeBackend(max_batch=2)
+    texts = [narrative(n) for n in range(5)]
+    results = process_fir_bulk(texts, backend=backend, cache=MemoryCache(), max_retries=0, requests_per_minute=6000)
+    assert [r["fir_id"] for r in results] == [f"FIR_2024_{n}" for n in range(5)]
+    # One 5-FIR prompt, then halves of 2 and 3, then the 3 split again
+    sizes = [len(INPUT_ID_RE.findall(p)) or 1 for p in backend.prompts]
+    assert sorted(sizes) == [1, 2, 2, 3, 5]
+
+
+def test_poisoned_fir_only_fails_itself():
+    backend = FakeBackend(max_batch=1)
+    texts = [narrative(0), narrative(1, "POISON"), narrative(2), narrative(3)]
+    results = process_fir_bulk(texts, backend=backend, cache=MemoryCache(), max_retries=0, requests_per_minute=6000)
+    assert "Unparseable LLM answer" in results[1]["error"]
+    assert [results[i]["fir_id"] for i in (0, 2, 3)] == ["FIR_2024_0", "FIR_2024_2", "FIR_2024_3"]
+
+
+def test_fir_dropped_from_the_array_is_asked_alone():
+    backend = FakeBackend(drop={"1"})
+    texts = [narrative(n) for n in range(3)]
+    results = process_fir_bulk(texts, backend=backend, cache=MemoryCache(), max_retries=0, requests_per_minute=6000)
+    assert [r["fir_id"] for r in results] == ["FIR_2024_0", "FIR_2024_1", "FIR_2024_2"]
+    assert len(backend.prompts) == 2 and "<<<FIR" not in backend.prompts[1]
+
+
+def test_slow_call_is_hedged():
+    backend = FakeBackend(delays=[2.0])
+    start = time.monotonic()
+    results = process_fir_bulk([narrative(7)], backend=backend, cache=MemoryCache(), max_retries=0,
+                               requests_per_minute=6000, hedge_after=0.05)
+    assert results[0]["fir_id"] == "FIR_2024_7"
+    # The duplicate answered while the first request was still sleeping
+    assert time.monotonic() - start < 1.5
+    assert len(backend.prompts) == 2
+
+
+def test_answers_are_cached():
+    backend = FakeBackend()
+    cache = MemoryCache()
+    process_fir_bulk([narrative(1)], backend=backend, cache=cache, max_retries=0, requests_per_minute=6000)
+    results = process_fir_bulk([narrative(1)], backend=backend, cache=cache, max_retries=0, requests_per_minute=6000)
+    assert results[0]["fir_id"] == "FIR_2024_1"
+    assert len(backend.prompts) == 1
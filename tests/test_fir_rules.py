@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from src.processors.fir_rules import extract_fir_rules
+
+ASSETS = Path(__file__).resolve().parent.parent / "assets"
+# fir_processor.RULES_MIN_CONFIDENCE default: below it the FIR goes to the LLM
+RULES_MIN_CONFIDENCE = 0.8
+
+
+def test_sample_kidnap_fir_attributes_narrative_phone():
+    data = extract_fir_rules((ASSETS / "FIR_DL_Kidnap.txt").read_text())
+    assert data["fir_id"] == "FIR_2024_9900"
+    assert data["suspects"] == ["Rajesh Bhai"]
+    assert data["vehicles"] == ["MH12HG9999"]
+    assert data["phones"] == ["9990005555"]
+    assert data["confidence"] >= RULES_MIN_CONFIDENCE
+
+
+def test_sample_smuggling_fir_with_unattributed_phone_goes_to_llm():
+    data = extract_fir_rules((ASSETS / "FIR_KL_Smuggling.txt").read_text())
+    assert data["fir_id"] == "FIR_2024_5501"
+    # "His contact number is 7770001234" names nobody: the rules must not be trusted alone
+    assert data["phones"] or data["confidence"] < RULES_MIN_CONFIDENCE
+
+
+def test_complainant_and_witness_numbers_are_not_the_accused():
+    data = extract_fir_rules(
+        "FIRST INFORMATION REPORT\n"
+        "FIR No: 0305\nYear: 2023\n"
+        "Complainant: Ravi Kumar, phone 9876543210\n"
+        "Accused: Suresh Babu\n"
+        "Suresh Babu used mobile 9123456780 to call the victim.\n"
+        "Witness Anil, 9988776655.\n")
+    assert data["phones"] == ["9123456780"]
+
+
+def test_missing_fields_are_omitted():
+    data = extract_fir_rules("FIR No: 12\nAccused: Ravi Kumar\n")
+    assert "crime_type" not in data and "date" not in data and "station" not in data
+
+
+def test_year_suffix_is_not_part_of_the_fir_number():
+    assert extract_fir_rules("FIR No: 0123/2023\n")["fir_id"] == "FIR_2023_123"
+    assert extract_fir_rules("Year: 2022\nFIR No: 0123-2023\n")["fir_id"] == "FIR_2022_123"
+    assert extract_fir_rules("Year: 2024\nFIR No: 0305\n")["fir_id"] == "FIR_2024_305"
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("PIL")
+
+from src.utils.image_hash import FrameIndex, hamming
+
+
+def test_near_duplicates_share_a_group():
+    index = FrameIndex(max_distance=5)
+    assert index.group(0b1011) == (0, True)
+    assert index.group(0b1111) == (0, False)
+    assert index.group((1 << 64) - 1)[1]
+
+
+def test_window_keeps_frames_far_apart_in_separate_groups():
+    index = FrameIndex(max_distance=5, window=2.0)
+    assert index.group(0b1011, at=0.0) == (0, True)
+    assert index.group(0b1011, at=1.5) == (0, False)
+    # Within the window of the group's latest frame, not of its first
+    assert index.group(0b1011, at=3.0) == (0, False)
+    group_id, is_new = index.group(0b1011, at=10.0)
+    assert is_new and group_id != 0
+
+
+def test_hamming():
+    assert hamming(0b1010, 0b0101) == 4
+
+
+def test_stills_share_ocr_only_within_a_burst(tmp_path, monkeypatch):
+    from PIL import Image
+    from src.processors import cctv_processor
+
+    class MemoryCache(dict):
+        def set(self, key, value): self[key] = value
+
+    ocr_runs = []
+    def fake_ocr(image_path, file_hash=None):
+        ocr_runs.append(image_path)
+        return [f"KL07AB{1000 + len(ocr_runs)}"]
+    monkeypatch.setattr(cctv_processor, "_get_ocr_cache", MemoryCache)
+    monkeypatch.setattr(cctv_processor, "read_image_text", fake_ocr)
+
+    paths = []
+    for folder, name, shade in [("burst", "f1.png", 10), ("burst", "f2.png", 11), ("other", "x.png", 12)]:
+        (tmp_path / folder).mkdir(exist_ok=True)
+        image = Image.linear_gradient("L").resize((64, 64))
+        image.point(lambda v: min(255, v + shade)).save(tmp_path / folder / name)
+        paths.append(str(tmp_path / folder / name))
+
+    results = cctv_processor.process_cctv_batch(paths)
+    # f2 reuses f1's read; the identical-looking still in another folder is OCR'd on its own
+    assert ocr_runs == [paths[0], paths[2]]
+    assert [r["source"] for r in results] == paths
+    assert results[0]["vehicle_number"] == results[1]["vehicle_number"] != results[2]["vehicle_number"]
@@ -0,0 +1,44 @@
+import pytest
+
+from src.utils.person_resolver import PersonResolver, normalize_name, phonetic_key, sounds_same
+
+
+@pytest.fixture
+def resolver():
+    resolver = PersonResolver()
+    for name in ["Ravi Kumar", "Anil Kumar", "Amit Singh", "Mohammed Salim"]:
+        resolver.add(name)
+    return resolver
+
+
+def test_normalize_name():
+    assert normalize_name("Mr. Ravi  kumar") == "RAVI KUMAR"
+    assert normalize_name(None) == ""
+
+
+def test_phonetic_key_folds_transliterations():
+    assert phonetic_key("Kumaar") == phonetic_key("Kumar")
+    assert phonetic_key("Mohammed") == phonetic_key("Muhammad")
+    assert phonetic_key("Vijay") == phonetic_key("Wijay")
+
+
+@pytest.mark.parametrize("name,other", [
+    ("Ravi Kumari", "Ravi Kumar"),
+    ("Anil Kumari", "Anil Kumar"),
+    ("Amita Singh", "Amit Singh"),
+])
+def test_different_people_are_flagged_not_merged(resolver, name, other):
+    canonical, possible = resolver.resolve(name)
+    assert canonical == name
+    assert other in [match for match, _ in possible]
+
+
+@pytest.mark.parametrize("name", ["Ravi Kumaar", "Mr. ravi  kumar", "Kumar Ravi"])
+def test_spelling_variants_merge(resolver, name):
+    assert resolver.resolve(name) == ("Ravi Kumar", [])
+
+
+def test_sounds_same_needs_equal_token_counts():
+    assert not sounds_same("RAVI KUMAR", "RAVI KUMAR SINGH")
+    assert not sounds_same("RAVI", "RAVI KUMAR")
+    assert sounds_same("SHYAM", "SYAM")
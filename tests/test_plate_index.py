@@ -0,0 +1,26 @@
+from src.utils.plate_index import PlateIndex, canonical_plate, edit_distance, normalize_plate
+
+
+def test_normalize_and_fold():
+    assert normalize_plate("kl-07 ab 1234") == "KL07AB1234"
+    assert canonical_plate("KL07AB1234") == canonical_plate("KL07A81234")
+
+
+def test_edit_distance_stops_at_limit():
+    assert edit_distance("MH12AB1234", "MH12AB1234", 1) == 0
+    assert edit_distance("MH12AB1234", "MH12AB123", 1) == 1
+    assert edit_distance("MH12AB1234", "MH12XY9999", 1) == 2
+
+
+def test_lookup_scores():
+    index = PlateIndex()
+    for number in ["MH12HG9999", "KL07AB1234", "DL01CD5678"]:
+        index.add(number)
+    assert len(index) == 3
+    assert index.lookup("mh-12 hg 9999") == [("MH12HG9999", 1.0)]
+    # OCR read 'B' as '8' and 'O' as '0': confusion-only difference
+    assert index.lookup("KL07A81234") == [("KL07AB1234", 0.9)]
+    # One real edit on top
+    assert index.lookup("DL01CD567") == [("DL01CD5678", 0.75)]
+    assert index.lookup("TN22ZZ0000") == []
+    assert index.lookup("") == []
@@ -0,0 +1,35 @@
+import pytest
+
+from src.processors.router import SNIFF_BYTES, sniff_head
+
+
+@pytest.mark.parametrize("head,kind", [
+    (b"%PDF-1.7\n", "fir"),
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF", "cctv"),
+    (b"\x89PNG\r\n\x1a\n\x00\x00", "cctv"),
+    (b"\x00\x00\x00\x18ftypmp42", "video"),
+    (b"\x1aE\xdf\xa3\x9fB\x86\x81", "video"),
+    (b"RIFF\x00\x00\x00\x00AVI LIST", "video"),
+    (b"PK\x03\x04\x14\x00", "archive"),
+    (b"GIF89a\x01\x00\x01\x00\x00\x00", "unknown"),
+])
+def test_magic_bytes(head, kind):
+    assert sniff_head(head)["kind"] == kind
+
+
+def test_csv_columns_route_bank_before_cdr():
+    sniff = sniff_head(b"Date;Sender;Receiver;Amount\n2024-01-01;A;B;500\n", "stmt.csv")
+    assert sniff["kind"] == "bank" and sniff["delimiter"] == ";"
+    assert sniff["columns"] == ["Date", "Sender", "Receiver", "Amount"]
+    assert sniff_head(b"caller,receiver,duration\n1,2,30\n", "calls.csv")["kind"] == "cdr"
+
+
+def test_prose_txt_is_an_fir():
+    sniff = sniff_head(b"FIRST INFORMATION REPORT\nFIR No: 0305, the accused fled.\n", "report.txt")
+    assert sniff["kind"] == "fir" and sniff["encoding"] == "utf-8-sig"
+
+
+def test_utf8_cut_at_sniff_boundary_and_latin1():
+    head = ("a,b\n" + "x" * (SNIFF_BYTES - 5)).encode() + "€".encode()[:2]
+    assert sniff_head(head, "calls.csv")["encoding"] == "utf-8-sig"
+    assert sniff_head("caller,name\n1,Jos\xe9\n2,Ravi\n".encode("latin1"), "calls.csv")["encoding"] == "latin1"